@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmark suite
+==========================
+`multi_stock_alert.main()`, `stock_weekly_report.main()`,
+`generate_dashboard_data.main()` 을 가짜 시세 제공자(sim_market)와 로컬
+SMTP/Slack 대역(standins) 위에서 100/1k/10k 종목 유니버스로 실행하고
+결과를 JSON 으로 저장합니다. 커밋 간 결과를 비교해 성능 회귀를 찾습니다.
+
+사용 예:
+    python bench/run_bench.py                          # 100,1000,10000 종목
+    python bench/run_bench.py --sizes 100 --latency-ms 5 --error-rate 0.02
+    python bench/run_bench.py --compare latest         # 직전 결과 대비 비교
+
+모든 실행 전에 import-time 예산을 검사합니다: 네 모듈(stock_alert CLI 와 세 스크립트)
+import 에 --import-budget-ms 이상 걸리거나 yfinance/pandas/NumPy 가 로드되면 exit 1.
+
+결과: bench/results/<시각>-<커밋>.json
+{
+  "commit", "created_at", "python", "params": {...},
+  "runs": [{"scenario","size","seconds","spans","calls","emails","slack_posts",
+            "peak_kb"}, ...]
+}
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import platform
+import datetime
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+sys.path.insert(0, str(ROOT / "src"))
+
+import sim_market
+import standins
+
+DOMAINS = ["AI", "IT", "SW", "로봇", "전력", "바이오", "ETF", "기타"]
+SUFFIXES = ["", "", "", ".KS", ".KQ", ".T", ".HK"]
+
+
+def make_universe(n: int):
+    """결정적인 n 종목 유니버스. 약 3% 하한 돌파, 2% 상한 돌파 상태로 생성."""
+    rows = []
+    for i in range(n):
+        tkr = f"S{i:05d}{SUFFIXES[i % len(SUFFIXES)]}"
+        p = sim_market.base_price(tkr)
+        if i % 33 == 0:
+            down, up = p * 1.05, p * 1.5
+        elif i % 50 == 1:
+            down, up = p * 0.5, p * 0.95
+        else:
+            down, up = p * 0.5, p * 1.5
+        rows.append(f"{DOMAINS[i % len(DOMAINS)]}, Sim {i}, {tkr}, {down:.2f}, {up:.2f}, simulated")
+    return "\n".join(rows) + "\n"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _scenarios(base: Path):
+    import multi_stock_alert as alert
+    import stock_weekly_report as weekly
+    import generate_dashboard_data as dashboard
+
+    data = base / "data"
+    cassette = base / "alert.json.gz"
+    alert_paths = mock.patch.multiple(
+        alert, CONFIG_PATH=data / "config.txt", STOCKS_PATH=data / "stock.txt",
+        STATE_PATH=data / "state.json", HISTORY_PATH=data / "history.json",
+        TICKS_DIR=data / "ticks", PORTFOLIOS_PATH=data / "portfolios.json",
+        RULES_PATH=data / "rules.txt", RULES_CACHE_PATH=data / "rules_cache.json", BARS_DIR=data / "bars")
+    weekly_paths = mock.patch.multiple(
+        weekly, BASE_DIR=base, STOCK_TXT_PATH=data / "stock.txt", TICKS_DIR=data / "ticks",
+        BARS_DIR=data / "bars")
+    dashboard_paths = mock.patch.multiple(
+        dashboard, STOCKS_PATH=data / "stock.txt", NEWS_CACHE_PATH=data / "news_cache.json",
+        TICKS_DIR=data / "ticks", BARS_DIR=data / "bars",
+        OUT_DIR=base / "docs", OUT_PATH=base / "docs" / "history.json",
+        SERIES_DIR=base / "docs" / "series")
+    return [
+        ("alert", alert_paths, alert.main),
+        ("alert_warm", alert_paths, alert.main),   # state.json 이 있는 두 번째 실행
+        # 세 번째 실행을 카세트로 기록하고, 같은 실행을 네트워크/지연 없이 재생 (cassette.py)
+        ("alert_record", alert_paths, lambda: alert.record(cassette)),
+        ("alert_replay", alert_paths, lambda: alert.replay(cassette)),
+        ("weekly", weekly_paths, weekly.main),
+        ("dashboard", dashboard_paths, dashboard.main),
+    ]
+
+
+HEAVY_MODULES = ("yfinance", "pandas", "numpy", "requests")
+IMPORT_PROBE = (
+    "import sys, time; t = time.perf_counter(); "
+    "import stock_alert, multi_stock_alert, stock_weekly_report, generate_dashboard_data; "
+    "dt = time.perf_counter() - t; "
+    f"print(dt, ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+)
+
+
+def measure_imports(repeat: int = 5) -> dict:
+    """새 인터프리터에서 모듈 import 시간 측정 (최솟값) 및 무거운 모듈 로드 여부."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    best, heavy = None, []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=env, cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.split()
+        dt = float(out[0])
+        heavy = out[1].split(",") if len(out) > 1 else []
+        best = dt if best is None else min(best, dt)
+    return {"scenario": "import", "size": 0, "seconds": round(best, 4), "heavy": heavy}
+
+
+def run_size(size: int, args) -> list:
+    import metrics
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, standins.SlackServer() as slack:
+        base = Path(tmp)
+        data = base / "data"
+        data.mkdir()
+        (data / "stock.txt").write_text(make_universe(size), encoding="utf-8")
+        (data / "email.json").write_text(json.dumps({
+            "smtp_host": "127.0.0.1", "smtp_port": 587, "smtp_user": "bench@example.com",
+            "sender": "bench@example.com", "receivers": ["owner@example.com"],
+        }), encoding="utf-8")
+        # 전 종목 대상 규칙 (rules.py): 기준값 계산/캐시와 규칙별 배열 판정 비용을 함께 잰다.
+        (data / "rules.txt").write_text("*, change <= -5\n*, cross_above ma10\n*, new_high 52\n",
+                                        encoding="utf-8")
+        env = {
+            "PATH": os.environ.get("PATH", ""), "HOME": os.environ.get("HOME", ""),
+            "SMTP_PASS": "bench", "SLACK_WEBHOOK_URL": slack.url, "TZ": "Asia/Seoul",
+            "HISTORY_MODE": "on", "STOCK_ALERT_METRICS_DIR": str(base / "metrics"),
+        }
+
+        for name, paths, fn in _scenarios(base):
+            market = sim_market.FakeMarket(args.latency_ms, args.error_rate,
+                                           args.delisted_rate, seed=size)
+            slack.posts.clear()
+            sink = io.StringIO()
+            with paths, mock.patch.dict(os.environ, env, clear=True), \
+                    mock.patch.object(sys, "argv", [name]), \
+                    sim_market.install(market), standins.fake_smtp() as smtp, \
+                    contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+                if args.memory:
+                    tracemalloc.start()
+                t0 = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - t0
+                peak = None
+                if args.memory:
+                    peak = tracemalloc.get_traced_memory()[1] // 1024
+                    tracemalloc.stop()
+                emails = len(smtp.sent)
+            snap = metrics.snapshot()
+            results.append({
+                "scenario": name, "size": size, "seconds": round(elapsed, 4),
+                "spans": {k: v["seconds"] for k, v in snap["spans"].items()},
+                "calls": market.calls, "emails": emails,
+                "slack_posts": len(slack.posts), "peak_kb": peak,
+            })
+            print(f"  {name:<12} n={size:<6} {elapsed:8.3f}s  calls={market.calls:<6} "
+                  f"emails={emails} slack={len(slack.posts)}"
+                  + (f" peak={peak}KB" if peak is not None else ""))
+    return results
+
+
+def latest_result(exclude=None):
+    files = sorted(p for p in RESULTS_DIR.glob("*.json") if p != exclude)
+    return files[-1] if files else None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """(scenario, size) 별 소요 시간 비교. tolerance 배 이상 느려지면 회귀로 보고."""
+    base = {(r["scenario"], r["size"]): r for r in baseline.get("runs", [])}
+    regressions = []
+    for r in current["runs"]:
+        b = base.get((r["scenario"], r["size"]))
+        if not b or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        mark = "REGRESSION" if ratio > tolerance else ""
+        print(f"  {r['scenario']:<12} n={r['size']:<6} {b['seconds']:8.3f}s -> "
+              f"{r['seconds']:8.3f}s  x{ratio:.2f} {mark}")
+        if mark:
+            regressions.append((r["scenario"], r["size"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="stock-alert end-to-end benchmarks")
+    ap.add_argument("--sizes", default="100,1000,10000",
+                    help="쉼표로 구분한 유니버스 크기 (기본: 100,1000,10000)")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="제공자 호출당 지연(ms)")
+    ap.add_argument("--error-rate", type=float, default=0.01, help="호출당 일시 오류 확률")
+    ap.add_argument("--delisted-rate", type=float, default=0.01, help="항상 실패하는 종목 비율")
+    ap.add_argument("--memory", action="store_true", help="tracemalloc 으로 최대 메모리 측정")
+    ap.add_argument("--out", help="결과 JSON 경로 (기본: bench/results/<시각>-<커밋>.json)")
+    ap.add_argument("--compare", help="비교할 기준 결과 JSON 경로 또는 'latest'")
+    ap.add_argument("--tolerance", type=float, default=1.25,
+                    help="회귀 판정 배율 (기본 1.25 = 25%% 이상 느려지면 실패)")
+    ap.add_argument("--import-budget-ms", type=float, default=150.0,
+                    help="CLI/스크립트 모듈 import 시간 예산 (기본 150ms)")
+    args = ap.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    commit = git_commit()
+    print(f"[bench] commit={commit} sizes={sizes} latency={args.latency_ms}ms "
+          f"error_rate={args.error_rate} delisted_rate={args.delisted_rate}")
+
+    imp = measure_imports()
+    over_budget = imp["seconds"] * 1000 > args.import_budget_ms or bool(imp["heavy"])
+    print(f"  import       {imp['seconds'] * 1000:8.1f}ms (예산 {args.import_budget_ms:g}ms)"
+          + (f"  heavy={','.join(imp['heavy'])}" if imp["heavy"] else "")
+          + ("  OVER BUDGET" if over_budget else ""))
+
+    runs = [imp]
+    for size in sizes:
+        runs += run_size(size, args)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    result = {
+        "commit": commit,
+        "created_at": now.isoformat(),
+        "python": platform.python_version(),
+        "params": {"sizes": sizes, "latency_ms": args.latency_ms, "error_rate": args.error_rate,
+                   "delisted_rate": args.delisted_rate, "memory": args.memory,
+                   "import_budget_ms": args.import_budget_ms},
+        "runs": runs,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{now:%Y%m%d-%H%M%S}-{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"[bench] 결과 저장: {out}")
+
+    status = 1 if over_budget else 0
+    if args.compare:
+        ref = latest_result(exclude=out) if args.compare == "latest" else Path(args.compare)
+        if ref is None or not ref.exists():
+            print("[bench] 비교할 기준 결과가 없습니다.")
+            return status
+        print(f"[bench] 기준 결과와 비교: {ref}")
+        baseline = json.loads(ref.read_text(encoding="utf-8"))
+        if compare(result, baseline, args.tolerance):
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulated market for benchmarks
+===============================
+`yfinance.Ticker` 를 대체하는 가짜 시세 제공자. 네트워크 없이 결정적인(deterministic)
+가격/이력/뉴스를 돌려주며, 호출마다 지연(latency)과 오류율(error rate)을 흉내 냅니다.
+
+- 종목별 기준가는 티커 해시로 정해지므로 실행마다 동일합니다.
+- `delisted_rate` 비율의 종목은 항상 실패(상장폐지/미지원 종목 흉내),
+  `error_rate` 는 호출 단위의 일시적 오류 확률입니다.
+- `install(market)` 컨텍스트 안에서는 `yfinance.Ticker` 와 `yfinance.download` 가 교체됩니다.
+"""
+import time
+import random
+import zlib
+import contextlib
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+
+def base_price(ticker: str) -> float:
+    h = zlib.crc32(ticker.encode("utf-8"))
+    return round(10.0 + (h % 100000) / 10.0, 2)
+
+
+# (period, interval) -> (bar 개수, pandas freq)
+_SHAPES = {
+    ("5y", "1wk"): (260, "W-MON"),
+    ("1y", "1d"): (252, "B"),
+    ("5d", "1d"): (5, "B"),
+    ("1d", "1m"): (390, "min"),
+    ("1d", "5m"): (78, "5min"),
+}
+
+
+class MarketError(RuntimeError):
+    pass
+
+
+class FakeMarket:
+    def __init__(self, latency_ms=0.0, error_rate=0.0, delisted_rate=0.0, seed=0):
+        self.latency = latency_ms / 1000.0
+        self.error_rate = error_rate
+        self.delisted_rate = delisted_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def is_delisted(self, ticker: str) -> bool:
+        return (zlib.crc32(b"d" + ticker.encode("utf-8")) % 10000) < self.delisted_rate * 10000
+
+    def call(self, ticker: str):
+        """공통 호출 비용: 지연 + 오류 주입."""
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.is_delisted(ticker):
+            raise MarketError(f"{ticker}: No data found, symbol may be delisted")
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise MarketError(f"{ticker}: simulated transient error")
+
+    def price(self, ticker: str) -> float:
+        return base_price(ticker)
+
+    def bars(self, ticker: str, period: str, interval: str) -> pd.DataFrame:
+        n, freq = _SHAPES.get((period, interval), (30, "B"))
+        end = pd.Timestamp("2026-08-21")
+        idx = pd.date_range(end=end, periods=n, freq=freq)
+        seed = zlib.crc32(f"{ticker}|{period}|{interval}".encode("utf-8"))
+        steps = np.random.default_rng(seed).normal(0.0, 0.02, n)
+        close = self.price(ticker) * np.exp(np.cumsum(steps[::-1]))[::-1]
+        close = close / close[-1] * self.price(ticker)
+        return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99,
+                             "Close": close, "Volume": np.full(n, 1000.0)}, index=idx)
+
+    def download(self, tickers, start=None, end=None, interval="5m", **kwargs) -> pd.DataFrame:
+        """yf.download(group_by="column") 흉내: 호출 1회, 종목별 분봉 Low/High 열."""
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp.now(tz="UTC")
+        start = pd.Timestamp(start) if start is not None else end - pd.Timedelta(hours=1)
+        idx = pd.date_range(start=start, end=end, freq=interval.replace("m", "min"),
+                            inclusive="left")
+        frames = {}
+        for tkr in tickers:
+            if self.is_delisted(tkr) or not len(idx):
+                continue
+            seed = zlib.crc32(f"{tkr}|{interval}".encode("utf-8"))
+            wiggle = np.random.default_rng(seed).normal(0.0, 0.005, len(idx))
+            mid = self.price(tkr) * (1.0 + wiggle)
+            frames[("High", tkr)] = mid * 1.002
+            frames[("Low", tkr)] = mid * 0.998
+        return pd.DataFrame(frames, index=idx)
+
+    def news(self, ticker: str):
+        shared = {"title": "Markets rally on AI spending", "publisher": "Wire",
+                  "link": "https://example.com/markets-rally", "providerPublishTime": 1755700000}
+        own = {"title": f"{ticker} beats estimates", "publisher": "Wire",
+               "link": f"https://example.com/{ticker}/earnings", "providerPublishTime": 1755600000}
+        return [shared, own]
+
+
+class _FastInfo:
+    def __init__(self, market, ticker):
+        self._m = market; self._t = ticker
+
+    @property
+    def last_price(self):
+        self._m.call(self._t)
+        return self._m.price(self._t)
+
+    currency = "USD"
+    year_high = None
+    year_low = None
+    market_cap = None
+
+
+class FakeTicker:
+    def __init__(self, market, ticker, session=None):
+        self._m = market
+        self.ticker = ticker
+        self.fast_info = _FastInfo(market, ticker)
+
+    @property
+    def info(self):
+        self._m.call(self.ticker)
+        p = self._m.price(self.ticker)
+        return {"regularMarketPrice": p, "regularMarketPreviousClose": round(p * 0.99, 4),
+                "currency": "USD", "sector": "Technology", "industry": "Software"}
+
+    def history(self, period="1mo", interval="1d", **kwargs):
+        self._m.call(self.ticker)
+        return self._m.bars(self.ticker, period, interval)
+
+    @property
+    def news(self):
+        self._m.call(self.ticker)
+        return self._m.news(self.ticker)
+
+
+@contextlib.contextmanager
+def install(market: FakeMarket):
+    import yfinance
+    with mock.patch.object(yfinance, "Ticker", lambda t, session=None: FakeTicker(market, t)), \
+            mock.patch.object(yfinance, "download", market.download):
+        yield market
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local SMTP / Slack stand-ins for benchmarks
+===========================================
+- FakeSMTP: smtplib.SMTP / SMTP_SSL 대체. STARTTLS/로그인을 흉내 내고 발송된
+  메시지를 메모리에 기록합니다 (외부 메일 서버 불필요).
+- SlackServer: 127.0.0.1 의 임의 포트에서 Slack Incoming Webhook 을 흉내 내는
+  HTTP 서버. `url` 을 SLACK_WEBHOOK_URL 로 넘기면 실제 HTTP 요청이 로컬로 옵니다.
+"""
+import json
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+
+class FakeSMTP:
+    sent = []          # [(from, [to...], raw_message)]
+    sessions = 0
+
+    def __init__(self, host=None, port=None, *args, **kwargs):
+        FakeSMTP.sessions += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def ehlo(self, *a, **k): return (250, b"ok")
+    def starttls(self, *a, **k): return (220, b"ok")
+    def login(self, *a, **k): return (235, b"ok")
+    def quit(self): return (221, b"bye")
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        FakeSMTP.sent.append((from_addr, list(to_addrs), msg))
+        return {}
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        FakeSMTP.sent.append((from_addr or msg["From"], to_addrs or [msg["To"]], msg.as_string()))
+        return {}
+
+    @classmethod
+    def reset(cls):
+        cls.sent = []
+        cls.sessions = 0
+
+
+@contextlib.contextmanager
+def fake_smtp():
+    import smtplib
+    FakeSMTP.reset()
+    with mock.patch.object(smtplib, "SMTP", FakeSMTP), \
+            mock.patch.object(smtplib, "SMTP_SSL", FakeSMTP):
+        yield FakeSMTP
+
+
+class _SlackHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(n)
+        try:
+            self.server.posts.append(json.loads(body or b"null"))
+        except ValueError:
+            self.server.posts.append(body)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class SlackServer:
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _SlackHandler)
+        self.httpd.posts = []
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/services/bench"
+
+    @property
+    def posts(self):
+        return self.httpd.posts
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
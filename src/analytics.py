@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-ticker analytics
+====================
+대시보드용 지표를 봉 저장소(barstore.py)의 종가로 한 번에 계산합니다.
+종목마다 자기 봉만 최근 봉 기준으로 오른쪽 정렬한 행렬(종목 × 봉, bars_matrix)을 만들어 NumPy 로
+벡터화 계산하고, 결과는 종목별 봉 수/마지막 일자/마지막 종가를 키로 캐시해 봉이 바뀐 종목만 다시
+계산합니다.
+
+지표 (interval 단위, 기본 주봉):
+  ma        {"10": 10봉 이동평균, "40": 40봉 이동평균} (봉이 N개 미만이면 None)
+  mdd_pct   전체 구간 최대 낙폭 (%; 음수)
+  vol_pct   최근 1년 로그수익률의 연율화 변동성 (%)
+  pct_52w   최근 1년 종가 중 현재 종가보다 낮은 비율 (0~100)
+임계값 거리(dist_down_pct/dist_up_pct)는 현재가/임계값이 매 실행 바뀌므로 캐시하지 않고
+with_thresholds() 로 따로 붙입니다.
+
+캐시 파일: data/bars/<interval>.analytics.json  {"<ticker>": {"key": [버전, n, day, close], "stats": {...}}}
+  (계산 방식이 바뀌면 KEY_VERSION 을 올려 이전 캐시 값을 모두 다시 계산한다)
+"""
+import json
+import math
+import warnings
+from pathlib import Path
+
+MA_WINDOWS = (10, 40)
+PERIODS_PER_YEAR = {"1d": 252, "5d": 52, "1wk": 52, "1mo": 12, "3mo": 4}
+KEY_VERSION = 2   # 2: 종목 자기 봉만으로 계산 (1: 날짜 합집합 forward fill 행렬)
+
+
+def cache_path(bars_dir: Path, interval: str) -> Path:
+    return Path(bars_dir) / f"{interval}.analytics.json"
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: Path, cache: dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, separators=(",", ":")), encoding="utf-8")
+
+
+def _key(store, ticker):
+    n = store.count(ticker)
+    if not n:
+        return None
+    return [KEY_VERSION, n, store.column(ticker, "day")[n - 1], store.column(ticker, "close")[n - 1]]
+
+
+def _round(v, digits=4):
+    return None if v is None or not math.isfinite(v) else round(float(v), digits)
+
+
+def aligned_matrix(store, tickers, field: str = "close"):
+    """
+    종목별 field 를 날짜 합집합으로 정렬한 (종목 × 봉) 행렬. 상장 전은 NaN, 중간 공백은 직전 값.
+    반환: (일자 ordinal 축, 행렬)
+    """
+    import numpy as np
+
+    days = [np.asarray(store.column(t, "day")) for t in tickers]
+    axis = np.unique(np.concatenate(days)) if days else np.empty(0)
+    mat = np.full((len(tickers), len(axis)), np.nan)
+    for row, (t, d) in enumerate(zip(tickers, days)):
+        mat[row, np.searchsorted(axis, d)] = np.asarray(store.column(t, field))
+    # forward fill: 각 칸에서 마지막으로 값이 있던 열 번호를 누적 최대로 구해 가져온다.
+    valid = ~np.isnan(mat)
+    idx = np.where(valid, np.arange(mat.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = mat[np.arange(mat.shape[0])[:, None], idx]
+    filled[np.cumsum(valid, axis=1) == 0] = np.nan
+    return axis, filled
+
+
+def bars_matrix(store, tickers, field: str = "close"):
+    """
+    종목별 자기 봉만 최근 봉을 마지막 열에 맞춰 쌓은 (종목 × 봉) 행렬. 봉이 모자란 앞쪽은 NaN.
+    같은 열이라도 종목마다 날짜가 다를 수 있지만, 최근 N봉 창은 함께 계산한 종목과 무관하다.
+    """
+    import numpy as np
+
+    counts = [store.count(t) for t in tickers]
+    mat = np.full((len(tickers), max(counts, default=0)), np.nan)
+    for row, (t, n) in enumerate(zip(tickers, counts)):
+        if n:
+            mat[row, -n:] = np.asarray(store.column(t, field))
+    return mat
+
+
+def compute(mat, interval: str = "1wk"):
+    """bars_matrix() 결과 → 행마다 지표 dict 목록."""
+    import numpy as np
+
+    rows, cols = mat.shape
+    if not rows or not cols:
+        return [{} for _ in range(rows)]
+    year = PERIODS_PER_YEAR.get(interval, 52)
+    last = mat[:, -1]
+    # 상장 기간이 짧은 종목은 구간이 비거나 표본이 1개라 nan* 경고가 나므로 조용히 NaN 으로 둔다.
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        ma = {w: np.where(np.sum(~np.isnan(mat[:, -w:]), axis=1) == w, np.nanmean(mat[:, -w:], axis=1),
+                          np.nan) if cols >= w else np.full(rows, np.nan)
+              for w in MA_WINDOWS}
+        peak = np.fmax.accumulate(mat, axis=1)
+        mdd = np.nanmin(mat / peak - 1.0, axis=1) * 100.0
+        rets = np.diff(np.log(mat[:, -(year + 1):]), axis=1)
+        n_rets = np.sum(~np.isnan(rets), axis=1)
+        vol = np.where(n_rets >= 2, np.nanstd(rets, axis=1, ddof=1), np.nan) * math.sqrt(year) * 100.0
+        window = mat[:, -year:]
+        n_win = np.sum(~np.isnan(window), axis=1)
+        pct = np.where(n_win > 0, np.sum(window < last[:, None], axis=1) / np.maximum(n_win, 1) * 100.0,
+                       np.nan)
+    out = []
+    for i in range(rows):
+        out.append({"ma": {str(w): _round(ma[w][i]) for w in MA_WINDOWS},
+                    "mdd_pct": _round(mdd[i], 2), "vol_pct": _round(vol[i], 2),
+                    "pct_52w": _round(pct[i], 1)})
+    return out
+
+
+def update(store, tickers, cache: dict, interval: str = "1wk"):
+    """
+    봉이 바뀐 종목만 다시 계산해 cache 를 갱신한다. 저장소에 없는 종목은 결과와 캐시에서 빠진다.
+    반환: ({ticker: stats}, 재계산한 종목 수)
+    """
+    keys = {t: _key(store, t) for t in tickers}
+    dirty = [t for t, k in keys.items() if k is not None and (cache.get(t) or {}).get("key") != k]
+    if dirty:
+        for t, stats in zip(dirty, compute(bars_matrix(store, dirty), interval)):
+            cache[t] = {"key": keys[t], "stats": stats}
+    for t in [t for t in cache if keys.get(t) is None]:
+        del cache[t]
+    return {t: cache[t]["stats"] for t in tickers if t in cache}, len(dirty)
+
+
+def with_thresholds(stats: dict, current, down, up) -> dict:
+    """캐시된 지표에 현재가 기준 하한/상한까지의 거리(%)를 붙인 사본."""
+    out = dict(stats)
+    if current:
+        out["dist_down_pct"] = _round((current - down) / down * 100.0, 2) if down else None
+        out["dist_up_pct"] = _round((up - current) / current * 100.0, 2) if up else None
+    return out
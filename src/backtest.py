@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Threshold policy backtest
+=========================
+봉 저장소(barstore.py, 대시보드가 받아 둔 5년 주봉)의 가격을 시간 순으로 재생하며, 알림 판정
+(multi_stock_alert.evaluate)과 같은 규칙 — 하한/상한 도달, ALERT_ON_CROSS*_ONLY, RATE_LIMITS
+정책, 발송 후 UPDATE_THRESHOLD_*_PERCENT 만큼 임계값 이동 — 을 여러 퍼센트 조합에 동시에 적용합니다.
+
+    python src/stock_alert.py backtest --down 5,10,15,20 --up 5,10,15,20
+    python src/stock_alert.py backtest --down 5:30:5 --up 5:30:5 --range --relative --json out.json
+
+- 임계값 비교/이동은 (조합 × 종목) 배열로 벡터화하고, rate-limit 판정만 후보가 있는 종목을
+  stock.txt 순서(종목마다 down → up)로 훑어 global/domain 한도가 실제 실행과 같은 순서로 소진됩니다.
+- 봉 하나가 실행 1회에 해당합니다. 여러 종목의 봉을 날짜 합집합 축에 맞추지만, 각 종목은 자기 봉이
+  있는 열에서만 판정되고(다른 종목 날짜의 forward fill 값은 재생하지 않음) 알림 후 수익률도 자기 봉
+  HORIZON 개 뒤로 계산합니다. 봉 간격이 하루 이상이므로 DAILY_DEDUP 은 결과에 영향이 없고,
+  interval/window/bucket 정책은 봉 시각(일자 00:00 UTC) 기준으로 계산됩니다.
+- 여러 단계 사다리(ladder.py)는 현재가에 가장 가까운 단계(down/up)만 재생합니다.
+- --range 는 종가 대신 봉의 저가/고가로 도달을 판정합니다 (INTRABAR_MODE 와 같은 효과).
+- --relative 는 stock.txt 임계값을 첫 봉 시점의 가격 비율로 옮겨 시작합니다 (현재 임계값은 최근
+  가격 기준이라 5년 전 가격에는 맞지 않으므로).
+
+결과는 조합마다 발송 수(하한/상한), rate-limit 으로 생략된 수, 알림 후 HORIZON 봉 수익률 평균입니다.
+"""
+import sys
+import json
+import math
+import datetime
+import argparse
+
+import analytics
+import barstore
+import ratelimit
+
+HORIZON = 4          # 알림 후 수익률을 볼 봉 수 (주봉 기준 약 한 달)
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+class VecPolicy:
+    """ratelimit.Policy 1개를 조합 축(G)으로 벡터화한 판정기. 키별 상태를 (G,) 배열로 보관."""
+
+    def __init__(self, policy, grid: int):
+        self.p = policy
+        self.g = grid
+        self.state = {}
+
+    def key(self, ticker, direction, domain):
+        scope = self.p.scope
+        if scope == "alert":
+            return f"{ticker}|{direction}"
+        if scope == "ticker":
+            return ticker
+        if scope == "domain":
+            return domain
+        return ""
+
+    def _entry(self, key):
+        import numpy as np
+        entry = self.state.get(key)
+        if entry is None:
+            p, g = self.p, self.g
+            if p.kind == "daily":
+                entry = [np.full(g, -1), np.zeros(g)]
+            elif p.kind == "interval":
+                entry = [np.full(g, -np.inf)]
+            elif p.kind == "window":
+                entry = [np.full((g, max(1, p.limit)), -np.inf)]
+            else:
+                entry = [np.full(g, p.limit * 1000.0), np.full(g, -np.inf)]
+            self.state[key] = entry
+        return entry
+
+    def _tokens(self, entry, now):
+        import numpy as np
+        p = self.p
+        with np.errstate(invalid="ignore"):
+            refill = np.floor((now - entry[1]) * p.limit * 1000 / max(1, p.period))
+        return np.minimum(p.limit * 1000.0, entry[0] + np.nan_to_num(refill, posinf=p.limit * 1000.0))
+
+    def allow(self, key, now, day):
+        import numpy as np
+        p = self.p
+        entry = self._entry(key)
+        if p.kind == "interval":
+            return now - entry[0] >= p.period
+        if p.limit <= 0:
+            return np.zeros(self.g, bool)
+        if p.kind == "daily":
+            return (entry[0] != day) | (entry[1] < p.limit)
+        if p.kind == "window":
+            return now - entry[0].min(axis=1) >= p.period
+        return self._tokens(entry, now) >= 1000
+
+    def commit(self, key, mask, now, day):
+        import numpy as np
+        p = self.p
+        entry = self._entry(key)
+        if p.kind == "daily":
+            entry[1] = np.where(mask, np.where(entry[0] == day, entry[1] + 1, 1), entry[1])
+            entry[0] = np.where(mask, day, entry[0])
+        elif p.kind == "interval":
+            entry[0] = np.where(mask, now, entry[0])
+        elif p.kind == "window":
+            ring = entry[0]
+            rows = np.arange(self.g)
+            oldest = ring.argmin(axis=1)
+            ring[rows, oldest] = np.where(mask, now, ring[rows, oldest])
+        else:
+            tokens = self._tokens(entry, now)
+            entry[0] = np.where(mask, tokens - 1000, entry[0])
+            entry[1] = np.where(mask, now, entry[1])
+
+
+def bar_mask(store, tickers, days):
+    """(종목 × days) bool 행렬: 그 종목의 실제 봉이 있는 칸만 True (aligned_matrix 의 채운 칸은 False)."""
+    import numpy as np
+
+    mask = np.zeros((len(tickers), len(days)), bool)
+    for row, t in enumerate(tickers):
+        mask[row, np.searchsorted(days, np.asarray(store.column(t, "day")))] = True
+    return mask
+
+
+def _forward_returns(closes, mask, horizon):
+    """종목마다 자기 봉 horizon 개 뒤 종가 대비 수익률 (봉 위치에만, 나머지는 NaN)."""
+    import numpy as np
+
+    fwd = np.full_like(closes, np.nan)
+    if not horizon:
+        return fwd
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for row in range(closes.shape[0]):
+            idx = np.flatnonzero(mask[row])
+            if len(idx) > horizon:
+                fwd[row, idx[:-horizon]] = closes[row, idx[horizon:]] / closes[row, idx[:-horizon]] - 1.0
+    return fwd
+
+
+def simulate(closes, days, stocks, down_pcts, up_pcts, policies=(), lows=None, highs=None,
+             crossdown_only=False, crossup_only=False, relative=False, horizon=HORIZON, mask=None):
+    """
+    closes/lows/highs: (종목 × 봉) 행렬 (analytics.aligned_matrix), days: 봉 일자 ordinal.
+    mask: 실제 봉이 있는 칸 (bar_mask). 없으면 closes 의 NaN 이 아닌 칸 전부.
+    stocks: closes 행 순서의 stock.txt 항목. 반환: 조합별 결과 dict 목록.
+    """
+    import numpy as np
+
+    n, t_len = closes.shape
+    if mask is None:
+        mask = ~np.isnan(closes)
+    dp, up = (a.ravel() for a in np.meshgrid(np.asarray(down_pcts, float), np.asarray(up_pcts, float),
+                                             indexing="ij"))
+    g = dp.size
+    lows = closes if lows is None else lows
+    highs = closes if highs is None else highs
+
+    dth0 = np.array([np.nan if s["down"] is None else s["down"] for s in stocks], float)
+    uth0 = np.array([np.nan if s["up"] is None else s["up"] for s in stocks], float)
+    if relative and t_len:
+        first = np.array([row[~np.isnan(row)][0] if (~np.isnan(row)).any() else np.nan
+                          for row in closes])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = first / closes[:, -1]
+        dth0, uth0 = dth0 * scale, uth0 * scale
+    dth = np.tile(dth0, (g, 1))
+    uth = np.tile(uth0, (g, 1))
+    last = np.full((g, n), np.nan)
+
+    fwd = _forward_returns(closes, mask, horizon)
+
+    vec = [VecPolicy(p, g) for p in policies]
+    keys = [[[v.key(s["ticker"], d, s.get("loc", "")) for v in vec] for d in ("down", "up")]
+            for s in stocks]
+    sent = {"down": np.zeros(g), "up": np.zeros(g)}
+    limited = np.zeros(g)
+    ret_sum = {"down": np.zeros(g), "up": np.zeros(g)}
+    ret_n = {"down": np.zeros(g), "up": np.zeros(g)}
+
+    for t in range(t_len):
+        price = closes[:, t]
+        valid = mask[:, t] & ~np.isnan(price)
+        if not valid.any():
+            continue
+        day = int(days[t])
+        now = float((day - _EPOCH_ORDINAL) * 86400)
+        with np.errstate(invalid="ignore"):
+            cand = {"down": valid & (lows[:, t] <= dth), "up": valid & (highs[:, t] >= uth)}
+            if crossdown_only:
+                cand["down"] &= last > dth
+            if crossup_only:
+                cand["up"] &= last < uth
+        admitted = {d: np.zeros((g, n), bool) for d in cand}
+        if vec and (cand["down"].any() or cand["up"].any()):
+            cols = np.flatnonzero(cand["down"].any(axis=0) | cand["up"].any(axis=0))
+            for i in cols:
+                for d_idx, d in enumerate(("down", "up")):
+                    want = cand[d][:, i]
+                    if not want.any():
+                        continue
+                    ok = want.copy()
+                    for v, k in zip(vec, keys[i][d_idx]):
+                        ok &= v.allow(k, now, day)
+                    for v, k in zip(vec, keys[i][d_idx]):
+                        v.commit(k, ok, now, day)
+                    admitted[d][:, i] = ok
+                    limited += want & ~ok
+        else:
+            admitted = cand
+
+        dth = np.where(admitted["down"], dth * (1.0 - dp[:, None] / 100.0), dth)
+        uth = np.where(admitted["up"], uth * (1.0 + up[:, None] / 100.0), uth)
+        last = np.where(valid, price, last)
+        for d in ("down", "up"):
+            sent[d] += admitted[d].sum(axis=1)
+            r = np.where(admitted[d], fwd[:, t], np.nan)
+            hit = ~np.isnan(r)
+            ret_sum[d] += np.where(hit, r, 0.0).sum(axis=1)
+            ret_n[d] += hit.sum(axis=1)
+
+    out = []
+    for k in range(g):
+        def avg(d):
+            return None if not ret_n[d][k] else round(float(ret_sum[d][k] / ret_n[d][k]) * 100.0, 2)
+        out.append({"down_pct": float(dp[k]), "up_pct": float(up[k]),
+                    "down_alerts": int(sent["down"][k]), "up_alerts": int(sent["up"][k]),
+                    "rate_limited": int(limited[k]),
+                    "fwd_after_down_pct": avg("down"), "fwd_after_up_pct": avg("up")})
+    return out
+
+
+def parse_grid(text: str):
+    """"5,10,15" 또는 "시작:끝:간격" (끝 포함) → [float]."""
+    text = (text or "").strip()
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 6) for i in range(max(count, 0))]
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def run(cfg, stocks, bars_dir, interval="1wk", down_pcts=None, up_pcts=None, use_range=False,
+        relative=False, since=None):
+    """설정/종목/봉 저장소로 simulate() 실행. 반환: (결과 목록, 재생한 종목 수, 봉 수)"""
+    import numpy as np
+
+    with barstore.open_store(bars_dir, interval) as store:
+        stocks = [s for s in stocks if s["ticker"] in store]
+        tickers = [s["ticker"] for s in stocks]
+        days, closes = analytics.aligned_matrix(store, tickers, "close")
+        mask = bar_mask(store, tickers, days)
+        lows = highs = None
+        if use_range:
+            lows = analytics.aligned_matrix(store, tickers, "low")[1]
+            highs = analytics.aligned_matrix(store, tickers, "high")[1]
+    if since is not None:
+        keep = days >= since.toordinal()
+        days, closes, mask = days[keep], closes[:, keep], mask[:, keep]
+        if use_range:
+            lows, highs = lows[:, keep], highs[:, keep]
+    results = simulate(
+        closes, days, stocks,
+        down_pcts or [cfg["UPDATE_THRESHOLD_DOWN_PERCENT"]], up_pcts or [cfg["UPDATE_THRESHOLD_UP_PERCENT"]],
+        ratelimit.parse(cfg["RATE_LIMITS"]), lows, highs,
+        crossdown_only=cfg.get("ALERT_ON_CROSSDOWN_ONLY", False),
+        crossup_only=cfg.get("ALERT_ON_CROSSUP_ONLY", False), relative=relative, mask=mask)
+    return results, len(stocks), int(np.size(days))
+
+
+def format_table(results, top=None):
+    rows = sorted(results, key=lambda r: (r["down_pct"], r["up_pct"]))
+    if top:
+        # 수익률이 없는 조합(None)만 뒤로 보낸다. 0.0% 는 실제 값이다.
+        rows = sorted(results, key=lambda r: (r["fwd_after_down_pct"] is None,
+                                              -(r["fwd_after_down_pct"] or 0.0)))[:top]
+    fmt = lambda v: "-" if v is None else f"{v:+.2f}%"
+    lines = [f"{'down%':>6} {'up%':>6} {'하한':>6} {'상한':>6} {'제한':>6} {'하한 후':>9} {'상한 후':>9}"]
+    for r in rows:
+        lines.append(f"{r['down_pct']:>6g} {r['up_pct']:>6g} {r['down_alerts']:>6} {r['up_alerts']:>6} "
+                     f"{r['rate_limited']:>6} {fmt(r['fwd_after_down_pct']):>9} {fmt(r['fwd_after_up_pct']):>9}")
+    return lines
+
+
+def add_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--down", help="하한 이동 비율 목록 (예: 5,10,15 또는 5:30:5). 기본: 설정값")
+    ap.add_argument("--up", help="상한 이동 비율 목록. 기본: 설정값")
+    ap.add_argument("--range", action="store_true", help="종가 대신 봉의 저가/고가로 도달 판정")
+    ap.add_argument("--relative", action="store_true", help="임계값을 첫 봉 가격 비율로 옮겨 시작")
+    ap.add_argument("--since", type=datetime.date.fromisoformat, help="이 날짜(YYYY-MM-DD) 이후 봉만")
+    ap.add_argument("--top", type=int, help="하한 알림 후 수익률 상위 N개 조합만 출력")
+    ap.add_argument("--json", metavar="PATH", help="결과를 JSON 으로 저장")
+
+
+def main(args, cfg, stocks, bars_dir, interval="1wk"):
+    t0 = datetime.datetime.now()
+    results, count, bars = run(cfg, stocks, bars_dir, interval, parse_grid(args.down),
+                               parse_grid(args.up), args.range, args.relative, args.since)
+    if not count:
+        print(f"[BACKTEST] {bars_dir} 에 봉 데이터가 없습니다 (dashboard 실행 후 생성됩니다).",
+              file=sys.stderr)
+        return 1
+    for line in format_table(results, args.top):
+        print(line)
+    secs = (datetime.datetime.now() - t0).total_seconds()
+    print(f"[BACKTEST] 종목 {count}개 × 봉 {bars}개 × 조합 {len(results)}개, {secs:.2f}초")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bar store
+=========
+대시보드가 받아 오는 장기 봉(기본 5년 주봉)을 보관하는 디스크 저장소.
+대시보드 JSON, 주간 리포트, 백테스트가 모두 이 저장소를 원본으로 읽습니다.
+
+파일 (interval 마다 한 쌍):
+  data/bars/<interval>.bars        고정폭 레코드 6×float64 = 48바이트
+                                   [일자 ordinal, open, high, low, close, volume]
+  data/bars/<interval>.index.json  {"fields": [...], "tickers": {"<ticker>": [시작 레코드, 개수]}}
+
+- 종목별 레코드는 연속 구간에 일자 오름차순으로 저장되고, 인덱스가 시작 위치를 가리킵니다.
+- 쓰기(BarWriter)는 종목을 조회하는 대로 임시 파일에 흘려 쓰고 commit() 에서 인덱스와 함께
+  교체하므로, 수집 중 메모리가 전체 유니버스 크기에 비례하지 않습니다.
+- 읽기(BarStore)는 파일을 mmap 하고 memoryview 로 캐스팅해, column() 이 복사 없이
+  (stride 로) 한 종목의 한 필드를 돌려줍니다.
+
+사용:
+    with barstore.BarWriter(BARS_DIR, "1wk") as w:
+        w.add("AAPL", [(date.toordinal(), o, h, l, c, v), ...])
+    with barstore.open_store(BARS_DIR, "1wk") as bars:
+        closes = bars.column("AAPL", "close")     # memoryview, 복사 없음
+        series = bars.series("AAPL")              # [["2021-07-05", 123.45], ...]
+"""
+import os
+import json
+import mmap
+import array
+import datetime
+from pathlib import Path
+
+FIELDS = ("day", "open", "high", "low", "close", "volume")
+WIDTH = len(FIELDS)
+RECORD_BYTES = WIDTH * 8
+_DATE_STR = {}   # 일자 ordinal → "YYYY-MM-DD" (종목 간 같은 날짜가 반복됨)
+
+
+def _paths(path: Path, interval: str):
+    path = Path(path)
+    return path / f"{interval}.bars", path / f"{interval}.index.json"
+
+
+class BarWriter:
+    """종목별 봉을 흘려 쓰고 commit() 에서 원자적으로 교체하는 작성기."""
+
+    def __init__(self, path: Path, interval: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.data_path, self.index_path = _paths(self.path, interval)
+        self._tmp = self.data_path.with_name(self.data_path.name + ".tmp")
+        self._fh = open(self._tmp, "wb")
+        self.index = {}
+        self.records = 0
+
+    def add(self, ticker: str, rows) -> int:
+        """rows: (일자 ordinal, open, high, low, close, volume) 일자 오름차순. 반환: 레코드 수."""
+        buf = array.array("d")
+        for row in rows:
+            buf.extend(row)
+        n = len(buf) // WIDTH
+        if n:
+            buf.tofile(self._fh)
+            self.index[ticker] = [self.records, n]
+            self.records += n
+        return n
+
+    def add_records(self, ticker: str, records) -> int:
+        """BarStore.records() 가 돌려준 레코드 view 를 그대로 복사 (조회 실패 종목 유지용)."""
+        n = len(records) // WIDTH
+        if n:
+            self._fh.write(records)
+            self.index[ticker] = [self.records, n]
+            self.records += n
+        return n
+
+    def commit(self):
+        self._fh.close()
+        tmp_index = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp_index.write_text(json.dumps({"fields": FIELDS, "tickers": self.index},
+                                        separators=(",", ":")), encoding="utf-8")
+        os.replace(self._tmp, self.data_path)
+        os.replace(tmp_index, self.index_path)
+
+    def abort(self):
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+class BarStore:
+    """mmap 기반 읽기 전용 봉 저장소. 파일이 없으면 빈 저장소."""
+
+    def __init__(self, path: Path, interval: str):
+        self.interval = interval
+        data_path, index_path = _paths(path, interval)
+        self.index = {}
+        self._mm = None
+        self._view = memoryview(array.array("d"))
+        if data_path.exists() and index_path.exists() and data_path.stat().st_size:
+            self.index = json.loads(index_path.read_text(encoding="utf-8")).get("tickers", {})
+            with open(data_path, "rb") as fh:
+                self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mm).cast("d")
+
+    def __contains__(self, ticker):
+        return ticker in self.index
+
+    def tickers(self):
+        return list(self.index)
+
+    def count(self, ticker) -> int:
+        return self.index.get(ticker, (0, 0))[1]
+
+    def column(self, ticker: str, field: str = "close"):
+        """한 종목의 한 필드 (memoryview, 복사 없음). 없는 종목이면 빈 view."""
+        if ticker not in self.index:
+            return memoryview(array.array("d"))
+        start, n = self.index[ticker]
+        f = FIELDS.index(field)
+        base = start * WIDTH + f
+        return self._view[base:base + n * WIDTH:WIDTH]
+
+    def records(self, ticker: str):
+        """한 종목의 전체 레코드 (memoryview, 길이 = 개수×6)."""
+        start, n = self.index.get(ticker, (0, 0))
+        return self._view[start * WIDTH:(start + n) * WIDTH]
+
+    def series(self, ticker: str, field: str = "close", digits: int = 4):
+        """대시보드용 [[YYYY-MM-DD, 값], ...]."""
+        out = []
+        days = self.column(ticker, "day")
+        values = self.column(ticker, field)
+        for d, v in zip(days, values):
+            s = _DATE_STR.get(d)
+            if s is None:
+                s = _DATE_STR[d] = datetime.date.fromordinal(int(d)).isoformat()
+            out.append([s, round(v, digits)])
+        return out
+
+    def close(self):
+        self._view.release()
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:   # 밖에서 잡고 있는 view 가 있으면 GC 에 맡긴다
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(path: Path, interval: str) -> BarStore:
+    return BarStore(path, interval)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cassettes
+=========
+알림 실행 1회의 외부 입출력을 압축 파일 하나(카세트)에 기록해 두었다가 네트워크 없이 그대로
+재생합니다. 문제가 된 실행을 시세가 바뀐 뒤에도 재현하고, 같은 카세트를 회귀/성능 측정 입력으로
+쓰기 위한 것입니다.
+
+    python src/stock_alert.py alert --record                  # data/cassettes/<실행 시각>.json.gz
+    python src/stock_alert.py alert --replay data/cassettes/20261019-090000.json.gz
+
+기록 (--record)
+  - 실행 시각과 실행 시작 시점의 입력 파일(config.txt, email.json, stock.txt, state.json,
+    history.json, portfolios.json 및 포트폴리오 디렉터리), 설정 관련 환경변수
+    (SMTP_PASS/SLACK_WEBHOOK_URL 은 값 대신 "***")
+  - 시세 소스 응답: (종목, 소스)별 [가격 또는 null, 소요 초] 를 호출 순서대로 (price_sources.read).
+    hedged 조회에서 답을 기다리지 않고 버린 호출은 [null, null]
+  - 분봉 일괄 조회 결과 (intrabar.fetch_ranges), 규칙 기준값 (rules.features)
+  - 발송 메시지: 메일 제목/수신자/본문 SHA-1, Slack 게시
+  실행이 실패해도 카세트는 저장됩니다.
+
+재생 (--replay)
+  - 입력 파일을 임시 디렉터리에 풀고 그 위에서 main() 을 다시 실행하므로 data/ 는 바뀌지 않습니다.
+  - 시계는 기록된 실행 시각으로 고정되고, yfinance 를 import 하지 않으며 기록된 응답을 대기 없이
+    돌려줍니다 (소스 지연 통계에는 기록된 소요 시간을 씁니다). 기록에 없는 조회는 실패로 처리합니다.
+  - 메일/Slack 은 보내지 않고 발송 목록을 기록과 비교해 일치 여부를 출력합니다.
+  - PRICE_HEDGE 실행은 재생 시 선호 소스가 항상 먼저 답하므로, 기록 당시 헤지로 다른 소스가
+    채택된 종목은 결과가 달라질 수 있습니다. --shard/--merge 와는 함께 쓸 수 없습니다.
+
+형식 (gzip JSON):
+  {"version": 1, "ts": "2026-10-19T09:00:00+09:00", "paths": {"STATE_PATH": "state.json", ...},
+   "files": {"stock.txt": "...", ...}, "env": {...},
+   "reads": {"AAPL|info": [[231.5, 0.412], ...]}, "ranges": [{"AAPL": [230.1, 232.0]}],
+   "extras": {"rules": [{"ma20": {"AAPL": 228.4}}]},
+   "outbox": [{"kind": "email", "subject": ..., "to": [...], "sha1": ...}]}
+"""
+import os
+import gzip
+import json
+import hashlib
+import datetime
+import threading
+import contextlib
+from pathlib import Path
+
+VERSION = 1
+SECRET_KEYS = ("SMTP_PASS", "SLACK_WEBHOOK_URL")
+ENV_EXTRA = ("CI", "GITHUB_ACTIONS")   # HISTORY_MODE=auto 판정에 쓰이는 변수
+
+_active = None
+
+
+class Ticker:
+    """재생용 자리표시 티커. price_sources 리더는 호출되지 않고 ticker 이름만 쓰인다."""
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+
+
+class Cassette:
+    def __init__(self, data: dict = None, replaying: bool = False):
+        data = data or {}
+        self.replaying = replaying
+        self.ts = data.get("ts")
+        self.paths = data.get("paths", {})
+        self.files = data.get("files", {})
+        self.env = data.get("env", {})
+        self.reads = data.get("reads", {})
+        self.ranges = data.get("ranges", [])
+        self.extras = data.get("extras", {})
+        self.recorded_outbox = data.get("outbox", [])
+        self.outbox = [] if replaying else self.recorded_outbox
+        self.misses = 0
+        self._cursor = {}
+        self._lock = threading.Lock()
+
+    # ---------- 입력 ----------
+    def capture(self, base: Path, paths: dict, files, env_keys):
+        """실행 입력 기록. paths: {상수 이름: Path}, files: 내용을 담을 Path 목록 (base 하위만)."""
+        base = Path(base)
+        for name, p in paths.items():
+            try:
+                self.paths[name] = Path(p).relative_to(base).as_posix()
+            except ValueError:   # base 밖의 경로도 재생 시에는 임시 디렉터리 안으로 옮긴다
+                self.paths[name] = Path(p).name
+        for p in files:
+            p = Path(p)
+            if not p.is_file():
+                continue
+            with contextlib.suppress(ValueError):
+                self.files[p.relative_to(base).as_posix()] = p.read_text(encoding="utf-8")
+        for key in list(env_keys) + list(ENV_EXTRA):
+            value = os.environ.get(key, "")
+            if value.strip():
+                self.env[key] = "***" if key in SECRET_KEYS else value
+
+    def restore(self, base: Path) -> dict:
+        """입력 파일을 base 아래에 풀고 {상수 이름: base 기준 Path} 를 돌려준다."""
+        base = Path(base)
+        for rel, text in self.files.items():
+            target = base / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(text, encoding="utf-8")
+        return {name: base / rel for name, rel in self.paths.items()}
+
+    @contextlib.contextmanager
+    def environ(self, env_keys):
+        """설정 관련 환경변수를 기록된 값으로 바꿔 두었다가 복원한다."""
+        keys = set(env_keys) | set(ENV_EXTRA)
+        saved = {k: os.environ.get(k) for k in keys}
+        try:
+            for k in keys:
+                os.environ.pop(k, None)
+            os.environ.update({k: v for k, v in self.env.items() if k in keys})
+            yield
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+    # ---------- 시계 / 응답 ----------
+    def clock(self, now: datetime.datetime) -> datetime.datetime:
+        if self.replaying:
+            return datetime.datetime.fromisoformat(self.ts).astimezone(now.tzinfo)
+        self.ts = now.isoformat()
+        return now
+
+    def put_read(self, ticker: str, source: str, price, seconds: float):
+        with self._lock:
+            self.reads.setdefault(f"{ticker}|{source}", []).append(
+                [price, None if seconds is None else round(seconds, 6)])
+
+    def take_read(self, ticker: str, source: str):
+        """기록된 다음 응답 (가격 또는 None, 소요 초). 기록이 없으면 (None, 0.0)."""
+        key = f"{ticker}|{source}"
+        with self._lock:
+            i = self._cursor.get(key, 0)
+            tape = self.reads.get(key, [])
+            if i >= len(tape):
+                self.misses += 1
+                return None, 0.0
+            self._cursor[key] = i + 1
+        price, seconds = tape[i]
+        return price, seconds
+
+    def put_ranges(self, ranges: dict):
+        self.ranges.append({t: list(v) for t, v in ranges.items()})
+
+    def take_ranges(self) -> dict:
+        i = self._cursor.get("#ranges", 0)
+        if i >= len(self.ranges):
+            self.misses += 1
+            return {}
+        self._cursor["#ranges"] = i + 1
+        return {t: tuple(v) for t, v in self.ranges[i].items()}
+
+    def put_extra(self, name: str, value):
+        """그 밖의 파생 입력 (JSON 값) 을 이름별로 호출 순서대로 기록한다."""
+        self.extras.setdefault(name, []).append(value)
+
+    def take_extra(self, name: str, default=None):
+        key = f"#extra:{name}"
+        i = self._cursor.get(key, 0)
+        tape = self.extras.get(name, [])
+        if i >= len(tape):
+            self.misses += 1
+            return default
+        self._cursor[key] = i + 1
+        return tape[i]
+
+    # ---------- 발송 ----------
+    def send(self, kind: str, subject: str = "", to=(), body: str = "") -> bool:
+        """발송 기록. 반환: 실제로 보내야 하는지 (재생 중이면 False)."""
+        self.outbox.append({"kind": kind, "subject": subject, "to": list(to),
+                            "sha1": hashlib.sha1(body.encode("utf-8")).hexdigest()})
+        return not self.replaying
+
+    # ---------- 파일 ----------
+    def to_dict(self) -> dict:
+        return {"version": VERSION, "ts": self.ts, "paths": self.paths, "files": self.files,
+                "env": self.env, "reads": self.reads, "ranges": self.ranges,
+                "extras": self.extras, "outbox": self.outbox}
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        if path.suffix != ".gz":   # 디렉터리가 주어지면 실행 시각으로 파일 이름을 정한다
+            stamp = datetime.datetime.fromisoformat(self.ts).strftime("%Y%m%d-%H%M%S") if self.ts \
+                else "unknown"
+            path = path / f"{stamp}.json.gz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        return path
+
+    def report(self) -> dict:
+        return {"reads": sum(len(v) for v in self.reads.values()), "misses": self.misses,
+                "outbox": self.outbox, "recorded_outbox": self.recorded_outbox,
+                "match": self.outbox == self.recorded_outbox}
+
+
+def load(path: Path) -> Cassette:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != VERSION:
+        raise ValueError(f"{path}: 지원하지 않는 카세트 버전 {data.get('version')}")
+    return Cassette(data, replaying=True)
+
+
+def active():
+    """기록/재생 중인 카세트. 평소에는 None 이라 hook 비용은 전역 조회 1회."""
+    return _active
+
+
+@contextlib.contextmanager
+def use(tape: Cassette):
+    global _active
+    _active = tape
+    try:
+        yield tape
+    finally:
+        _active = None
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Config
+======
+알림/주간 리포트/CLI 가 공유하는 설정 로더.
+
+우선순위(낮음→높음): 환경변수 < config.txt (KEY=VALUE) < data/email.json < SMTP 관련 환경변수.
+overlay_dir (포트폴리오 디렉터리, portfolios.py) 가 주어지면 그 디렉터리의 config.txt 와
+email.json 을 공통 파일 위에 덮어쓰고, 포트폴리오 수신자는 EMAIL_TO 환경변수보다 우선합니다.
+반환값은 값 타입이 정리된 dict 이며, 키와 타입은 `Config` 에 정리되어 있습니다.
+이 모듈은 표준 라이브러리만 사용하므로 yfinance/pandas 를 로드하지 않습니다.
+"""
+import os, sys, json
+from pathlib import Path
+from typing import TypedDict
+
+import ratelimit
+import recipients
+
+
+class Config(TypedDict, total=False):
+    SMTP_HOST: str
+    SMTP_PORT: int
+    SMTP_USER: str
+    SMTP_PASS: str
+    EMAIL_FROM: str
+    EMAIL_TO: str            # 쉼표로 구분한 수신자 목록
+    EMAIL_SUBSCRIPTIONS: dict   # {주소: (대상, ...)} email.json subscriptions (recipients.py)
+    TZ: str
+    DAILY_DEDUP: bool
+    ALERT_ON_CROSSDOWN_ONLY: bool
+    ALERT_ON_CROSSUP_ONLY: bool
+    SLACK_WEBHOOK_URL: str
+    SLACK_USERNAME: str
+    ALERT_RATE_LIMIT_PER_TICKER_PER_DAY: int
+    ALERT_MIN_INTERVAL_MINUTES: int
+    ALERT_GLOBAL_DAILY_CAP: int
+    RATE_LIMITS: str         # ratelimit.py 정책 문법 (미설정 시 위 세 값으로 구성)
+    INFO_TYPE: str           # "info" | "fast_info"
+    PRICE_HEDGE: bool        # fast_info/info 동시(헤지) 조회
+    PRICE_HEDGE_DELAY_MS: float
+    SOURCE_ROUTING: bool     # 종목별 소스 자동 선택 (state["sources"])
+    SOURCE_PROBE_EVERY: int
+    HISTORY_MODE: str        # "auto" | "on" | "off"
+    INTRABAR_MODE: bool      # 직전 실행 이후 분봉 저가/고가로 판정 (intrabar.py)
+    INTRABAR_INTERVAL: str   # "1m" | "2m" | "5m" | "15m"
+    TICKSTORE_ENABLE: bool   # 조회한 모든 가격을 data/ticks 에 기록 (tickstore.py)
+    TICKSTORE_RETENTION_DAYS: float
+    RULES_INTERVAL: str      # rules.txt 이동평균/N봉 고가·저가의 봉 단위 (data/bars, rules.py)
+    DIGEST_WINDOW_MINUTES: float   # 0 보다 크면 알림을 모아 창마다 한 통으로 발송 (digest.py)
+    DIGEST_URGENT_PERCENT: float   # 임계값에서 이만큼(%) 벗어난 알림은 창과 무관하게 즉시 발송 (0=끔)
+    HISTORY_ENABLE: bool
+    UPDATE_THRESHOLD_DOWN_PERCENT: float
+    UPDATE_THRESHOLD_UP_PERCENT: float
+    FAILURE_BACKOFF_BASE_MINUTES: float
+    FAILURE_BACKOFF_MAX_MINUTES: float
+
+
+# ---------- Helpers: env / CI detection ----------
+def _is_ci_like_env() -> bool:
+    # GitHub Actions exposes GITHUB_ACTIONS=true and CI=true
+    ga = os.getenv("GITHUB_ACTIONS", "").lower() == "true"
+    ci = os.getenv("CI", "").lower() == "true"
+    return ga or ci
+
+# ---------- Config ----------
+def load_kv(path: Path) -> dict:
+    kv={}
+    if path.exists():
+        for raw in path.read_text(encoding="utf-8").splitlines():
+            s=raw.strip()
+            if not s or s.startswith("#") or "=" not in s: continue
+            k,v=s.split("=",1); kv[k.strip()]=v.strip()
+            
+    # 환경변수 우선 병합
+    for k, v in os.environ.items():
+        if k not in kv and v.strip() != "":
+            kv[k] = v.strip()
+            
+    return kv
+
+def _merge_email_json(c: dict, email_json_path: Path) -> bool:
+    """email.json 을 c 에 병합. 반환: receivers 를 지정했는지 여부."""
+    if not email_json_path.exists():
+        return False
+    try:
+        with open(email_json_path, "r", encoding="utf-8") as f:
+            email_cfg = json.load(f)
+            if "smtp_host" in email_cfg: c["SMTP_HOST"] = email_cfg["smtp_host"]
+            if "smtp_port" in email_cfg: c["SMTP_PORT"] = str(email_cfg["smtp_port"])
+            if "smtp_user" in email_cfg: c["SMTP_USER"] = email_cfg["smtp_user"]
+            
+            # sender -> EMAIL_FROM
+            if "sender" in email_cfg: 
+                c["EMAIL_FROM"] = email_cfg["sender"]
+            elif "smtp_user" in email_cfg:
+                c["EMAIL_FROM"] = email_cfg["smtp_user"]
+            
+            # receivers -> EMAIL_TO
+            if "receivers" in email_cfg:
+                receivers = email_cfg["receivers"]
+                if isinstance(receivers, list):
+                    c["EMAIL_TO"] = ",".join(receivers)
+                else:
+                    c["EMAIL_TO"] = str(receivers)
+
+            # subscriptions -> EMAIL_SUBSCRIPTIONS (수신자별 도메인/종목 구독)
+            if "subscriptions" in email_cfg:
+                c["EMAIL_SUBSCRIPTIONS"] = recipients.parse(email_cfg["subscriptions"])
+            if "receivers" in email_cfg:
+                return True
+    except Exception as e:
+        print(f"[ERROR] 이메일 설정 파일(email.json) 파싱 실패: {e}", file=sys.stderr)
+    return False
+
+def load_config(path: Path, overlay_dir: Path = None) -> Config:
+    c = load_kv(path)
+    
+    # email.json 로드하여 병합 (존재하는 경우)
+    _merge_email_json(c, path.parent / "email.json")
+
+    # 포트폴리오 디렉터리의 config.txt / email.json 을 공통 설정 위에 덮어쓴다 (portfolios.py)
+    own_receivers = False
+    if overlay_dir is not None:
+        overlay_path = Path(overlay_dir) / "config.txt"
+        if overlay_path.exists():
+            for raw in overlay_path.read_text(encoding="utf-8").splitlines():
+                s=raw.strip()
+                if not s or s.startswith("#") or "=" not in s: continue
+                k,v=s.split("=",1); c[k.strip()]=v.strip()
+        own_receivers = _merge_email_json(c, Path(overlay_dir) / "email.json")
+
+    # 환경변수가 명시적으로 지정된 경우 최우선 적용 (기존 환경변수 동작 보장)
+    for env_k, env_v in os.environ.items():
+        if env_v.strip() != "":
+            if env_k in {"SMTP_HOST", "SMTP_PORT", "SMTP_USER", "EMAIL_FROM", "EMAIL_TO", "SMTP_PASS"}:
+                if env_k == "EMAIL_TO" and own_receivers: continue
+                c[env_k] = env_v.strip()
+
+    # defaults
+    c.setdefault("SMTP_PORT","587")
+    c.setdefault("EMAIL_FROM", c.get("SMTP_USER","stock-alert@example.com"))
+    c.setdefault("EMAIL_TO", c.get("SMTP_USER","root@localhost"))
+    c.setdefault("EMAIL_SUBSCRIPTIONS", {})
+    c.setdefault("TZ","Asia/Seoul")
+    c.setdefault("DAILY_DEDUP","true")
+    c.setdefault("ALERT_ON_CROSSDOWN_ONLY","false")
+    c.setdefault("ALERT_ON_CROSSUP_ONLY","false")
+
+    # Slack
+    c.setdefault("SLACK_USERNAME","Stock-Alert-Bot")
+    # Rate-limit: RATE_LIMITS 가 없으면 기존 세 값으로 기본 정책을 만든다 (ratelimit.py)
+    c.setdefault("ALERT_RATE_LIMIT_PER_TICKER_PER_DAY", "2")
+    c.setdefault("ALERT_MIN_INTERVAL_MINUTES", "60")
+    c.setdefault("ALERT_GLOBAL_DAILY_CAP", "100")
+
+    # Price source
+    c.setdefault("INFO_TYPE", "info")
+    # Hedged 조회: 선호 소스가 지연(p50, 표본 부족 시 PRICE_HEDGE_DELAY_MS)을 넘기면 다른 소스 병행
+    c.setdefault("PRICE_HEDGE", "false")
+    c.setdefault("PRICE_HEDGE_DELAY_MS", "300")
+    # 종목별 소스 자동 선택: 성공률/지연 학습, SOURCE_PROBE_EVERY 회마다 다른 소스 재측정
+    c.setdefault("SOURCE_ROUTING", "true")
+    c.setdefault("SOURCE_PROBE_EVERY", "20")
+
+    # History mode (K3: auto)
+    # HISTORY_MODE in {"auto","on","off"}
+    c.setdefault("HISTORY_MODE", "auto")
+
+    # 실행 사이 분봉 저가/고가 판정 (intrabar.py)
+    c.setdefault("INTRABAR_MODE", "off")
+    c.setdefault("INTRABAR_INTERVAL", "5m")
+
+    # 장중 시세 기록 (tickstore.py)
+    c.setdefault("TICKSTORE_ENABLE", "true")
+    c.setdefault("TICKSTORE_RETENTION_DAYS", "30")
+
+    # rules.txt 규칙의 봉 단위 (rules.py, 대시보드 생성기가 채우는 data/bars)
+    c.setdefault("RULES_INTERVAL", "1wk")
+
+    # 묶음 알림 (digest.py)
+    c.setdefault("DIGEST_WINDOW_MINUTES", "0")
+    c.setdefault("DIGEST_URGENT_PERCENT", "0")
+
+    c.setdefault("UPDATE_THRESHOLD_DOWN_PERCENT", "10")
+    c.setdefault("UPDATE_THRESHOLD_UP_PERCENT", "10")
+
+    # 연속 조회 실패 종목 재시도 백오프 (분)
+    c.setdefault("FAILURE_BACKOFF_BASE_MINUTES", "60")
+    c.setdefault("FAILURE_BACKOFF_MAX_MINUTES", "1440")
+    
+    # types
+    c["SMTP_PORT"]=int(c["SMTP_PORT"])
+    c["ALERT_RATE_LIMIT_PER_TICKER_PER_DAY"]=int(c["ALERT_RATE_LIMIT_PER_TICKER_PER_DAY"])
+    c["ALERT_MIN_INTERVAL_MINUTES"]=int(c["ALERT_MIN_INTERVAL_MINUTES"])
+    c["ALERT_GLOBAL_DAILY_CAP"]=int(c["ALERT_GLOBAL_DAILY_CAP"])
+    c.setdefault("RATE_LIMITS", ratelimit.default_spec(c["ALERT_RATE_LIMIT_PER_TICKER_PER_DAY"],
+                                                        c["ALERT_MIN_INTERVAL_MINUTES"],
+                                                        c["ALERT_GLOBAL_DAILY_CAP"]))
+    c["DAILY_DEDUP"]=c["DAILY_DEDUP"].lower()=="true"
+    c["ALERT_ON_CROSSDOWN_ONLY"]=c["ALERT_ON_CROSSDOWN_ONLY"].lower()=="true"
+    c["ALERT_ON_CROSSUP_ONLY"]=c["ALERT_ON_CROSSUP_ONLY"].lower()=="true"
+    c["UPDATE_THRESHOLD_DOWN_PERCENT"]=float(c["UPDATE_THRESHOLD_DOWN_PERCENT"])
+    c["UPDATE_THRESHOLD_UP_PERCENT"]=float(c["UPDATE_THRESHOLD_UP_PERCENT"])
+    c["FAILURE_BACKOFF_BASE_MINUTES"]=float(c["FAILURE_BACKOFF_BASE_MINUTES"])
+    c["FAILURE_BACKOFF_MAX_MINUTES"]=float(c["FAILURE_BACKOFF_MAX_MINUTES"])
+    c["PRICE_HEDGE"]=str(c["PRICE_HEDGE"]).lower()=="true"
+    c["PRICE_HEDGE_DELAY_MS"]=float(c["PRICE_HEDGE_DELAY_MS"])
+    c["INTRABAR_MODE"]=str(c["INTRABAR_MODE"]).lower().strip() in {"on","true"}
+    c["INTRABAR_INTERVAL"]=c["INTRABAR_INTERVAL"].strip()
+    if c["INTRABAR_INTERVAL"] not in {"1m","2m","5m","15m"}:
+        c["INTRABAR_INTERVAL"] = "5m"
+    c["TICKSTORE_ENABLE"]=str(c["TICKSTORE_ENABLE"]).lower()=="true"
+    c["TICKSTORE_RETENTION_DAYS"]=float(c["TICKSTORE_RETENTION_DAYS"])
+    c["RULES_INTERVAL"]=c["RULES_INTERVAL"].strip() or "1wk"
+    if isinstance(c["EMAIL_SUBSCRIPTIONS"], str):   # 환경변수로 주면 email.json 과 같은 JSON 객체
+        c["EMAIL_SUBSCRIPTIONS"]=recipients.parse(json.loads(c["EMAIL_SUBSCRIPTIONS"] or "{}"))
+    c["DIGEST_WINDOW_MINUTES"]=float(c["DIGEST_WINDOW_MINUTES"])
+    c["DIGEST_URGENT_PERCENT"]=float(c["DIGEST_URGENT_PERCENT"])
+    c["SOURCE_ROUTING"]=str(c["SOURCE_ROUTING"]).lower()=="true"
+    c["SOURCE_PROBE_EVERY"]=int(c["SOURCE_PROBE_EVERY"])
+    
+    c["INFO_TYPE"]=c["INFO_TYPE"].lower().strip()
+    if c["INFO_TYPE"] not in {"fast_info","info"}:
+        c["INFO_TYPE"] = "info"
+
+    hm = c["HISTORY_MODE"].lower().strip()
+    if hm not in {"auto","on","off"}:
+        hm = "auto"
+    # Resolve auto -> disabled on CI, enabled otherwise
+    if hm == "auto":
+        c["HISTORY_ENABLE"] = (not _is_ci_like_env())
+    elif hm == "on":
+        c["HISTORY_ENABLE"] = True
+    else:
+        c["HISTORY_ENABLE"] = False
+
+    return c
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Alert digest
+============
+변동이 큰 날 매 실행마다 메일/Slack 이 나가지 않도록 임계/규칙 알림을 state["digest"] 에
+모아 두었다가 한 통으로 보냅니다 (DIGEST_WINDOW_MINUTES > 0 일 때만).
+
+- 첫 알림이 쌓인 시각부터 DIGEST_WINDOW_MINUTES 가 지난 첫 실행에서 쌓인 알림 전체를
+  generate_html_body()/build_slack_blocks() 그대로 한 번에 발송합니다. 헤더 시각은 묶은 구간입니다.
+- 이번 실행의 알림 중 임계값(규칙은 기준값)에서 DIGEST_URGENT_PERCENT 이상 벗어난 항목이
+  있으면 창이 닫히기 전이라도 즉시 발송합니다 (0 이면 끔).
+- 모으는 동안에도 중복 방지/rate-limit/임계값 자동 조정은 실행마다 바로 반영되고, 발송에
+  실패하면 묶음은 state 에 남아 다음 실행에서 다시 보냅니다.
+
+state["digest"]:
+  {"since": 첫 알림 epoch, "runs": 알림이 있었던 실행 수,
+   "down": [[loc, name, ticker, price, th, new_th, desc], ...], "up": [...],
+   "rules": [[loc, name, ticker, price, 조건, 기준값, desc], ...], "notes": [...]}
+"""
+import datetime
+
+SECTIONS = ("down", "up", "rules")
+
+
+def add(buf, ts, down, up, rule_hits, notes) -> dict:
+    """기존 묶음(buf, 없으면 None)에 이번 실행 결과를 덧붙인 새 묶음. buf 는 바꾸지 않는다."""
+    buf = buf or {}
+    out = {"since": buf.get("since") or int(ts.timestamp()), "runs": buf.get("runs", 0) + 1}
+    for name, items in zip(SECTIONS, (down, up, rule_hits)):
+        out[name] = list(buf.get(name, [])) + [list(x) for x in items]
+    out["notes"] = list(dict.fromkeys(list(buf.get("notes", [])) + list(notes)))
+    return out
+
+
+def count(buf) -> int:
+    return sum(len(buf.get(name, [])) for name in SECTIONS) if buf else 0
+
+
+def due(buf, ts, window_minutes: float) -> bool:
+    """첫 알림부터 창 길이가 지났는지."""
+    return bool(buf) and ts.timestamp() - buf["since"] >= window_minutes * 60
+
+
+def urgent(down, up, rule_hits, percent: float) -> bool:
+    """기준값에서 percent% 이상 벗어난 알림이 있는지 (percent <= 0 이면 항상 False)."""
+    if percent <= 0:
+        return False
+    refs = [(x[3], x[4]) for x in list(down) + list(up)] + [(x[3], x[5]) for x in rule_hits]
+    return any(ref and abs(price / ref - 1.0) * 100.0 >= percent for price, ref in refs)
+
+
+def unpack(buf):
+    """묶음 → (down, up, rule_hits, notes) (generate_html_body 인자 형태의 튜플 목록)."""
+    down, up, rules = ([tuple(x) for x in buf.get(name, [])] for name in SECTIONS)
+    return down, up, rules, list(buf.get("notes", []))
+
+
+def period(buf, ts, fmt: str = "%Y-%m-%d %H:%M") -> str:
+    """메일/Slack 헤더에 쓰는 묶음 구간 "시작 ~ 끝 TZ"."""
+    start = datetime.datetime.fromtimestamp(buf["since"], ts.tzinfo)
+    return f"{start.strftime(fmt)} ~ {ts.strftime(fmt + ' %Z')}".strip()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Failure tracker
+===============
+시세 조회에 연속으로 실패하는 종목(상장폐지/미지원 티커 등)을 state 에 기록하고,
+재시도 간격을 지수적으로 늘려(backoff) 매 실행마다 fast_info → info → 1분봉
+폴백 체인을 다시 타지 않도록 합니다.
+
+- 첫 실패는 다음 실행에서 바로 재시도하고, 2회째부터 base, 2*base, 4*base ...
+  (최대 cap) 분 동안 조회를 건너뜁니다. 한 번이라도 성공하면 기록이 지워집니다.
+- 실패 종목 목록은 하루 한 번 알림 메일에, 그리고 주간 리포트에 요약됩니다.
+
+state["failures"] = {
+  "<ticker>": {"count": 3, "since": "2026-10-19", "error": "가격 조회 실패", "next": <epoch>}
+}
+state["failures_reported"] = "2026-10-19"   # 알림 메일에 일일 요약을 넣은 날짜
+"""
+import datetime
+
+# 다음 실행 직전에 도래하는 재시도를 놓치지 않도록 주는 여유 (초)
+_SLACK_SEC = 5 * 60
+
+
+def backoff_minutes(count: int, base: float, cap: float) -> float:
+    if count < 2:
+        return 0.0
+    return min(base * (2 ** (count - 2)), cap)
+
+
+def is_due(state: dict, ticker: str, now: float) -> bool:
+    rec = state.get("failures", {}).get(ticker)
+    return rec is None or now + _SLACK_SEC >= rec.get("next", 0)
+
+
+def record_failure(state: dict, ticker: str, error: str, now: float, today: str,
+                   base: float = 60, cap: float = 1440) -> dict:
+    fails = state.setdefault("failures", {})
+    rec = fails.get(ticker) or {"count": 0, "since": today}
+    rec["count"] += 1
+    rec["error"] = error
+    rec["next"] = int(now + backoff_minutes(rec["count"], base, cap) * 60)
+    fails[ticker] = rec
+    return rec
+
+
+def record_success(state: dict, ticker: str):
+    state.get("failures", {}).pop(ticker, None)
+
+
+def summary_lines(failures: dict, tz=None):
+    lines = []
+    for tkr, rec in sorted(failures.items(), key=lambda kv: -kv[1].get("count", 0)):
+        nxt = datetime.datetime.fromtimestamp(rec.get("next", 0), tz).strftime("%m-%d %H:%M")
+        lines.append(f"{tkr}: {rec.get('since')}부터 연속 {rec.get('count')}회 실패 "
+                     f"(다음 재시도 {nxt}) — {rec.get('error', '')}")
+    return lines
+
+
+def take_daily_summary(state: dict, today: str, tz=None, failures=None):
+    """
+    오늘 아직 요약하지 않았고 실패 종목이 있으면 요약 줄을 반환하고 보고 날짜를 기록.
+    failures 를 주면 state["failures"] 대신 그 기록을 요약한다 (포트폴리오별 종목만).
+    """
+    failures = (state.get("failures") or {}) if failures is None else failures
+    if not failures or state.get("failures_reported") == today:
+        return []
+    state["failures_reported"] = today
+    return summary_lines(failures, tz)
@@ -10,6 +10,19 @@ Dashboard Data Generator
 - 브라우저(정적 GitHub Pages)에서는 CORS 제한으로 Yahoo Finance API를
   직접 호출할 수 없기 때문에, GitHub Actions(Python + yfinance)에서
   본 스크립트를 주기적으로 실행하여 JSON 데이터를 미리 생성/커밋합니다.
+- 주봉 이력은 `data/bars/` (barstore.py) 에 종목별 고정폭 레코드로 저장되고,
+  출력 JSON 의 series 는 저장소에서 읽어 만듭니다 (주간 리포트/백테스트도 같은 저장소 사용).
+- 차트용으로 series 를 DASHBOARD_LEVELS(64,256점) 크기로 미리 줄인 레벨(pyramid.py, LTTB 또는
+  min/max)과 요약을 함께 내보내, 브라우저가 캔버스 폭에 맞는 레벨만 그리도록 합니다.
+  DASHBOARD_SERIES_INLINE=false 이면 전체 series 는 `docs/data/series/<ticker>.json` 으로 분리되어
+  상세 차트를 열 때만 받습니다 (첫 로드는 레벨만).
+- 이동평균/최대 낙폭/변동성/52주 백분위는 봉 저장소 종가 행렬로 한 번에 계산하고
+  (analytics.py), 봉이 바뀌지 않은 종목은 `data/bars/<interval>.analytics.json` 캐시를 재사용합니다.
+- 조회한 종목 레코드는 바로 임시 NDJSON 스풀에 쓰고 메모리에서 버리며, history.json 은 스풀을
+  한 줄씩 읽어 지표/레벨을 붙인 뒤 jsonstream.py 로 종목 단위로 흘려 씁니다 (분리된 series 파일도
+  종목마다 즉시 기록). 유니버스가 커져도 메모리는 종목 하나 크기만큼만 씁니다.
+- 뉴스 헤드라인은 `data/news_cache.json` (news_cache.py) 에 링크 해시 단위로
+  누적/중복 제거되며, TTL(DASHBOARD_NEWS_TTL_HOURS)이 지난 종목만 다시 조회합니다.
 
 출력 스키마 (docs/data/history.json):
 {
@@ -24,7 +37,13 @@ Dashboard Data Generator
       "week52_high", "week52_low", "sector", "industry",
       "market_cap", "website",
       "news": [{"title","publisher","link","published"}, ...],  # 최근 뉴스
-      "series": [["2021-07-05", 123.45], ...]   # [날짜, 종가(주봉)]
+      "series": [["2021-07-05", 123.45], ...],  # [날짜, 종가(주봉)] (DASHBOARD_SERIES_INLINE=false 면 생략)
+      "series_url": "data/series/<ticker>.json", # 인라인이 아닐 때 전체 series 파일
+      "levels": [{"n": 64, "min", "max", "points": [...]}, ...],  # 축소 레벨 (pyramid.py)
+      "range": {"n", "min", "min_date", "max", "max_date", "first", "last"},  # 전체 series 요약
+      "analytics": {"ma": {"10", "40"}, "mdd_pct", "vol_pct", "pct_52w",       # 지표 (analytics.py)
+                    "dist_down_pct", "dist_up_pct"},
+      "intraday": [[1792380000, 124.1], ...]    # [epoch, 가격] 알림 실행 tick, 최근 N일 1시간 단위
     }, ...
   },
   "errors": ["<ticker>: <reason>", ...]
@@ -35,29 +54,44 @@ import sys
 import json
 import math
 import datetime
+import tempfile
 from pathlib import Path
 
-import yfinance as yf
 import pytz
 
+import analytics
+import barstore
+import http_pool
+import jsonstream
+import ladder
+import metrics
+import news_cache
+import pyramid
+import tickstore
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 STOCKS_PATH = BASE_DIR / "data" / "stock.txt"
+NEWS_CACHE_PATH = BASE_DIR / "data" / "news_cache.json"
+TICKS_DIR = BASE_DIR / "data" / "ticks"
+BARS_DIR = BASE_DIR / "data" / "bars"
 OUT_DIR = BASE_DIR / "docs" / "data"
 OUT_PATH = OUT_DIR / "history.json"
+SERIES_DIR = OUT_DIR / "series"
 
 PERIOD = os.getenv("DASHBOARD_PERIOD", "5y")
 INTERVAL = os.getenv("DASHBOARD_INTERVAL", "1wk")
 TZ = os.getenv("TZ", "Asia/Seoul")
-
-
-def parse_float_or_none(s):
-    s = (s or "").strip()
-    if not s:
-        return None
-    try:
-        return float(s)
-    except Exception:
-        return None
+# 뉴스 캐시: TTL 이 지난 종목만 t.news 를 다시 요청, 종목당 최근 N개 보관
+NEWS_TTL_HOURS = float(os.getenv("DASHBOARD_NEWS_TTL_HOURS", "6"))
+NEWS_WINDOW = int(os.getenv("DASHBOARD_NEWS_WINDOW", "20"))
+NEWS_LIMIT = 6
+# 장중 시세: 알림 실행이 기록한 tick store 에서 최근 N일을 1시간 단위로 (조회 없음)
+INTRADAY_DAYS = float(os.getenv("DASHBOARD_INTRADAY_DAYS", "5"))
+INTRADAY_BUCKET_SEC = 3600
+# 차트 레벨: 캔버스 폭에 맞춰 고르도록 미리 줄인 series (pyramid.py)
+LEVELS = tuple(int(x) for x in os.getenv("DASHBOARD_LEVELS", "64,256").split(",") if x.strip())
+DOWNSAMPLE = os.getenv("DASHBOARD_DOWNSAMPLE", "lttb").strip().lower()
+SERIES_INLINE = os.getenv("DASHBOARD_SERIES_INLINE", "true").strip().lower() == "true"
 
 
 def load_stocks(path: Path):
@@ -72,13 +106,15 @@ def load_stocks(path: Path):
             while len(parts) < 6:
                 parts.append("")
             loc, name, ticker, down_str, up_str, desc = parts[:6]
-            down = parse_float_or_none(down_str)
-            up = parse_float_or_none(up_str)
-            if down is None and up is None:
+            # 여러 단계(150/135/120, ladder.py)는 가장 가까운 단계를 down/up 으로 쓴다.
+            downs = ladder.parse(down_str)
+            ups = ladder.parse(up_str)
+            if downs is None and ups is None:
                 continue
             items.append({
                 "loc": loc, "name": name, "ticker": ticker,
-                "down": down, "up": up, "desc": desc,
+                "down": downs[-1] if downs else None, "up": ups[0] if ups else None,
+                "down_levels": downs, "up_levels": ups, "desc": desc,
             })
     return items
 
@@ -134,11 +170,11 @@ def _news_item(raw):
 
 
 def fetch_news(t, limit=6):
-    """종목 관련 최근 뉴스 헤드라인 (실패해도 무시)."""
+    """종목 관련 최근 뉴스 헤드라인. 조회 실패는 None ("뉴스 없음" [] 과 구분)."""
     try:
         raw = t.news or []
     except Exception:
-        return []
+        return None
     out = []
     for item in raw:
         n = _news_item(item)
@@ -149,29 +185,41 @@ def fetch_news(t, limit=6):
     return out
 
 
-def fetch_ticker(stock):
+def fetch_ticker(stock, ncache=None, now_ts=None, bars=None):
+    """
+    종목 1개 조회. bars(barstore.BarWriter) 가 주어지면 주봉은 저장소에 쓰고 반환값에는
+    "points"(봉 개수)만 담는다. 없으면 예전처럼 "series" 를 직접 담아 반환한다.
+    """
+    import yfinance as yf   # 무거운 의존성(pandas 포함)은 조회 시점에만 로드
     tkr = stock["ticker"]
-    t = yf.Ticker(tkr)
+    t = yf.Ticker(tkr, session=http_pool.session())
 
     # --- 과거 주가 이력 (주봉) ---
     hist = t.history(period=PERIOD, interval=INTERVAL)
-    series = []
+    rows = []
     if hist is not None and not hist.empty and "Close" in hist:
-        for idx, close in hist["Close"].items():
+        n = len(hist.index)
+        opens, highs, lows, closes, volumes = (
+            hist[c].tolist() if c in hist else [None] * n
+            for c in ("Open", "High", "Low", "Close", "Volume"))
+        for idx, o, h, l, close, v in zip(hist.index, opens, highs, lows, closes, volumes):
             c = _clean(close)
             if c is None:
                 continue
             try:
-                date_str = idx.strftime("%Y-%m-%d")
+                day = idx.date().toordinal()
             except Exception:
-                date_str = str(idx)[:10]
-            series.append([date_str, round(c, 4)])
+                day = datetime.date.fromisoformat(str(idx)[:10]).toordinal()
+            o, h, l = (_clean(x) for x in (o, h, l))
+            rows.append((day, c if o is None else o, c if h is None else h,
+                         c if l is None else l, c, _clean(v) or 0.0))
+    del hist   # DataFrame 은 메타데이터/뉴스 조회 전에 놓아 준다
 
-    if not series:
+    if not rows:
         raise RuntimeError("가격 이력 없음")
 
-    current = series[-1][1]
-    prev_close = series[-2][1] if len(series) >= 2 else None
+    current = round(rows[-1][4], 4)
+    prev_close = round(rows[-2][4], 4) if len(rows) >= 2 else None
     change_pct = None
     if prev_close:
         change_pct = round((current - prev_close) / prev_close * 100.0, 2)
@@ -212,10 +260,16 @@ def fetch_ticker(stock):
     except Exception:
         pass
 
-    # --- 최근 뉴스 (실패해도 무시) ---
-    news = fetch_news(t)
+    # --- 최근 뉴스 (캐시가 만료된 종목만 새로 조회, 실패하면 캐시에 남은 뉴스를 쓰고 다음 실행에서 재시도) ---
+    if ncache is None:
+        news = fetch_news(t, limit=NEWS_LIMIT) or []
+    else:
+        if news_cache.is_expired(ncache, tkr, now_ts, NEWS_TTL_HOURS * 3600):
+            news_cache.merge(ncache, tkr, fetch_news(t, limit=NEWS_WINDOW),
+                             now_ts, NEWS_WINDOW)
+        news = news_cache.items_for(ncache, tkr, NEWS_LIMIT)
 
-    return {
+    data = {
         "name": stock["name"],
         "domain": stock["loc"],
         "ticker": tkr,
@@ -233,49 +287,118 @@ def fetch_ticker(stock):
         "market_cap": market_cap,
         "website": website,
         "news": news,
-        "series": series,
     }
+    # 여러 단계 사다리(ladder.py)는 전체 단계를 가까운 단계부터 함께 싣는다.
+    for d in ("down", "up"):
+        levels = stock.get(f"{d}_levels") or []
+        if len(levels) > 1:
+            data[f"{d}_levels"] = levels[::-1] if d == "down" else levels
+    if bars is not None:
+        data["points"] = bars.add(tkr, rows)
+    else:
+        data["series"] = [[datetime.date.fromordinal(r[0]).isoformat(), round(r[4], 4)]
+                          for r in rows]
+    return data
 
 
+@metrics.job("dashboard")
 def main():
-    stocks = load_stocks(STOCKS_PATH)
+    with metrics.span("universe_parse"):
+        stocks = load_stocks(STOCKS_PATH)
     print(f"[dashboard] {len(stocks)}개 종목 데이터 수집 시작 "
           f"(period={PERIOD}, interval={INTERVAL})")
 
-    tickers = {}
+    with metrics.span("state_load"):
+        ncache = news_cache.load(NEWS_CACHE_PATH)
+    now_ts = datetime.datetime.now(datetime.timezone.utc).timestamp()
+
+    meta = {}        # 종목 → (현재가, 하한, 상한): 지표 계산에 필요한 값만 메모리에 둔다
     errors = []
     domains = []
-    for s in stocks:
-        if s["loc"] and s["loc"] not in domains:
-            domains.append(s["loc"])
-        try:
-            data = fetch_ticker(s)
-            tickers[s["ticker"]] = data
-            print(f"  ✓ {s['ticker']:<14} {s['name']} "
-                  f"({len(data['series'])} pts)")
-        except Exception as e:
-            msg = f"{s['ticker']}: {e}"
-            errors.append(msg)
-            print(f"  ✗ {msg}", file=sys.stderr)
+    ticks = tickstore.open_store(TICKS_DIR, readonly=True)
+    intraday_start = int(now_ts - INTRADAY_DAYS * 86400)
+    # 종목 레코드는 조회하는 대로 스풀(NDJSON)에 쓰고 버린다. 지표는 봉 저장소가 완성된 뒤
+    # 한 번에 계산하므로, history.json 은 아래에서 스풀을 다시 읽으며 흘려 쓴다.
+    spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+    # 주봉은 새 저장소 파일에 흘려 쓰고, 이번에 조회하지 못한 종목은 이전 저장소 값을 유지한다.
+    prev_bars = barstore.open_store(BARS_DIR, INTERVAL)
+    # stock.txt 에 두 번 적힌 종목은 처음 나온 자리에 마지막 줄의 설정으로 한 번만 싣는다.
+    last_row = {s["ticker"]: s for s in stocks}
+    seen = set()
+    with metrics.span("fetch"), ticks, prev_bars, barstore.BarWriter(BARS_DIR, INTERVAL) as bars:
+        for s in stocks:
+            if s["loc"] and s["loc"] not in domains:
+                domains.append(s["loc"])
+            if s["ticker"] in seen:
+                continue
+            seen.add(s["ticker"])
+            s = last_row[s["ticker"]]
+            t0 = metrics.clock()
+            try:
+                data = fetch_ticker(s, ncache, now_ts, bars)
+                data["intraday"] = [[t, round(p, 4)] for t, p in tickstore.downsample(
+                    ticks.range(s["ticker"], start=intraday_start), INTRADAY_BUCKET_SEC)]
+                spool.write(json.dumps([s["ticker"], data], ensure_ascii=False,
+                                       separators=(",", ":")) + "\n")
+                meta[s["ticker"]] = (data["current"], data["down"], data["up"])
+                print(f"  ✓ {s['ticker']:<14} {s['name']} "
+                      f"({data['points']} pts)")
+            except Exception as e:
+                msg = f"{s['ticker']}: {e}"
+                errors.append(msg)
+                print(f"  ✗ {msg}", file=sys.stderr)
+                # 새 봉을 이미 쓴 뒤(장중 시세/스풀 단계)의 실패면 그 봉을 그대로 둔다.
+                if s["ticker"] not in bars.index:
+                    bars.add_records(s["ticker"], prev_bars.records(s["ticker"]))
+            metrics.observe("fetch_seconds", metrics.clock() - t0, s["ticker"])
+    metrics.inc("fetch_errors", len(errors))
 
-    now = datetime.datetime.now(pytz.timezone(TZ))
-    out = {
-        "generated_at": now.isoformat(),
-        "period": PERIOD,
-        "interval": INTERVAL,
-        "domains": domains,
-        "count": len(tickers),
-        "tickers": tickers,
-        "errors": errors,
-    }
+    with metrics.span("persist"):
+        news_cache.prune(ncache, [s["ticker"] for s in stocks])
+        news_cache.save(NEWS_CACHE_PATH, ncache)
 
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    OUT_PATH.write_text(
-        json.dumps(out, ensure_ascii=False, separators=(",", ":")),
-        encoding="utf-8",
-    )
+    now = datetime.datetime.now(pytz.timezone(TZ))
+    series_files = set()
+    acache_path = analytics.cache_path(BARS_DIR, INTERVAL)
+    with spool, barstore.open_store(BARS_DIR, INTERVAL) as store:
+        with metrics.span("analytics"):
+            acache = analytics.load_cache(acache_path)
+            stats, recomputed = analytics.update(store, list(meta), acache, INTERVAL)
+            metrics.inc("analytics_recomputed", recomputed)
+        with metrics.span("render"), jsonstream.ObjectWriter(OUT_PATH) as out:
+            out.put("generated_at", now.isoformat())
+            out.put("period", PERIOD)
+            out.put("interval", INTERVAL)
+            out.put("domains", domains)
+            out.put("count", len(meta))
+            out.begin("tickers")
+            spool.seek(0)
+            for line in spool:
+                tkr, data = json.loads(line)
+                data["analytics"] = analytics.with_thresholds(stats.get(tkr, {}), *meta[tkr])
+                series = store.series(tkr)
+                data["levels"] = pyramid.levels(series, LEVELS, DOWNSAMPLE)
+                data["range"] = pyramid.full_range(series)
+                if SERIES_INLINE:
+                    data["series"] = series
+                else:
+                    name = f"{tkr}.json"
+                    data["series_url"] = f"data/series/{name}"   # docs/index.html 기준 경로
+                    SERIES_DIR.mkdir(parents=True, exist_ok=True)
+                    (SERIES_DIR / name).write_text(json.dumps(series, separators=(",", ":")),
+                                                   encoding="utf-8")
+                    series_files.add(name)
+                out.put(tkr, data)
+            out.end()
+            out.put("errors", errors)
+    with metrics.span("persist"):
+        analytics.save_cache(acache_path, acache)
+        if SERIES_DIR.exists():
+            for stale in SERIES_DIR.glob("*.json"):
+                if stale.name not in series_files:
+                    stale.unlink()
     print(f"[dashboard] 저장 완료: {OUT_PATH} "
-          f"(성공 {len(tickers)} / 실패 {len(errors)})")
+          f"(성공 {len(meta)} / 실패 {len(errors)})")
 
 
 if __name__ == "__main__":
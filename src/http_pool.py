@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP session pool
+=================
+모든 yfinance 호출이 공유하는 프로세스 단일 HTTP 세션.
+
+- keep-alive 연결과 쿠키/crumb 를 재사용합니다 (curl_cffi 가 있으면 curl_cffi,
+  없으면 requests 세션 — yfinance 가 지원하는 두 백엔드).
+- 모든 요청은 토큰 버킷(YAHOO_RATE_PER_SEC, YAHOO_BURST)을 통과해야 하므로
+  실행이 몰려도 Yahoo 요청률이 한도 근처에서 유지됩니다.
+- 429/5xx 응답은 Retry-After 헤더 또는 지수 백오프 + full jitter 로 재시도하고
+  (YAHOO_MAX_RETRIES), 429 를 받으면 버킷 전체를 잠시 멈춰 다른 스레드도 속도를 늦춥니다.
+
+사용:
+    import http_pool
+    t = yf.Ticker(ticker, session=http_pool.session())
+"""
+import os
+import time
+import random
+import threading
+
+import metrics
+
+
+class TokenBucket:
+    """초당 rate 개, 최대 burst 개까지 쌓이는 토큰 버킷 (스레드 안전, 예약 방식)."""
+
+    def __init__(self, rate: float, burst: float, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.t = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+
+    def acquire(self) -> float:
+        """토큰 1개를 예약하고 필요하면 대기. 반환: 대기한 시간(초)."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            self._refill()
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            self.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """스로틀링 신호를 받으면 seconds 만큼의 토큰을 미리 소진시켜 모두 늦춘다."""
+        if self.rate <= 0:
+            return
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return float(default)
+
+
+def retry_delay(attempt: int, retry_after=None, base: float = 1.0, cap: float = 30.0) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), cap)
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _budgeted(session_cls, bucket, max_retries, backoff_base):
+    class BudgetedSession(session_cls):
+        def request(self, method, url, *args, **kwargs):
+            attempt = 0
+            while True:
+                bucket.acquire()
+                metrics.inc("http_requests")
+                resp = super().request(method, url, *args, **kwargs)
+                code = getattr(resp, "status_code", 200)
+                if not (code == 429 or code >= 500) or attempt >= max_retries:
+                    return resp
+                delay = retry_delay(attempt, resp.headers.get("Retry-After"), backoff_base)
+                if code == 429:
+                    metrics.inc("http_throttled")
+                    bucket.pause(delay)
+                metrics.inc("http_retries")
+                time.sleep(delay)
+                attempt += 1
+
+    BudgetedSession.__name__ = f"Budgeted{session_cls.__name__}"
+    return BudgetedSession
+
+
+_lock = threading.Lock()
+_session = None
+_bucket = None
+
+
+def bucket() -> TokenBucket:
+    global _bucket
+    if _bucket is None:
+        _bucket = TokenBucket(_env_float("YAHOO_RATE_PER_SEC", 5), _env_float("YAHOO_BURST", 10))
+    return _bucket
+
+
+def session():
+    """프로세스 공용 세션 (최초 호출 시 생성)."""
+    global _session
+    with _lock:
+        if _session is None:
+            max_retries = int(_env_float("YAHOO_MAX_RETRIES", 3))
+            backoff_base = _env_float("YAHOO_BACKOFF_BASE_SEC", 1.0)
+            try:
+                from curl_cffi import requests as backend
+                cls = _budgeted(backend.Session, bucket(), max_retries, backoff_base)
+                _session = cls(impersonate="chrome")
+            except ImportError:
+                import requests as backend
+                cls = _budgeted(backend.Session, bucket(), max_retries, backoff_base)
+                _session = cls()
+        return _session
+
+
+def reset():
+    """테스트/벤치마크용: 공용 세션과 버킷을 버린다."""
+    global _session, _bucket
+    with _lock:
+        if _session is not None:
+            try:
+                _session.close()
+            except Exception:
+                pass
+        _session = None
+        _bucket = None
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Intra-interval ranges
+=====================
+INTRABAR_MODE=on 일 때 직전 실행 이후 구간의 분봉(INTRABAR_INTERVAL, 1m/5m)을 전 종목 한 번의
+yf.download 호출로 받아 종목별 (저가, 고가)를 구합니다. 판정 엔진은 현재가 대신 이 구간
+저가/고가를 임계값과 비교하므로, 실행 사이에 임계를 찍고 되돌아온 급등락도 잡습니다.
+
+- 구간 시작은 state["last_run_ts"] (없으면 MAX_LOOKBACK_SEC 전), 최대 MAX_LOOKBACK_SEC 까지만
+  거슬러 올라갑니다 (Yahoo 1m 봉 보관 한도와 오래된 돌파 재알림 방지).
+- 조회 실패/데이터 없는 종목은 결과에서 빠지고, 그 종목은 기존처럼 현재가로만 판정합니다.
+"""
+import sys
+import math
+
+import cassette
+import http_pool
+import metrics
+
+MAX_LOOKBACK_SEC = 24 * 3600
+INTERVALS = ("1m", "2m", "5m", "15m")
+
+
+def window_start(state: dict, now: float) -> float:
+    last = state.get("last_run_ts")
+    floor = now - MAX_LOOKBACK_SEC
+    return floor if not last else max(float(last), floor)
+
+
+def ranges_from_frame(df, tickers, since: float):
+    """yf.download(group_by="column") 결과 → {ticker: (low, high)} (since 이후 봉만)."""
+    import pandas as pd
+
+    if df is None or df.empty:
+        return {}
+    cutoff = pd.Timestamp(since, unit="s", tz="UTC")
+    if df.index.tz is None:
+        cutoff = cutoff.tz_localize(None)
+    df = df[df.index >= cutoff]
+    if df.empty:
+        return {}
+    out = {}
+    multi = isinstance(df.columns, pd.MultiIndex)
+    for tkr in tickers:
+        try:
+            lows = df["Low"][tkr] if multi else df["Low"]
+            highs = df["High"][tkr] if multi else df["High"]
+        except KeyError:
+            continue
+        lo, hi = float(lows.min()), float(highs.max())
+        if math.isnan(lo) or math.isnan(hi):
+            continue
+        out[tkr] = (lo, hi)
+    return out
+
+
+def fetch_ranges(tickers, since: float, now: float, interval: str = "5m"):
+    """전 종목 분봉을 한 번에 받아 구간 (저가, 고가) 반환. 실패하면 빈 dict."""
+    tape = cassette.active()
+    if tape is not None and tape.replaying:
+        return tape.take_ranges()
+    ranges = _download_ranges(tickers, since, now, interval)
+    if tape is not None:
+        tape.put_ranges(ranges)
+    return ranges
+
+
+def _download_ranges(tickers, since: float, now: float, interval: str):
+    import yfinance as yf   # 무거운 의존성(pandas 포함)은 조회 시점에만 로드
+    import pandas as pd
+
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    try:
+        df = yf.download(tickers, start=pd.Timestamp(since, unit="s", tz="UTC"),
+                         end=pd.Timestamp(now, unit="s", tz="UTC"), interval=interval,
+                         group_by="column", progress=False, threads=True,
+                         session=http_pool.session())
+    except Exception as e:
+        metrics.inc("intrabar_errors")
+        print(f"[STOCK-ALERT] 분봉 일괄 조회 실패: {e}", file=sys.stderr)
+        return {}
+    return ranges_from_frame(df, tickers, since)
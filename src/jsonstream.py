@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON stream
+===========
+큰 JSON 객체를 키 단위로 흘려 쓰는 작성기. 대시보드 history.json 처럼 종목 레코드가
+유니버스 크기만큼 늘어나는 출력을 전체 dict/문자열로 만들지 않고 한 레코드씩 씁니다.
+
+- 출력은 json.dumps(..., separators=(",", ":")) 와 바이트 단위로 같습니다 (키 순서 = 쓴 순서).
+- 임시 파일(<이름>.tmp)에 쓰고 with 블록이 정상 종료될 때만 교체하므로, 중간에 실패하면
+  이전 파일이 그대로 남습니다 (barstore.BarWriter 와 같은 방식).
+
+사용:
+    with jsonstream.ObjectWriter(OUT_PATH) as w:
+        w.put("generated_at", "...")
+        w.begin("tickers")
+        for tkr, rec in records:
+            w.put(tkr, rec)            # 레코드는 쓴 뒤 버려도 된다
+        w.end()
+        w.put("errors", [])
+"""
+import os
+import json
+from pathlib import Path
+
+
+class ObjectWriter:
+    """{"키": 값, ...} 을 put() 순서대로 쓰는 작성기. begin()/end() 로 중첩 객체를 연다."""
+
+    def __init__(self, path: Path, ensure_ascii: bool = False):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._enc = json.JSONEncoder(ensure_ascii=ensure_ascii, separators=(",", ":"))
+        self._fh = None
+        self._first = []   # 열린 객체마다 "아직 키가 없음" 여부
+
+    def _key(self, key: str):
+        self._fh.write("" if self._first[-1] else ",")
+        self._first[-1] = False
+        self._fh.write(self._enc.encode(str(key)) + ":")
+
+    def put(self, key: str, value):
+        self._key(key)
+        for chunk in self._enc.iterencode(value):
+            self._fh.write(chunk)
+
+    def begin(self, key: str):
+        self._key(key)
+        self._fh.write("{")
+        self._first.append(True)
+
+    def end(self):
+        if len(self._first) < 2:
+            raise ValueError("begin() 없이 end() 를 호출했습니다")
+        self._first.pop()
+        self._fh.write("}")
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self._tmp, "w", encoding="utf-8")
+        self._fh.write("{")
+        self._first = [True]
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        unclosed = len(self._first) != 1
+        if exc_type is None and not unclosed:
+            self._fh.write("}")
+            self._fh.close()
+            os.replace(self._tmp, self.path)
+            return
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+        if exc_type is None:   # 닫지 않은 begin() 이 있으면 깨진 JSON 이므로 교체하지 않는다
+            raise ValueError("end() 로 닫지 않은 객체가 있습니다")
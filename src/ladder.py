@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Price ladders
+=============
+stock.txt 의 price_down/price_up 칸에 '/' 로 구분한 여러 가격을 적어 분할 매수/매도 단계를
+감시합니다. 단일 값은 1단계 사다리와 같으므로 기존 stock.txt 는 그대로 동작합니다.
+
+    AI, Nvidia, NVDA, 150/135/120, 200/230, 분할 매수 3단계 · 매도 2단계
+
+- 단계는 오름차순 배열로 보관하고, 새 가격(구간 저가/고가)이 도달한 단계 전체를 bisect 로
+  O(log k) 에 찾습니다. 하한은 가격 이상인 단계, 상한은 가격 이하인 단계가 도달한 단계입니다.
+- 단계 번호는 현재가에 가까운 쪽부터 1, 2, 3… 입니다. 1단계는 기존 단일 임계값과 같은 종류
+  ("down"/"up")를, 2단계부터는 "down#2" 같은 종류를 써서 중복 제거(last_alert_date)와
+  alert 범위 rate-limit 을 단계별로 셉니다 ("<ticker>|down#2").
+- 발송된 단계만 UPDATE_THRESHOLD_*_PERCENT 만큼 옮기고 다시 정렬해 stock.txt 에 가까운
+  단계부터 기록합니다.
+"""
+import bisect
+
+SEP = "/"
+DIRECTIONS = ("down", "up")
+
+
+def parse(text: str):
+    """"150/135/120" → 오름차순 [120.0, 135.0, 150.0]. 비었거나 숫자가 아니면 None."""
+    parts = [p.strip() for p in (text or "").split(SEP)]
+    if not any(parts):
+        return None
+    try:
+        levels = sorted(float(p) for p in parts if p)
+    except ValueError:
+        return None
+    return levels or None
+
+
+def format_levels(levels, direction: str) -> str:
+    """오름차순 단계 → stock.txt 표기 (가까운 단계부터, 소수 둘째 자리)."""
+    ordered = reversed(levels) if direction == "down" else levels
+    return SEP.join(f"{v:.2f}" for v in ordered)
+
+
+class Ladder:
+    """한 종목·한 방향의 단계 배열 (오름차순)."""
+
+    __slots__ = ("direction", "levels")
+
+    def __init__(self, direction: str, levels):
+        self.direction = direction
+        self.levels = levels
+
+    def __len__(self):
+        return len(self.levels)
+
+    def nearest(self) -> float:
+        return self.levels[-1] if self.direction == "down" else self.levels[0]
+
+    def kind(self, rank: int) -> str:
+        """단계 번호 → 중복 제거/rate-limit 에 쓰는 방향 이름 ("down", "down#2", ...)."""
+        return self.direction if rank == 1 else f"{self.direction}#{rank}"
+
+    def crossed(self, price: float):
+        """price 가 도달한 단계 [(단계 번호, 가격), ...] (가까운 단계부터)."""
+        if price != price:   # NaN 은 어떤 단계에도 도달하지 않는다 (bisect 는 전부 도달로 본다)
+            return []
+        lv = self.levels
+        n = len(lv)
+        if self.direction == "down":
+            i = bisect.bisect_left(lv, price)
+            return [(n - j, lv[j]) for j in range(n - 1, i - 1, -1)]
+        i = bisect.bisect_right(lv, price)
+        return [(j + 1, lv[j]) for j in range(i)]
+
+    def moved(self, new_values: dict):
+        """{단계 번호: 새 가격} 을 반영해 다시 정렬한 단계 배열."""
+        n = len(self.levels)
+        out = list(self.levels)
+        for rank, value in new_values.items():
+            out[n - rank if self.direction == "down" else rank - 1] = value
+        out.sort()
+        return out
+
+
+def of(stock: dict, direction: str):
+    """stock.txt 항목의 사다리. load_stocks() 의 "<dir>_levels" 가 없으면 단일 값으로 만든다."""
+    levels = stock.get(f"{direction}_levels")
+    if levels is None:
+        value = stock.get(direction)
+        levels = None if value is None else [value]
+    return Ladder(direction, levels) if levels else None
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Metrics
+=======
+알림/주간 리포트/대시보드 스크립트가 공유하는 경량 계측 레이어.
+
+- `STOCK_ALERT_METRICS_DIR` 환경변수가 설정된 경우에만 활성화됩니다.
+  비활성 상태에서 span()/observe()/inc() 는 공유 no-op 객체를 돌려주거나
+  바로 반환하므로 hot path 비용은 함수 호출 1회 수준입니다.
+- span(name): 단계별 소요 시간 (config_load, universe_parse, fetch, evaluate,
+  render, send, persist ...)
+- observe(name, seconds, label): 라벨(종목)별 지연시간 히스토그램
+- inc(name, n): 실행 중 누적되는 횟수 (Prometheus counter `<name>_total`)
+- gauge(name, value): 실행 시점의 크기/상태 값 (Prometheus gauge, 마지막 값만 남음)
+- 실행 종료 시 `<dir>/<job>.json` 과 Prometheus textfile collector 용
+  `<dir>/<job>.prom` 을 원자적으로(임시 파일 → rename) 기록합니다.
+
+사용 예:
+    @metrics.job("alert")
+    def main():
+        with metrics.span("fetch"):
+            t0 = metrics.clock()
+            ...
+            metrics.observe("fetch_seconds", metrics.clock() - t0, tkr)
+"""
+import os
+import json
+import time
+import functools
+from pathlib import Path
+
+# 종목별 시세 조회 지연 히스토그램 버킷 (초)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "stock_alert"
+
+clock = time.perf_counter
+
+_enabled = False
+_dir = None
+_job = None
+_started = None
+_spans = {}        # name -> [seconds, count]
+_hists = {}        # name -> {label: [bucket counts..., sum, count]}
+_counters = {}     # name -> value
+_gauges = {}       # name -> value
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = clock()
+        return self
+
+    def __exit__(self, *exc):
+        acc = _spans.setdefault(self.name, [0.0, 0])
+        acc[0] += clock() - self.t0
+        acc[1] += 1
+        return False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def configure(job: str, metrics_dir=None):
+    """실행 단위(job) 시작. 디렉토리가 없으면(미설정) 계측을 끈다."""
+    global _enabled, _dir, _job, _started
+    metrics_dir = metrics_dir or os.getenv("STOCK_ALERT_METRICS_DIR", "").strip()
+    _spans.clear(); _hists.clear(); _counters.clear(); _gauges.clear()
+    _job = job
+    _started = time.time()
+    _dir = Path(metrics_dir) if metrics_dir else None
+    _enabled = _dir is not None
+
+
+def span(name: str):
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def observe(name: str, value: float, label: str = ""):
+    if not _enabled:
+        return
+    per = _hists.setdefault(name, {})
+    h = per.get(label)
+    if h is None:
+        h = per[label] = [0] * len(BUCKETS) + [0.0, 0]
+    for i, le in enumerate(BUCKETS):
+        if value <= le:
+            h[i] += 1
+    h[-2] += value
+    h[-1] += 1
+
+
+def inc(name: str, n: float = 1):
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def gauge(name: str, value: float):
+    """누적이 아닌 현재 값 (예: 저장한 state 크기). 같은 이름으로 다시 부르면 덮어쓴다."""
+    if _enabled:
+        _gauges[name] = value
+
+
+def snapshot() -> dict:
+    return {
+        "job": _job,
+        "started_at": _started,
+        "spans": {k: {"seconds": round(v[0], 6), "count": v[1]} for k, v in _spans.items()},
+        "histograms": {
+            name: {
+                label: {
+                    "buckets": {str(le): h[i] for i, le in enumerate(BUCKETS)},
+                    "sum": round(h[-2], 6), "count": h[-1],
+                } for label, h in per.items()
+            } for name, per in _hists.items()
+        },
+        "counters": dict(_counters),
+        "gauges": dict(_gauges),
+    }
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def to_prometheus(snap: dict) -> str:
+    job = _esc(snap["job"])
+    lines = [
+        f"# TYPE {PREFIX}_last_run_timestamp_seconds gauge",
+        f'{PREFIX}_last_run_timestamp_seconds{{job="{job}"}} {snap["started_at"]:.3f}',
+        f"# TYPE {PREFIX}_span_seconds gauge",
+    ]
+    for name, sp in snap["spans"].items():
+        lines.append(f'{PREFIX}_span_seconds{{job="{job}",span="{_esc(name)}"}} {sp["seconds"]}')
+    for name, per in snap["histograms"].items():
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for label, h in per.items():
+            base = f'job="{job}",ticker="{_esc(label)}"'
+            for le, cnt in h["buckets"].items():
+                lines.append(f'{metric}_bucket{{{base},le="{le}"}} {cnt}')
+            lines.append(f'{metric}_bucket{{{base},le="+Inf"}} {h["count"]}')
+            lines.append(f"{metric}_sum{{{base}}} {h['sum']}")
+            lines.append(f"{metric}_count{{{base}}} {h['count']}")
+    for name, val in snap["counters"].items():
+        metric = f"{PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f'{metric}{{job="{job}"}} {val}')
+    for name, val in snap.get("gauges", {}).items():
+        metric = f"{PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f'{metric}{{job="{job}"}} {val}')
+    return "\n".join(lines) + "\n"
+
+
+def _atomic_write(path: Path, text: str):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def flush():
+    """JSON + Prometheus textfile 기록 (비활성 시 아무것도 하지 않음)."""
+    if not _enabled:
+        return
+    snap = snapshot()
+    _dir.mkdir(parents=True, exist_ok=True)
+    _atomic_write(_dir / f"{_job}.json", json.dumps(snap, ensure_ascii=False, indent=1))
+    _atomic_write(_dir / f"{_job}.prom", to_prometheus(snap))
+
+
+def job(name: str):
+    """main() 데코레이터: 계측 시작 → 전체 구간 span("total") → 종료 시 flush."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            configure(name)
+            try:
+                with span("total"):
+                    return fn(*args, **kwargs)
+            finally:
+                flush()
+        return wrapper
+    return deco
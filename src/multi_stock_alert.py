@@ -4,6 +4,13 @@
 Stock Alert Bot
 - BASE: /opt/stock_alert
 - INFO_TYPE: "info" (default) or "fast_info"
+- PRICE_HEDGE: "true" → hedged fetch (see price_sources.py), default "false"
+- SOURCE_ROUTING: "true" (default) → per-ticker source learned from state["sources"]
+- INTRABAR_MODE: "on" → thresholds checked against 1m/5m low/high since the last run
+- portfolios.json: several portfolios (own stock.txt/state/recipients) share one fetch (portfolios.py)
+- --shard i/N / --merge N: fetch split across N workers, merged into one evaluation (shards.py)
+- price_down/price_up may list several levels "150/135/120" (ladder.py)
+- --record [PATH] / --replay PATH: record provider responses of a run, re-run it offline (cassette.py)
 - History mode (K3): auto — disabled on CI/GitHub Actions, enabled otherwise.
 
 Files under /opt/stock_alert:
@@ -13,13 +20,29 @@ Files under /opt/stock_alert:
   - state.json            (runtime state)
   - history.json          (recent alerts log; auto-disabled on CI)
 """
-import copy, os, sys, csv, json, smtplib, ssl, datetime, traceback
+import copy, os, sys, csv, json, smtplib, ssl, datetime, tempfile, time, traceback
 from pathlib import Path
 from email.mime.text import MIMEText
 
-import yfinance as yf
 import pytz
-import requests
+
+import cassette
+import digest
+import failures
+import http_pool
+import intrabar
+import ladder
+import metrics
+import portfolios
+import price_sources
+import ratelimit
+import recipients
+import rules
+import shards
+import state_gc
+import state_overlay
+import tickstore
+from config import Config, load_config
 
 # ---------- Paths / Constants ----------
 # 기본 경로는 스크립트 위치 기준 상위 디렉토리의 data 폴더로 설정 (환경변수로 오버라이드 가능)
@@ -29,120 +52,18 @@ CONFIG_PATH = BASE / "config.txt"
 STOCKS_PATH = BASE / "stock.txt"
 STATE_PATH  = BASE / "state.json"
 HISTORY_PATH= BASE / "history.json"
+PORTFOLIOS_PATH = BASE / "portfolios.json"
+RULES_PATH  = BASE / "rules.txt"
+RULES_CACHE_PATH = BASE / "rules_cache.json"
+BARS_DIR    = BASE / "bars"
+TICKS_DIR   = BASE / "ticks"
+SHARDS_DIR  = BASE / "shards"
+CASSETTES_DIR = BASE / "cassettes"
 LOG_PREFIX  = "[STOCK-ALERT] "
 GITHUB_URL = "https://github.com/leemgs/stock-alert"
 HOMEPAGE_URL = "https://leemgs.github.io/stock-alert/"
 
 
-# ---------- Helpers: env / CI detection ----------
-def _is_ci_like_env() -> bool:
-    # GitHub Actions exposes GITHUB_ACTIONS=true and CI=true
-    ga = os.getenv("GITHUB_ACTIONS", "").lower() == "true"
-    ci = os.getenv("CI", "").lower() == "true"
-    return ga or ci
-
-# ---------- Config ----------
-def load_kv(path: Path) -> dict:
-    kv={}
-    if path.exists():
-        for raw in path.read_text(encoding="utf-8").splitlines():
-            s=raw.strip()
-            if not s or s.startswith("#") or "=" not in s: continue
-            k,v=s.split("=",1); kv[k.strip()]=v.strip()
-            
-    # 환경변수 우선 병합
-    for k, v in os.environ.items():
-        if k not in kv and v.strip() != "":
-            kv[k] = v.strip()
-            
-    return kv
-
-def load_config(path: Path)->dict:
-    c = load_kv(path)
-    
-    # email.json 로드하여 병합 (존재하는 경우)
-    email_json_path = path.parent / "email.json"
-    if email_json_path.exists():
-        try:
-            with open(email_json_path, "r", encoding="utf-8") as f:
-                email_cfg = json.load(f)
-                if "smtp_host" in email_cfg: c["SMTP_HOST"] = email_cfg["smtp_host"]
-                if "smtp_port" in email_cfg: c["SMTP_PORT"] = str(email_cfg["smtp_port"])
-                if "smtp_user" in email_cfg: c["SMTP_USER"] = email_cfg["smtp_user"]
-                
-                # sender -> EMAIL_FROM
-                if "sender" in email_cfg: 
-                    c["EMAIL_FROM"] = email_cfg["sender"]
-                elif "smtp_user" in email_cfg:
-                    c["EMAIL_FROM"] = email_cfg["smtp_user"]
-                
-                # receivers -> EMAIL_TO
-                if "receivers" in email_cfg:
-                    receivers = email_cfg["receivers"]
-                    if isinstance(receivers, list):
-                        c["EMAIL_TO"] = ",".join(receivers)
-                    else:
-                        c["EMAIL_TO"] = str(receivers)
-        except Exception as e:
-            print(f"[ERROR] 이메일 설정 파일(email.json) 파싱 실패: {e}", file=sys.stderr)
-
-    # 환경변수가 명시적으로 지정된 경우 최우선 적용 (기존 환경변수 동작 보장)
-    for env_k, env_v in os.environ.items():
-        if env_v.strip() != "":
-            if env_k in {"SMTP_HOST", "SMTP_PORT", "SMTP_USER", "EMAIL_FROM", "EMAIL_TO", "SMTP_PASS"}:
-                c[env_k] = env_v.strip()
-
-    # defaults
-    c.setdefault("SMTP_PORT","587")
-    c.setdefault("EMAIL_FROM", c.get("SMTP_USER","stock-alert@example.com"))
-    c.setdefault("EMAIL_TO", c.get("SMTP_USER","root@localhost"))
-    c.setdefault("TZ","Asia/Seoul")
-    c.setdefault("DAILY_DEDUP","true")
-    c.setdefault("ALERT_ON_CROSSDOWN_ONLY","false")
-    c.setdefault("ALERT_ON_CROSSUP_ONLY","false")
-
-    # Slack
-    c.setdefault("SLACK_USERNAME","Stock-Alert-Bot")
-    # Rate-limit (Hardcoded)
-    c["ALERT_RATE_LIMIT_PER_TICKER_PER_DAY"] = 2
-    c["ALERT_MIN_INTERVAL_MINUTES"] = 60
-    c["ALERT_GLOBAL_DAILY_CAP"] = 100
-
-    # Price source
-    c.setdefault("INFO_TYPE", "info")
-
-    # History mode (K3: auto)
-    # HISTORY_MODE in {"auto","on","off"}
-    c.setdefault("HISTORY_MODE", "auto")
-
-    c.setdefault("UPDATE_THRESHOLD_DOWN_PERCENT", "10")
-    c.setdefault("UPDATE_THRESHOLD_UP_PERCENT", "10")
-    
-    # types
-    c["SMTP_PORT"]=int(c["SMTP_PORT"])
-    c["DAILY_DEDUP"]=c["DAILY_DEDUP"].lower()=="true"
-    c["ALERT_ON_CROSSDOWN_ONLY"]=c["ALERT_ON_CROSSDOWN_ONLY"].lower()=="true"
-    c["ALERT_ON_CROSSUP_ONLY"]=c["ALERT_ON_CROSSUP_ONLY"].lower()=="true"
-    c["UPDATE_THRESHOLD_DOWN_PERCENT"]=float(c["UPDATE_THRESHOLD_DOWN_PERCENT"])
-    c["UPDATE_THRESHOLD_UP_PERCENT"]=float(c["UPDATE_THRESHOLD_UP_PERCENT"])
-    
-    c["INFO_TYPE"]=c["INFO_TYPE"].lower().strip()
-    if c["INFO_TYPE"] not in {"fast_info","info"}:
-        c["INFO_TYPE"] = "info"
-
-    hm = c["HISTORY_MODE"].lower().strip()
-    if hm not in {"auto","on","off"}:
-        hm = "auto"
-    # Resolve auto -> disabled on CI, enabled otherwise
-    if hm == "auto":
-        c["HISTORY_ENABLE"] = (not _is_ci_like_env())
-    elif hm == "on":
-        c["HISTORY_ENABLE"] = True
-    else:
-        c["HISTORY_ENABLE"] = False
-
-    return c
-
 # ---------- Stocks / State / History ----------
 def parse_float_or_none(s:str):
     s=s.strip()
@@ -159,42 +80,50 @@ def load_stocks(path:Path):
             parts=[p.strip() for p in line.split(",") ]
             while len(parts)<6: parts.append("")
             loc,name,ticker,down_str,up_str,desc = parts[:6]
-            down=parse_float_or_none(down_str); up=parse_float_or_none(up_str)
-            if down is None and up is None: continue
-            items.append({"loc":loc,"name":name,"ticker":ticker,"down":down,"up":up,"desc":desc})
+            # "150/135/120" 처럼 여러 단계를 적을 수 있다. down/up 은 현재가에 가장 가까운 단계.
+            downs=ladder.parse(down_str); ups=ladder.parse(up_str)
+            if downs is None and ups is None: continue
+            items.append({"loc":loc,"name":name,"ticker":ticker,
+                          "down":downs[-1] if downs else None,"up":ups[0] if ups else None,
+                          "down_levels":downs,"up_levels":ups,"desc":desc})
     return items
 
-def load_state():
+def load_state(path: Path = None):
+    path = path or STATE_PATH
     default = {
         "last_alert_date":{}, "last_price":{},
-        "alert_counters":{"date":None,"per":{}},
-        "last_alert_ts":{},
-        "global_counter":{"date":None,"count":0}
+        "rl":{},
+        "failures":{},
+        "sources":{}
     }
-    if STATE_PATH.exists():
+    if path.exists():
         try:
-            loaded = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+            loaded = json.loads(path.read_text(encoding="utf-8"))
             if not isinstance(loaded, dict):
                 raise ValueError("state root must be an object")
             # 이전 버전의 state 또는 빈({}) 캐시도 안전하게 마이그레이션한다.
             for key, value in default.items():
                 loaded.setdefault(key, copy.deepcopy(value))
-            loaded["alert_counters"].setdefault("date", None)
-            loaded["alert_counters"].setdefault("per", {})
-            loaded["global_counter"].setdefault("date", None)
-            loaded["global_counter"].setdefault("count", 0)
             return loaded
         except: pass
     return default
 
-def save_state(st): STATE_PATH.write_text(json.dumps(st,ensure_ascii=False),encoding="utf-8")
+def save_state(st, path: Path = None):
+    # 임시 파일에 쓴 뒤 교체해, 중간에 중단돼도 이전 state.json 이 온전히 남도록 한다.
+    # 공백 없는 compact JSON 으로 저장한다. 반환: 기록한 바이트 수
+    data = json.dumps(st,ensure_ascii=False,separators=(",",":")).encode("utf-8")
+    path = path or STATE_PATH
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return len(data)
 
 
 
 def update_stock_file(path: Path, updates: dict):
     """
     Updates the stock.txt file with new threshold values.
-    updates: { ticker: { 'down': float, 'up': float } }
+    updates: { ticker: { 'down': float | [단계, ...], 'up': float | [단계, ...] } }
     """
     if not updates:
         return
@@ -216,10 +145,10 @@ def update_stock_file(path: Path, updates: dict):
                     # loc, name, ticker, down, up, desc
                     while len(parts) < 6: parts.append("")
                     
-                    if 'down' in upd and upd['down'] is not None:
-                        parts[3] = f"{upd['down']:.2f}"
-                    if 'up' in upd and upd['up'] is not None:
-                        parts[4] = f"{upd['up']:.2f}"
+                    for col, key in ((3, 'down'), (4, 'up')):
+                        val = upd.get(key)
+                        if val is not None:
+                            parts[col] = ladder.format_levels(val if isinstance(val, list) else [val], key)
                     
                     # Reconstruct line. Use ", " for readability as in the example.
                     line = ", ".join(parts)
@@ -230,76 +159,95 @@ def update_stock_file(path: Path, updates: dict):
     except Exception as e:
         print(f"{LOG_PREFIX}파일 업데이트 중 오류 발생: {e}", file=sys.stderr)
 
-def load_history(cfg):
+def load_history(cfg, path: Path = None):
+    path = path or HISTORY_PATH
     if not cfg.get("HISTORY_ENABLE", True):
         return []
-    if HISTORY_PATH.exists():
-        try: return json.loads(HISTORY_PATH.read_text(encoding="utf-8"))
+    if path.exists():
+        try: return json.loads(path.read_text(encoding="utf-8"))
         except: pass
     return []
 
-def append_history(cfg, events):
+def append_history(cfg, events, path: Path = None):
+    path = path or HISTORY_PATH
     if not cfg.get("HISTORY_ENABLE", True):
         return
-    hist = load_history(cfg)
+    hist = load_history(cfg, path)
     hist.extend(events)
     if len(hist)>5000: hist=hist[-5000:]
-    HISTORY_PATH.write_text(json.dumps(hist,ensure_ascii=False),encoding="utf-8")
+    path.write_text(json.dumps(hist,ensure_ascii=False),encoding="utf-8")
 
 # ---------- Time / Window ----------
 def now_tz(tzname:str):
-    return datetime.datetime.now(pytz.timezone(tzname))
+    now = datetime.datetime.now(pytz.timezone(tzname))
+    tape = cassette.active()
+    # 카세트 재생 중에는 기록된 실행 시각으로 고정한다.
+    return tape.clock(now) if tape is not None else now
 
 
 
 # ---------- Price fetch (requested logic) ----------
-def fetch_price(ticker: str, info_type: str = "info"):
-    t = yf.Ticker(ticker)
-
-    fast_price = None
-    info_price = None
-
-    # fast_info
-    try:
-        fast_price = t.fast_info.last_price
-    except Exception:
-        fast_price = None
-
-    # info
-    try:
-        info_data = t.info
-        info_price = info_data.get("regularMarketPrice")
-    except Exception:
-        info_price = None
+def fetch_price(ticker: str, info_type: str = "info", hedge: bool = False, hedge_delay=None,
+                stats=None, probe_every=price_sources.PROBE_EVERY):
+    """
+    stats (state["sources"][ticker]) 가 주어지면 종목별로 학습된 소스를 먼저 조회하고
+    (price_sources.route), 주어지지 않으면 INFO_TYPE 우선순위로 두 소스를 모두 조회한다.
+    """
+    tape = cassette.active()
+    if tape is not None and tape.replaying:
+        t = cassette.Ticker(ticker)   # 재생: 기록된 응답만 쓰므로 yfinance 를 로드하지 않는다
+    else:
+        import yfinance as yf   # 무거운 의존성(pandas 포함)은 시세 조회 시점에만 로드
+        t = yf.Ticker(ticker, session=http_pool.session())
 
     # 선택 우선순위
-    if info_type == "fast_info":
-        primary, secondary = fast_price, info_price
+    if stats is not None:
+        primary, secondary, probe = price_sources.route(stats, info_type, probe_every)
+        metrics.inc(f"route_{primary}")
+    elif info_type == "fast_info":
+        primary, secondary, probe = "fast_info", "info", True
     else:  # default "info"
-        primary, secondary = info_price, fast_price
+        primary, secondary, probe = "info", "fast_info", True
 
-    price = primary if primary is not None else secondary
+    if hedge and not (stats is not None and probe):
+        # 선호 소스가 p50 지연 안에 답하지 않으면 다른 소스를 병행, 먼저 온 유효 가격 채택
+        delay = price_sources.hedge_delay(primary, hedge_delay if hedge_delay is not None
+                                          else price_sources.DEFAULT_HEDGE_DELAY)
+        price, _ = price_sources.fetch_hedged(t, primary, secondary, delay, stats)
+    else:
+        price = price_sources.read(t, primary, stats)
+        if price is None or probe:
+            other = price_sources.read(t, secondary, stats)
+            price = price if price is not None else other
 
     # 최종 폴백: 1분봉 Close
     if price is None:
-        try:
-            hist = t.history(period="1d", interval="1m")
-            if not hist.empty:
-                price = float(hist["Close"].iloc[-1])
-        except Exception:
-            price = None
+        price = price_sources.read(t, "history")
 
     return price
 
 # ---------- Email / Slack ----------
 def send_email(cfg, subj, body, subtype="plain"):
     to_addrs = [x.strip() for x in cfg["EMAIL_TO"].split(",") if x.strip()]
-    msg=MIMEText(body, subtype, _charset="utf-8")
-    msg["Subject"]=subj; msg["From"]=cfg["EMAIL_FROM"]; msg["To"]=", ".join(to_addrs)
+    send_emails(cfg, [(to_addrs, subj, body)], subtype)
+
+def send_emails(cfg, messages, subtype="plain"):
+    """[(수신자 목록, 제목, 본문), ...] 을 SMTP 세션 하나(로그인 1회)로 보낸다."""
+    tape = cassette.active()
+    outgoing = []
+    for to_addrs, subj, body in messages:
+        if tape is not None and not tape.send("email", subj, to_addrs, body):
+            continue
+        msg=MIMEText(body, subtype, _charset="utf-8")
+        msg["Subject"]=subj; msg["From"]=cfg["EMAIL_FROM"]; msg["To"]=", ".join(to_addrs)
+        outgoing.append((to_addrs, msg))
+    if not outgoing:
+        return
     ctx=ssl.create_default_context()
     with smtplib.SMTP(cfg["SMTP_HOST"], cfg["SMTP_PORT"], timeout=20) as s:
         s.ehlo(); s.starttls(context=ctx); s.login(cfg["SMTP_USER"], cfg["SMTP_PASS"])
-        s.sendmail(cfg["EMAIL_FROM"], to_addrs, msg.as_string())
+        for to_addrs, msg in outgoing:
+            s.sendmail(cfg["EMAIL_FROM"], to_addrs, msg.as_string())
 
 def validate_email_config(cfg):
     """알림을 놓치기 전에 필수 SMTP 설정 오류를 명확하게 실패시킨다."""
@@ -311,12 +259,8 @@ def validate_email_config(cfg):
             + " (GitHub Actions의 SMTP_PASS secret과 data/email.json을 확인하세요)"
         )
 
-def generate_html_body(cfg, ts_str, down_breaches, up_breaches, errors, rate_limited_notes):
-    """
-    Generates a premium HTML body for the stock alert email.
-    """
-    # CSS Styles
-    styles = """
+# CSS Styles
+_HTML_STYLES = """
     <style>
         body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; background-color: #f4f7f9; margin: 0; padding: 0; }
         .container { max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 10px rgba(0,0,0,0.05); }
@@ -327,6 +271,7 @@ def generate_html_body(cfg, ts_str, down_breaches, up_breaches, errors, rate_lim
         .section-title { font-size: 18px; font-weight: bold; margin-bottom: 15px; padding-bottom: 5px; border-bottom: 2px solid #eee; }
         .down-title { color: #3498db; border-color: #3498db; }
         .up-title { color: #e74c3c; border-color: #e74c3c; }
+        .rule-title { color: #8e44ad; border-color: #8e44ad; }
         .alert-card { background: #fdfdfd; border: 1px solid #eee; border-radius: 6px; padding: 15px; margin-bottom: 12px; }
         .ticker { font-weight: bold; font-size: 16px; color: #2c3e50; }
         .price-info { margin-top: 5px; font-size: 15px; }
@@ -344,74 +289,98 @@ def generate_html_body(cfg, ts_str, down_breaches, up_breaches, errors, rate_lim
     </style>
     """
 
-    # Build Sections
-    down_html = ""
-    down_pct = cfg.get("UPDATE_THRESHOLD_DOWN_PERCENT", 10)
-    if down_breaches:
-        down_html = '<div class="section-title down-title">📉 하락 목표 도달 (매수)</div>'
-        # Group by domain
-        down_by_domain = {}
-        for loc, n, t, p, th, nth, desc in down_breaches:
-            down_by_domain.setdefault(loc, []).append((n, t, p, th, nth, desc))
-            
-        for domain, items in down_by_domain.items():
-            down_html += f'<div style="font-weight: bold; margin-top: 15px; margin-bottom: 8px; color: #2c3e50; font-size: 15px; border-left: 3px solid #3498db; padding-left: 8px;">📂 {domain}</div>'
-            for n, t, p, th, nth, desc in items:
-                desc_div = f'<div class="description" style="font-size: 13px; color: #666; margin-top: 4px; margin-bottom: 8px;"><strong>설명:</strong> {desc}</div>' if desc else ''
-                down_html += f"""
+def _domain_heading(domain, color):
+    return f'<div style="font-weight: bold; margin-top: 15px; margin-bottom: 8px; color: #2c3e50; font-size: 15px; border-left: 3px solid {color}; padding-left: 8px;">📂 {domain}</div>'
+
+def _alert_card(n, t, desc, price_info):
+    desc_div = f'<div class="description" style="font-size: 13px; color: #666; margin-top: 4px; margin-bottom: 8px;"><strong>설명:</strong> {desc}</div>' if desc else ''
+    return f"""
                 <div class="alert-card" style="margin-left: 10px;">
                     <div class="ticker">{n} <span style="color:#7f8c8d; font-weight:normal;">({t})</span></div>
                     {desc_div}
                     <div class="price-info">
-                        현재가 <span class="price-value buy-value" style="color:#2563eb;">{p:.2f}</span>
-                        ≤ 매수 목표 <span class="price-value buy-value" style="color:#2563eb;">{th:.2f}</span>
-                        ({down_pct:g}% 자동 하향: <span class="price-value buy-value" style="color:#2563eb;">{nth:.2f}</span>)
+                        {price_info}
                     </div>
                 </div>
                 """
 
+def render_alert_sections(cfg, down_breaches, up_breaches, rule_hits=None):
+    """
+    알림 카드를 종목마다 한 번만 렌더링한 조각. 수신자별 메일은 이 조각을 골라 조립한다.
+    반환: [(구역 제목 HTML, [(domain, 도메인 제목 HTML, [(ticker, 카드 HTML), ...]), ...]), ...]
+    """
+    down_pct = cfg.get("UPDATE_THRESHOLD_DOWN_PERCENT", 10)
     up_pct = cfg.get("UPDATE_THRESHOLD_UP_PERCENT", 10)
-    up_html = ""
-    if up_breaches:
-        up_html = '<div class="section-title up-title">📈 상승 목표 도달 (매도)</div>'
+    buy = '<span class="price-value buy-value" style="color:#2563eb;">'
+    sell = '<span class="price-value sell-value" style="color:#dc2626;">'
+    specs = [
+        ('<div class="section-title down-title">📉 하락 목표 도달 (매수)</div>', "#3498db", down_breaches,
+         lambda p, th, nth: f"현재가 {buy}{p:.2f}</span>\n                        ≤ 매수 목표 {buy}{th:.2f}</span>\n"
+                            f"                        ({down_pct:g}% 자동 하향: {buy}{nth:.2f}</span>)"),
+        ('<div class="section-title up-title">📈 상승 목표 도달 (매도)</div>', "#e74c3c", up_breaches,
+         lambda p, th, nth: f"현재가 {sell}{p:.2f}</span>\n                        ≥ 매도 목표 {sell}{th:.2f}</span>\n"
+                            f"                        ({up_pct:g}% 자동 상향: {sell}{nth:.2f}</span>)"),
+        ('<div class="section-title rule-title">📐 규칙 알림</div>', "#8e44ad", rule_hits or [],
+         lambda p, label, ref: f'현재가 <span class="price-value">{p:.2f}</span> · {label}\n'
+                               f'                        (기준 <span class="price-value">{ref:.2f}</span>)'),
+    ]
+    sections = []
+    for title, color, items, price_info in specs:
+        if not items:
+            continue
         # Group by domain
-        up_by_domain = {}
-        for loc, n, t, p, th, nth, desc in up_breaches:
-            up_by_domain.setdefault(loc, []).append((n, t, p, th, nth, desc))
-            
-        for domain, items in up_by_domain.items():
-            up_html += f'<div style="font-weight: bold; margin-top: 15px; margin-bottom: 8px; color: #2c3e50; font-size: 15px; border-left: 3px solid #e74c3c; padding-left: 8px;">📂 {domain}</div>'
-            for n, t, p, th, nth, desc in items:
-                desc_div = f'<div class="description" style="font-size: 13px; color: #666; margin-top: 4px; margin-bottom: 8px;"><strong>설명:</strong> {desc}</div>' if desc else ''
-                up_html += f"""
-                <div class="alert-card" style="margin-left: 10px;">
-                    <div class="ticker">{n} <span style="color:#7f8c8d; font-weight:normal;">({t})</span></div>
-                    {desc_div}
-                    <div class="price-info">
-                        현재가 <span class="price-value sell-value" style="color:#dc2626;">{p:.2f}</span>
-                        ≥ 매도 목표 <span class="price-value sell-value" style="color:#dc2626;">{th:.2f}</span>
-                        ({up_pct:g}% 자동 상향: <span class="price-value sell-value" style="color:#dc2626;">{nth:.2f}</span>)
-                    </div>
-                </div>
-                """
+        by_domain = {}
+        for loc, n, t, p, a, b, desc in items:
+            by_domain.setdefault(loc, []).append((t, _alert_card(n, t, desc, price_info(p, a, b))))
+        sections.append((title, [(d, _domain_heading(d, color), cards) for d, cards in by_domain.items()]))
+    return sections
 
+def assemble_alert_sections(sections, select=None, cache=None):
+    """
+    render_alert_sections() 조각 → 구역별 HTML 목록. select(recipients.Selector) 가 있으면 구독한
+    알림만 싣는다. 도메인 전체를 싣는 블록은 cache 에 두고 다른 수신자 그룹과 나눠 쓴다.
+    """
+    parts = []
+    for i, (title, domains) in enumerate(sections):
+        body = []
+        for domain, heading, cards in domains:
+            if select is None or select.whole(domain):
+                block = cache.get((i, domain)) if cache is not None else None
+                if block is None:
+                    block = heading + "".join(card for _, card in cards)
+                    if cache is not None: cache[(i, domain)] = block
+                body.append(block)
+            else:
+                chosen = [card for t, card in cards if t in select.tickers]
+                if chosen: body.append(heading + "".join(chosen))
+        if body:
+            parts.append(title + "".join(body))
+    return parts
+
+def alert_html_page(ts_str, section_parts, errors, rate_limited_notes, failure_summary=None):
+    """구역 HTML(assemble_alert_sections) 에 헤더/오류/생략 목록/푸터를 붙인 메일 본문."""
     error_html = ""
     if errors:
         items = "".join([f'<div class="error-item">• {e}</div>' for e in errors])
         error_html = f'<div class="error-section"><div class="error-title">⚠️ 조회 오류</div>{items}</div>'
 
+    if failure_summary:
+        items = "".join([f'<div class="error-item">• {x}</div>' for x in failure_summary])
+        error_html += f'<div class="error-section"><div class="error-title">⏸️ 연속 조회 실패 종목 (일일 요약, 백오프 재시도)</div>{items}</div>'
+
     note_html = ""
     if rate_limited_notes:
         items = "".join([f'<div class="note-item">• {x}</div>' for x in rate_limited_notes])
         note_html = f'<div class="note-section"><div class="note-title">ℹ️ 생략된 알림 (Rate-limit)</div>{items}</div>'
 
+    sections_html = "\n                ".join(section_parts)
     html = f"""
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        {styles}
+        {_HTML_STYLES}
     </head>
     <body>
         <div class="container">
@@ -420,8 +389,7 @@ def generate_html_body(cfg, ts_str, down_breaches, up_breaches, errors, rate_lim
                 <p>{ts_str}</p>
             </div>
             <div class="content">
-                {down_html}
-                {up_html}
+                {sections_html}
                 {note_html}
                 {error_html}
             </div>
@@ -437,6 +405,40 @@ def generate_html_body(cfg, ts_str, down_breaches, up_breaches, errors, rate_lim
     """
     return html
 
+def generate_html_body(cfg, ts_str, down_breaches, up_breaches, errors, rate_limited_notes,
+                       failure_summary=None, rule_hits=None):
+    """
+    Generates a premium HTML body for the stock alert email.
+    failure_summary: 연속 조회 실패 종목 일일 요약 (failures.take_daily_summary)
+    rule_hits: 규칙 알림 [(loc, name, ticker, price, 조건, 기준값, desc)] (rules.py)
+    """
+    sections = render_alert_sections(cfg, down_breaches, up_breaches, rule_hits)
+    return alert_html_page(ts_str, assemble_alert_sections(sections), errors, rate_limited_notes,
+                           failure_summary)
+
+def personalized_bodies(cfg, ts_str, down_breaches, up_breaches, errors, rate_limited_notes,
+                        failure_summary, rule_hits, groups, loc_of):
+    """
+    수신자 그룹(recipients.groups)별 메일 본문. 카드와 도메인 블록은 한 번만 렌더링해 조립한다.
+    loc_of: {ticker: domain} (오류/생략 줄을 구독 종목으로 거르는 데 씀)
+    반환: [(주소 목록, 본문)] (받을 알림이 없는 그룹은 빠진다)
+    """
+    sections = render_alert_sections(cfg, down_breaches, up_breaches, rule_hits)
+    cache = {}
+    out = []
+    for select, addrs in groups:
+        parts = assemble_alert_sections(sections, select, cache)
+        if not parts or not addrs:
+            continue
+        if select is None:
+            body = alert_html_page(ts_str, parts, errors, rate_limited_notes, failure_summary)
+        else:
+            body = alert_html_page(ts_str, parts, select.lines(errors, loc_of),
+                                   select.lines(rate_limited_notes, loc_of),
+                                   select.lines(failure_summary or [], loc_of))
+        out.append((addrs, body))
+    return out
+
 def _test_mode_enabled() -> bool:
     """--test 인자 또는 STOCK_ALERT_TEST 환경변수(true/1/yes)로 테스트 모드 활성화."""
     if "--test" in sys.argv:
@@ -484,210 +486,584 @@ def slack_blocks_section(title, rows):
 
 def post_slack(url, username, icon_emoji, blocks):
     payload={"username":username, "icon_emoji":icon_emoji, "blocks":blocks}
+    tape = cassette.active()
+    if tape is not None and not tape.send("slack", username, (), json.dumps(blocks, ensure_ascii=False)):
+        return
+    import requests
     r=requests.post(url, json=payload, timeout=10)
     if r.status_code!=200:
         print(LOG_PREFIX+f"Slack 전송 실패: {r.status_code} {r.text}", file=sys.stderr)
 
 
 
-# ---------- Rate-limit ----------
-def rl_reset_if_new_day(state, today):
-    if state["alert_counters"].get("date") != today:
-        state["alert_counters"] = {"date": today, "per": {}}
-    if state["global_counter"].get("date") != today:
-        state["global_counter"] = {"date": today, "count": 0}
-
-def rl_key(ticker, kind):  # kind in {"down","up"}
-    return f"{ticker}|{kind}"
-
-def rl_can_send(cfg, state, tz, ticker, kind, now_dt):
-    k = rl_key(ticker, kind)
-    if state["global_counter"]["count"] >= cfg["ALERT_GLOBAL_DAILY_CAP"]:
-        return (False, "global_cap_reached")
-    per = state["alert_counters"]["per"].get(k, 0)
-    if per >= cfg["ALERT_RATE_LIMIT_PER_TICKER_PER_DAY"]:
-        return (False, "per_ticker_daily_cap")
-    last_ts_str = state["last_alert_ts"].get(k)
-    if last_ts_str:
-        try:
-            last_dt = datetime.datetime.fromisoformat(last_ts_str)
-        except Exception:
-            last_dt = None
-        if last_dt is not None:
-            delta = now_dt - last_dt
-            mins = delta.total_seconds()/60.0
-            if mins < cfg["ALERT_MIN_INTERVAL_MINUTES"]:
-                return (False, "min_interval_violation")
-    return (True, "")
-
-def rl_commit(state, ticker, kind, now_dt):
-    k = rl_key(ticker, kind)
-    cur = state["alert_counters"]["per"].get(k, 0)
-    state["alert_counters"]["per"][k] = cur + 1
-    state["global_counter"]["count"] = state["global_counter"].get("count", 0) + 1
-    state["last_alert_ts"][k] = now_dt.isoformat()
+def record_ticks(cfg, ts, prices):
+    """이번 실행에서 조회한 가격을 tick store 에 덧붙이고 보관 기간이 지난 행을 잘라낸다."""
+    now = int(ts.timestamp())
+    try:
+        with tickstore.open_store(TICKS_DIR) as store:
+            store.append(now, prices)
+            cutoff = now - int(cfg["TICKSTORE_RETENTION_DAYS"] * 86400)
+            first = store.first_ts()
+            # 매 실행 재작성하지 않도록 하루 이상 지난 행이 쌓였을 때만 자른다.
+            if first is not None and first < cutoff - 86400:
+                store.trim(cutoff)
+    except OSError as e:
+        # 시세 기록 실패가 알림 발송을 막지 않도록 경고만 남긴다.
+        print(LOG_PREFIX+f"tick store 기록 실패: {e}", file=sys.stderr)
 
 # ---------- Main ----------
-def main():
-    cfg = load_config(CONFIG_PATH)
-    validate_email_config(cfg)
-    info_type = cfg.get("INFO_TYPE", "info").lower()
-
-    ts = now_tz(cfg["TZ"]); today=ts.strftime("%Y-%m-%d"); ts_str=ts.strftime("%Y-%m-%d %H:%M:%S %Z")
-
-    # 테스트 모드: 시세 조회/상태 변경 없이 샘플 알림 메일만 1회 발송 후 종료
-    if _test_mode_enabled():
-        send_test_email(cfg, ts_str)
-        return
-
-    stocks=load_stocks(STOCKS_PATH)
-    state = load_state()
-
-    rl_reset_if_new_day(state, today)
-    # 알림 판정 상태는 메일 발송 성공 전까지 임시 복사본에만 기록한다. SMTP 실패 시
-    # 임계값/중복제거 상태를 소비하지 않아 다음 실행에서 동일 알림을 재시도할 수 있다.
-    pending_state = copy.deepcopy(state)
-
+def fetch_prices(stocks, info_type, cfg=None, state=None, ts=None):
+    """
+    전 종목 시세 조회. 반환: ({ticker: price}, [오류 메시지])
+    state 가 주어지면 연속 실패 종목은 백오프 기간 동안 건너뛰고(failures.py),
+    오류 메시지는 처음 실패했을 때만 남긴다 (이후는 일일/주간 요약).
+    """
+    prices = {}; errors = []
+    now = ts.timestamp() if ts is not None else None
+    for s in stocks:
+        tkr = s["ticker"]
+        if state is not None and not failures.is_due(state, tkr, now):
+            metrics.inc("fetch_skipped")
+            continue
+        t0 = metrics.clock()
+        err = None
+        try:
+            opts = {}
+            if cfg is not None and cfg.get("PRICE_HEDGE"):
+                opts.update(hedge=True, hedge_delay=cfg["PRICE_HEDGE_DELAY_MS"] / 1000.0)
+            if state is not None and cfg is not None and cfg.get("SOURCE_ROUTING"):
+                opts.update(stats=state.setdefault("sources", {}).setdefault(tkr, {}),
+                            probe_every=cfg["SOURCE_PROBE_EVERY"])
+            price = fetch_price(tkr, info_type, **opts)
+            if price is None:
+                err = "가격 조회 실패"
+            else:
+                prices[tkr] = price
+        except Exception as e:
+            err = str(e)
+        metrics.observe("fetch_seconds", metrics.clock() - t0, tkr)
+        if state is None:
+            if err: errors.append(f"{tkr}: {err}")
+        elif err:
+            rec = failures.record_failure(state, tkr, err, now, ts.strftime("%Y-%m-%d"),
+                                          cfg["FAILURE_BACKOFF_BASE_MINUTES"],
+                                          cfg["FAILURE_BACKOFF_MAX_MINUTES"])
+            if rec["count"] == 1:
+                errors.append(f"{tkr}: {err}")
+        else:
+            failures.record_success(state, tkr)
+    return prices, errors
+
+def evaluate(cfg, stocks, prices, state, pending_state, today, ts, ts_str, limiter=None,
+             ranges=None):
+    """
+    조회된 가격을 임계값과 비교해 발송할 알림을 고른다.
+    알림 판정 상태(중복제거/rate-limit)는 pending_state(state_overlay.Overlay)에만 기록하고,
+    last_price 는 발송 성공 여부와 관계없이 state 에 바로 기록한다.
+    limiter 가 없으면 cfg["RATE_LIMITS"] 로 pending_state["rl"] 위의 RateLimiter 를 만든다.
+    ranges ({ticker: (구간 저가, 구간 고가)}, intrabar.py) 가 있으면 현재가 대신 구간 저가/고가로
+    임계 도달을 판정해 실행 사이의 일시적 돌파도 알린다.
+    반환: {"down","up","notes","events","updates","errors"}
+    """
     down_breaches=[]; up_breaches=[]; errors=[]; new_events=[]
     rate_limited_notes=[]
-    updates = {} # {ticker: {'down': val, 'up': val}}
+    updates = {} # {ticker: {'down': [단계, ...], 'up': [단계, ...]}}
+    if limiter is None:
+        limiter = ratelimit.RateLimiter(ratelimit.parse(cfg["RATE_LIMITS"]),
+                                        pending_state.setdefault("rl", {}), ts)
 
     for s in stocks:
-        tkr=s["ticker"]; dth=s["down"]; uth=s["up"]
+        tkr=s["ticker"]
+        if tkr not in prices: continue
+        price=prices[tkr]
+        lo = hi = price
+        if ranges and tkr in ranges:
+            lo = min(price, ranges[tkr][0]); hi = max(price, ranges[tkr][1])
         try:
-            price=fetch_price(tkr, info_type)
-            if price is None:
-                errors.append(f"{tkr}: 가격 조회 실패"); continue
             last=state["last_price"].get(tkr)
 
-            if dth is not None:
-                crossed=(last is not None and last>dth and price<=dth)
-                alert=False
-                if price<=dth:
+            downs = ladder.of(s, "down")
+            if downs is not None:
+                moved = {}
+                # 구간 저가가 도달한 단계만 bisect 로 골라 가까운 단계부터 판정한다 (ladder.py).
+                for rank, dth in downs.crossed(lo):
+                    kind = downs.kind(rank)
+                    crossed=(last is not None and last>dth)
                     if cfg["ALERT_ON_CROSSDOWN_ONLY"]: alert=crossed
-                    else:
-                        if cfg["DAILY_DEDUP"]:
-                            last_day=state["last_alert_date"].get(f"{tkr}|down")
-                            alert=(last_day!=today) or crossed
-                        else: alert=True
-                if alert:
-                    can, why = rl_can_send(cfg, pending_state, cfg["TZ"], tkr, "down", ts)
+                    elif cfg["DAILY_DEDUP"]:
+                        last_day=state["last_alert_date"].get(f"{tkr}|{kind}")
+                        alert=(last_day!=today) or crossed
+                    else: alert=True
+                    if not alert: continue
+                    can, why = limiter.admit(tkr, kind, s["loc"])
                     if can:
                         # [Mission] Update threshold
                         down_pct = cfg["UPDATE_THRESHOLD_DOWN_PERCENT"]
                         new_val = dth * (1.0 - (down_pct / 100.0))
-                        down_breaches.append((s["loc"], s["name"], tkr, price, dth, new_val, s.get("desc", "")))
-                        pending_state["last_alert_date"][f"{tkr}|down"]=today
-                        rl_commit(pending_state, tkr, "down", ts)
-                        new_events.append({"ts":ts_str,"dir":"down","name":s["name"],"ticker":tkr,"price":price,"threshold":dth})
-                        
-                        if tkr not in updates: updates[tkr] = {}
-                        updates[tkr]['down'] = new_val
+                        desc = s.get("desc", "")
+                        event = {"ts":ts_str,"dir":"down","name":s["name"],"ticker":tkr,"price":price,"threshold":dth}
+                        if len(downs) > 1:
+                            desc = f"{desc} (하한 {rank}/{len(downs)}단계)".strip()
+                            event["level"] = rank
+                        if price>dth:   # 구간 중에만 하한을 찍고 되돌아온 경우
+                            desc = f"{desc} (구간 저가 {lo:,.2f})".strip()
+                            event["low"] = lo
+                        down_breaches.append((s["loc"], s["name"], tkr, price, dth, new_val, desc))
+                        pending_state["last_alert_date"][f"{tkr}|{kind}"]=today
+                        new_events.append(event)
+                        moved[rank] = new_val
                     else:
-                        rate_limited_notes.append(f"{tkr}|down 제한({why})")
-
-            if uth is not None:
-                crossed=(last is not None and last<uth and price>=uth)
-                alert=False
-                if price>=uth:
+                        rate_limited_notes.append(f"{tkr}|{kind} 제한({why})")
+                if moved:
+                    updates.setdefault(tkr, {})['down'] = downs.moved(moved)
+
+            ups = ladder.of(s, "up")
+            if ups is not None:
+                moved = {}
+                for rank, uth in ups.crossed(hi):
+                    kind = ups.kind(rank)
+                    crossed=(last is not None and last<uth)
                     if cfg["ALERT_ON_CROSSUP_ONLY"]: alert=crossed
-                    else:
-                        if cfg["DAILY_DEDUP"]:
-                            last_day=state["last_alert_date"].get(f"{tkr}|up")
-                            alert=(last_day!=today) or crossed
-                        else: alert=True
-                if alert:
-                    can, why = rl_can_send(cfg, pending_state, cfg["TZ"], tkr, "up", ts)
+                    elif cfg["DAILY_DEDUP"]:
+                        last_day=state["last_alert_date"].get(f"{tkr}|{kind}")
+                        alert=(last_day!=today) or crossed
+                    else: alert=True
+                    if not alert: continue
+                    can, why = limiter.admit(tkr, kind, s["loc"])
                     if can:
                         # [Mission] Update threshold
                         up_pct = cfg["UPDATE_THRESHOLD_UP_PERCENT"]
                         new_val = uth * (1.0 + (up_pct / 100.0))
-                        up_breaches.append((s["loc"], s["name"], tkr, price, uth, new_val, s.get("desc", "")))
-                        pending_state["last_alert_date"][f"{tkr}|up"]=today
-                        rl_commit(pending_state, tkr, "up", ts)
-                        new_events.append({"ts":ts_str,"dir":"up","name":s["name"],"ticker":tkr,"price":price,"threshold":uth})
-                        
-                        if tkr not in updates: updates[tkr] = {}
-                        updates[tkr]['up'] = new_val
+                        desc = s.get("desc", "")
+                        event = {"ts":ts_str,"dir":"up","name":s["name"],"ticker":tkr,"price":price,"threshold":uth}
+                        if len(ups) > 1:
+                            desc = f"{desc} (상한 {rank}/{len(ups)}단계)".strip()
+                            event["level"] = rank
+                        if price<uth:   # 구간 중에만 상한을 찍고 되돌아온 경우
+                            desc = f"{desc} (구간 고가 {hi:,.2f})".strip()
+                            event["high"] = hi
+                        up_breaches.append((s["loc"], s["name"], tkr, price, uth, new_val, desc))
+                        pending_state["last_alert_date"][f"{tkr}|{kind}"]=today
+                        new_events.append(event)
+                        moved[rank] = new_val
                     else:
-                        rate_limited_notes.append(f"{tkr}|up 제한({why})")
+                        rate_limited_notes.append(f"{tkr}|{kind} 제한({why})")
+                if moved:
+                    updates.setdefault(tkr, {})['up'] = ups.moved(moved)
 
             state["last_price"][tkr] = price
-            pending_state["last_price"][tkr] = price
 
         except Exception as e:
             errors.append(f"{tkr}: {e}")
 
-    if down_breaches or up_breaches:
-        # Generate HTML Body
-        html_body = generate_html_body(cfg, ts_str, down_breaches, up_breaches, errors, rate_limited_notes)
+    return {"down": down_breaches, "up": up_breaches, "notes": rate_limited_notes,
+            "events": new_events, "updates": updates, "errors": errors}
+
+def evaluate_rules(cfg, book_rules, stocks, prices, last_prices, feats, state, pending_state,
+                   today, ts_str, limiter):
+    """
+    rules.txt 규칙 판정 (rules.py). 조건은 규칙마다 배열로 한 번에 비교하고, 통과한 종목만
+    evaluate() 와 같은 중복 제거/rate-limit 을 "<ticker>|rule:<규칙 id>" 범위로 거친다.
+    last_prices 는 evaluate() 가 last_price 를 갱신하기 전의 값이어야 한다.
+    반환: ([(loc, name, ticker, price, 조건, 기준값, desc)], [생략 메모], [history 이벤트])
+    """
+    hits=[]; notes=[]; events=[]
+    for rule, s, price, ref, value in rules.evaluate(book_rules, stocks, prices, last_prices, feats):
+        tkr=s["ticker"]; kind=f"rule:{rule.id}"
+        if cfg["DAILY_DEDUP"] and state["last_alert_date"].get(f"{tkr}|{kind}")==today:
+            continue
+        can, why = limiter.admit(tkr, kind, s["loc"])
+        if not can:
+            notes.append(f"{tkr}|{kind} 제한({why})")
+            continue
+        hits.append((s["loc"], s["name"], tkr, price, rule.label(value), ref, rule.desc or s.get("desc", "")))
+        pending_state["last_alert_date"][f"{tkr}|{kind}"]=today
+        events.append({"ts":ts_str,"dir":"rule","rule":rule.id,"name":s["name"],"ticker":tkr,
+                       "price":price,"threshold":ref})
+    return hits, notes, events
+
+def build_slack_blocks(cfg, ts_str, down_breaches, up_breaches, errors, rate_limited_notes,
+                       rule_hits=None):
+    blocks = slack_blocks_header(ts_str)
+    
+    # Group down breaches by domain
+    down_by_domain = {}
+    for loc, n, t, p, th, nth, desc in down_breaches:
+        down_by_domain.setdefault(loc, []).append((n, t, p, th, nth, desc))
         
-        try:
-            send_email(cfg, "[Stock Alert] 임계 도달 종목 (상/하한)", html_body, subtype="html")
-        except Exception as e:
-            # 실패를 성공(exit 0)으로 숨기지 않는다. 워크플로가 실패 알림을 표시하며,
-            # 아래 임계값 갱신/상태 저장도 실행되지 않는다.
-            raise RuntimeError(f"임계 알림 메일 발송 실패: {e}") from e
-        print(LOG_PREFIX+"메일 발송 완료")
-        state = pending_state
-
-        url = cfg.get("SLACK_WEBHOOK_URL")
-        if url:
-            blocks = slack_blocks_header(ts_str)
-            
-            # Group down breaches by domain
-            down_by_domain = {}
-            for loc, n, t, p, th, nth, desc in down_breaches:
-                down_by_domain.setdefault(loc, []).append((n, t, p, th, nth, desc))
-                
-            # Group up breaches by domain
-            up_by_domain = {}
-            for loc, n, t, p, th, nth, desc in up_breaches:
-                up_by_domain.setdefault(loc, []).append((n, t, p, th, nth, desc))
-
-            down_pct = cfg.get("UPDATE_THRESHOLD_DOWN_PERCENT", 10)
-            up_pct = cfg.get("UPDATE_THRESHOLD_UP_PERCENT", 10)
-
-            # Add down breaches to blocks
-            if down_breaches:
-                blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "*📉 하한 돌파 (현재가 ≤ 하한)*"}})
-                for domain, items in down_by_domain.items():
-                    domain_rows = []
-                    for n, t, p, th, nth, desc in items:
-                        item_str = f"- *{n}* `{t}` ({desc}): 현재가 `{p:.2f}` ≤ 하한가 `{th:.2f}` ({down_pct:g}% 자동 하향:`{nth:.2f}`)" if desc else f"- *{n}* `{t}`: 현재가 `{p:.2f}` ≤ 하한가 `{th:.2f}` ({down_pct:g}% 자동 하향:`{nth:.2f}`)"
-                        domain_rows.append(item_str)
-                    blocks += slack_blocks_section(f"📂 {domain}", domain_rows)
-
-            # Add up breaches to blocks
-            if up_breaches:
-                blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "*📈 상한 돌파 (현재가 ≥ 상한)*"}})
-                for domain, items in up_by_domain.items():
-                    domain_rows = []
-                    for n, t, p, th, nth, desc in items:
-                        item_str = f"- *{n}* `{t}` ({desc}): 현재가 `{p:.2f}` ≥ 상한가 `{th:.2f}` ({up_pct:g}% 자동 상향:`{nth:.2f}`)" if desc else f"- *{n}* `{t}`: 현재가 `{p:.2f}` ≥ 상한가 `{th:.2f}` ({up_pct:g}% 자동 상향:`{nth:.2f}`)"
-                        domain_rows.append(item_str)
-                    blocks += slack_blocks_section(f"📂 {domain}", domain_rows)
-
-            if errors or rate_limited_notes:
-                blocks.append({"type":"divider"})
-                if errors:
-                    blocks += slack_blocks_section("_(참고) 조회 오류_", [f"- {e}" for e in errors])
-                if rate_limited_notes:
-                    blocks += slack_blocks_section("_(참고) rate-limit 생략_", [f"- {x}" for x in rate_limited_notes])
-            post_slack(url, cfg.get("SLACK_USERNAME","Stock-Alert-Bot"), cfg.get("SLACK_ICON_EMOJI",":bar_chart:"), blocks)
+    # Group up breaches by domain
+    up_by_domain = {}
+    for loc, n, t, p, th, nth, desc in up_breaches:
+        up_by_domain.setdefault(loc, []).append((n, t, p, th, nth, desc))
+
+    down_pct = cfg.get("UPDATE_THRESHOLD_DOWN_PERCENT", 10)
+    up_pct = cfg.get("UPDATE_THRESHOLD_UP_PERCENT", 10)
+
+    # Add down breaches to blocks
+    if down_breaches:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "*📉 하한 돌파 (현재가 ≤ 하한)*"}})
+        for domain, items in down_by_domain.items():
+            domain_rows = []
+            for n, t, p, th, nth, desc in items:
+                item_str = f"- *{n}* `{t}` ({desc}): 현재가 `{p:.2f}` ≤ 하한가 `{th:.2f}` ({down_pct:g}% 자동 하향:`{nth:.2f}`)" if desc else f"- *{n}* `{t}`: 현재가 `{p:.2f}` ≤ 하한가 `{th:.2f}` ({down_pct:g}% 자동 하향:`{nth:.2f}`)"
+                domain_rows.append(item_str)
+            blocks += slack_blocks_section(f"📂 {domain}", domain_rows)
+
+    # Add up breaches to blocks
+    if up_breaches:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "*📈 상한 돌파 (현재가 ≥ 상한)*"}})
+        for domain, items in up_by_domain.items():
+            domain_rows = []
+            for n, t, p, th, nth, desc in items:
+                item_str = f"- *{n}* `{t}` ({desc}): 현재가 `{p:.2f}` ≥ 상한가 `{th:.2f}` ({up_pct:g}% 자동 상향:`{nth:.2f}`)" if desc else f"- *{n}* `{t}`: 현재가 `{p:.2f}` ≥ 상한가 `{th:.2f}` ({up_pct:g}% 자동 상향:`{nth:.2f}`)"
+                domain_rows.append(item_str)
+            blocks += slack_blocks_section(f"📂 {domain}", domain_rows)
+
+    # Add rule hits to blocks (rules.py)
+    if rule_hits:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": "*📐 규칙 알림*"}})
+        rule_by_domain = {}
+        for loc, n, t, p, label, ref, desc in rule_hits:
+            rule_by_domain.setdefault(loc, []).append(
+                f"- *{n}* `{t}`" + (f" ({desc})" if desc else "") + f": 현재가 `{p:.2f}` · {label} (기준 `{ref:.2f}`)")
+        for domain, domain_rows in rule_by_domain.items():
+            blocks += slack_blocks_section(f"📂 {domain}", domain_rows)
+
+    if errors or rate_limited_notes:
+        blocks.append({"type":"divider"})
+        if errors:
+            blocks += slack_blocks_section("_(참고) 조회 오류_", [f"- {e}" for e in errors])
+        if rate_limited_notes:
+            blocks += slack_blocks_section("_(참고) rate-limit 생략_", [f"- {x}" for x in rate_limited_notes])
+    return blocks
+
+def load_portfolios(cfg):
+    """portfolios.json 의 포트폴리오 목록. 없으면 data/ 의 기존 파일을 쓰는 기본 포트폴리오 1개."""
+    books = portfolios.load(PORTFOLIOS_PATH, CONFIG_PATH)
+    if not books:
+        books = [{"name": "", "cfg": cfg, "stocks_path": STOCKS_PATH,
+                  "state_path": STATE_PATH, "history_path": HISTORY_PATH, "rules_path": RULES_PATH}]
+    return books
+
+def run_portfolio(book, prices, errors, ranges, shared, ts, feats=None):
+    """
+    공통 조회 결과(prices/errors/ranges)로 포트폴리오 하나를 판정·발송·저장한다.
+    feats 는 book["rules"] 판정에 쓰는 기준값 (rules.features).
+    shared 는 시세 조회 통계(sources/failures)가 있는 공통 state 로, 기본 포트폴리오에서는
+    book["state"] 와 같은 객체이며 저장은 main() 이 맡는다.
+    메일 발송에 실패하면 RuntimeError 를 올리고 이 포트폴리오의 상태는 저장하지 않는다.
+    반환: 포트폴리오 state.json 에 기록한 바이트 수 (공통 state 를 쓰면 0)
+    """
+    cfg = book["cfg"]; stocks = book["stocks"]; state = book["state"]
+    tag = f"[{book['name']}] " if book["name"] else ""
+    today=ts.strftime("%Y-%m-%d"); ts_str=ts.strftime("%Y-%m-%d %H:%M:%S %Z")
+    tickers = {s["ticker"] for s in stocks}
+    errors = [e for e in errors if e.split(":", 1)[0] in tickers]
+
+    # 알림 판정 상태는 메일 발송 성공 전까지 state 위의 저널(overlay)에만 기록한다. SMTP 실패 시
+    # 임계값/중복제거 상태를 소비하지 않아 다음 실행에서 동일 알림을 재시도할 수 있다.
+    pending_state = state_overlay.Overlay(state)
+    limiter = ratelimit.RateLimiter(ratelimit.parse(cfg["RATE_LIMITS"]),
+                                    pending_state.setdefault("rl", {}), ts)
+    book_rules = book.get("rules")
+    last_prices = {t: state["last_price"].get(t) for t in tickers} if book_rules else None
+
+    with metrics.span("evaluate"):
+        res = evaluate(cfg, stocks, prices, state, pending_state, today, ts, ts_str, limiter=limiter,
+                       ranges=ranges)
+        rule_hits = []
+        if book_rules:
+            rule_hits, notes, events = evaluate_rules(cfg, book_rules, stocks, prices, last_prices,
+                                                      feats or {}, state, pending_state, today,
+                                                      ts_str, limiter)
+            res["notes"] += notes; res["events"] += events
+    errors += res["errors"]
+    down_breaches = res["down"]; up_breaches = res["up"]
+    rate_limited_notes = res["notes"]
+    metrics.inc("alerts", len(down_breaches) + len(up_breaches) + len(rule_hits))
+    metrics.inc("fetch_errors", len(res["errors"]))
+
+    send_now = bool(down_breaches or up_breaches or rule_hits)
+    header = ts_str
+    subject_note = ""
+    if cfg["DIGEST_WINDOW_MINUTES"] > 0 or state.get("digest"):
+        # 묶음 알림 (digest.py): 이번 알림을 state["digest"] 에 쌓고 창이 닫혔거나 급변 항목이
+        # 있을 때만 쌓인 알림 전체를 한 통으로 보낸다. 묶음은 발송에 성공해야 비워진다.
+        # 설정을 끄면(창 0분) 남은 묶음은 다음 실행에서 바로 보낸다.
+        buf = state.get("digest")
+        if send_now:
+            buf = digest.add(buf, ts, down_breaches, up_breaches, rule_hits, rate_limited_notes)
+        flush = digest.due(buf, ts, cfg["DIGEST_WINDOW_MINUTES"]) or \
+            digest.urgent(down_breaches, up_breaches, rule_hits, cfg["DIGEST_URGENT_PERCENT"])
+        if buf and flush:
+            down_breaches, up_breaches, rule_hits, rate_limited_notes = digest.unpack(buf)
+            header = digest.period(buf, ts)
+            subject_note = f" [묶음 {digest.count(buf)}건]"
+            if "digest" in pending_state: del pending_state["digest"]
+            send_now = True
+        elif send_now:
+            pending_state["digest"] = buf
+            pending_state.commit()
+            send_now = False
+            print(LOG_PREFIX+tag+f"묶음 대기: 알림 {digest.count(buf)}건")
+
+    if send_now:
+        # Generate HTML Body
+        # 연속 조회 실패 종목은 하루 한 번만 요약해서 싣는다.
+        own_failures = {t: r for t, r in (shared.get("failures") or {}).items() if t in tickers}
+        failure_summary = failures.take_daily_summary(pending_state, today, ts.tzinfo, own_failures)
+        subs = cfg.get("EMAIL_SUBSCRIPTIONS")
+        with metrics.span("render"):
+            if subs:
+                # 수신자별 구독 (recipients.py): 카드는 한 번만 렌더링하고 구독이 같은 수신자끼리 묶는다.
+                to_addrs = [x.strip() for x in cfg["EMAIL_TO"].split(",") if x.strip()]
+                mails = personalized_bodies(cfg, header, down_breaches, up_breaches, errors, rate_limited_notes,
+                                            failure_summary, rule_hits, recipients.groups(to_addrs, subs),
+                                            {s["ticker"]: s["loc"] for s in stocks})
+            else:
+                html_body = generate_html_body(cfg, header, down_breaches, up_breaches, errors, rate_limited_notes,
+                                               failure_summary=failure_summary, rule_hits=rule_hits)
+            url = cfg.get("SLACK_WEBHOOK_URL")
+            blocks = build_slack_blocks(cfg, header, down_breaches, up_breaches, errors, rate_limited_notes,
+                                        rule_hits=rule_hits) if url else None
+
+        subject = "[Stock Alert] 임계 도달 종목 (상/하한)" + subject_note
+        if book["name"]: subject += f" — {book['name']}"
+        with metrics.span("send"):
+            try:
+                if subs:
+                    send_emails(cfg, [(addrs, subject, body) for addrs, body in mails], subtype="html")
+                else:
+                    send_email(cfg, subject, html_body, subtype="html")
+            except Exception as e:
+                # 실패를 성공(exit 0)으로 숨기지 않는다. 워크플로가 실패 알림을 표시하며,
+                # 아래 임계값 갱신/상태 저장도 실행되지 않는다.
+                raise RuntimeError(f"{tag}임계 알림 메일 발송 실패: {e}") from e
+            print(LOG_PREFIX+tag+"메일 발송 완료"+(f" (수신자 그룹 {len(mails)}개)" if subs else ""))
+            pending_state.commit()
+
+            if url:
+                post_slack(url, cfg.get("SLACK_USERNAME","Stock-Alert-Bot"), cfg.get("SLACK_ICON_EMOJI",":bar_chart:"), blocks)
     else:
         note = []
         if rate_limited_notes: note.append("rate-limit 생략: "+", ".join(rate_limited_notes))
         if errors: note.append("오류: "+" | ".join(errors))
-        if note: print(LOG_PREFIX+"; "+"; ".join(note), file=sys.stderr)
+        if note: print(LOG_PREFIX+tag+"; "+"; ".join(note), file=sys.stderr)
+
+    with metrics.span("persist"):
+        if res["events"]: append_history(cfg, res["events"], book["history_path"])
+        if res["updates"]:
+            update_stock_file(book["stocks_path"], res["updates"])
+        if state is not shared:
+            return save_state(state, book["state_path"])
+    return 0
+
+def run_shard(cfg, stocks, state, ts, index, count):
+    """
+    --shard i/N 워커: 담당 종목만 조회해 부분 결과(SHARDS_DIR)를 남긴다.
+    판정/발송/state 저장은 --merge 가 한 번에 처리한다.
+    """
+    mine = shards.partition(stocks, index, count)
+    with metrics.span("fetch"):
+        prices, errors = fetch_prices(mine, cfg["INFO_TYPE"], cfg, state, ts)
+    metrics.inc("fetch_errors", len(errors))
+    ranges = None
+    if cfg["INTRABAR_MODE"]:
+        with metrics.span("intrabar"):
+            ranges = intrabar.fetch_ranges(list(prices), intrabar.window_start(state, ts.timestamp()),
+                                           ts.timestamp(), cfg["INTRABAR_INTERVAL"])
+    with metrics.span("persist"):
+        out = shards.write_partial(SHARDS_DIR, index, count, ts.timestamp(), prices, errors, ranges,
+                                   state, [s["ticker"] for s in mine])
+    print(LOG_PREFIX+f"shard {index}/{count}: 종목 {len(mine)}개 조회, 오류 {len(errors)}건 → {out}")
+
+@metrics.job("alert")
+def main(shard=None, merge=None):
+    """
+    shard=(i, N): 담당 종목만 조회해 부분 결과를 남기는 워커로 동작 (run_shard).
+    merge=N: 조회 대신 워커 N 개의 부분 결과를 합쳐 판정/발송/저장.
+    """
+    with metrics.span("config_load"):
+        cfg = load_config(CONFIG_PATH)
+        books = load_portfolios(cfg)
+    if shard is None:
+        for book in books:
+            validate_email_config(book["cfg"])
+    info_type = cfg.get("INFO_TYPE", "info").lower()
+
+    ts = now_tz(cfg["TZ"]); ts_str=ts.strftime("%Y-%m-%d %H:%M:%S %Z")
+
+    # 테스트 모드: 시세 조회/상태 변경 없이 샘플 알림 메일만 1회 발송 후 종료
+    if _test_mode_enabled():
+        send_test_email(cfg, ts_str)
+        return
+
+    with metrics.span("universe_parse"):
+        for book in books:
+            book["stocks"] = load_stocks(book["stocks_path"])
+            # 포트폴리오 디렉터리에 rules.txt 가 없으면 공통 규칙을 쓴다 (rules.py).
+            rules_path = book["rules_path"] if book["rules_path"].exists() else RULES_PATH
+            book["rules"], problems = rules.load(rules_path)
+            for p in problems:
+                print(LOG_PREFIX+p, file=sys.stderr)
+        # 여러 포트폴리오에 겹치는 종목도 한 번만 조회한다.
+        stocks = portfolios.union(book["stocks"] for book in books)
+    with metrics.span("state_load"):
+        paths = {STATE_PATH} | {book["state_path"] for book in books}
+        state_bytes = sum(p.stat().st_size for p in paths if p.exists())
+        state = load_state()
+        for book in books:
+            book["state"] = state if book["state_path"] == STATE_PATH else load_state(book["state_path"])
+
+    if shard is not None:
+        run_shard(cfg, stocks, state, ts, *shard)
+        return
 
-    if new_events: append_history(cfg, new_events)
-    if updates:
-        update_stock_file(STOCKS_PATH, updates)
-    save_state(state)
+    # 제거된 종목/만료된 rate-limit 항목을 정리해 state 를 감시 종목 수에 비례하게 유지한다.
+    with metrics.span("state_gc"):
+        pruned = 0
+        for book in books:
+            policies = ratelimit.parse(book["cfg"]["RATE_LIMITS"])
+            ratelimit.migrate_legacy(book["state"], policies)
+            pruned += sum(state_gc.compact(book["state"], book["stocks"], policies, ts).values())
+        if all(book["state"] is not state for book in books):
+            pruned += sum(state_gc.compact(state, stocks, [], ts).values())
+
+    ranges = None
+    if merge:
+        # 워커들의 조회 결과와 state 변경분을 shard 순서대로 합친다 (shards.py).
+        with metrics.span("fetch"):
+            prices, errors, ranges, missing = shards.merge(SHARDS_DIR, merge, state, ts.timestamp())
+        if missing:
+            print(LOG_PREFIX+f"shard 결과 누락: {missing} (해당 종목은 이번 실행에서 판정하지 않음)",
+                  file=sys.stderr)
+    else:
+        with metrics.span("fetch"):
+            prices, errors = fetch_prices(stocks, info_type, cfg, state, ts)
+    metrics.inc("fetch_errors", len(errors))
+    if cfg["TICKSTORE_ENABLE"]:
+        with metrics.span("ticks"):
+            record_ticks(cfg, ts, prices)
+
+    # 직전 실행 이후 분봉의 저가/고가 (INTRABAR_MODE). 다음 실행의 구간 시작점을 기록한다.
+    if cfg["INTRABAR_MODE"] and not merge:
+        with metrics.span("intrabar"):
+            ranges = intrabar.fetch_ranges(list(prices), intrabar.window_start(state, ts.timestamp()),
+                                           ts.timestamp(), cfg["INTRABAR_INTERVAL"])
+    state["last_run_ts"] = int(ts.timestamp())
+
+    # 규칙 기준값(직전 종가, 이동평균, N봉 고가/저가)은 전 포트폴리오 규칙에 대해 한 번만 구한다.
+    feats = {}
+    all_rules = [r for book in books for r in book["rules"]]
+    if all_rules:
+        with metrics.span("rules"):
+            try:
+                feats = rules.features(all_rules, stocks, BARS_DIR, TICKS_DIR, cfg["RULES_INTERVAL"],
+                                       RULES_CACHE_PATH, ts)
+            except (OSError, ValueError) as e:
+                # 기준값을 못 구하면 규칙 알림만 건너뛰고 임계값 알림은 그대로 보낸다.
+                print(LOG_PREFIX+f"규칙 기준값 계산 실패: {e}", file=sys.stderr)
+
+    # 조회 결과를 포트폴리오마다 나눠 판정한다. 한 포트폴리오의 발송 실패가 다른 포트폴리오의
+    # 발송/저장을 막지 않도록 실패는 모아 두었다가 마지막에 올린다.
+    failed = []; written = 0
+    for book in books:
+        try:
+            written += run_portfolio(book, prices, errors, ranges, state, ts, feats)
+        except Exception as e:
+            if len(books) == 1: raise
+            print(LOG_PREFIX+f"{e}", file=sys.stderr)
+            failed.append((book, e))
+
+    # 발송에 실패한 포트폴리오가 공통 state 를 쓰면 그 state 도 저장하지 않는다 (단일 실행과 동일).
+    if not any(book["state"] is state for book, _ in failed):
+        with metrics.span("persist"):
+            written += save_state(state)
+    if written:   # 크기는 실행마다 누적되지 않으므로 gauge (저장하지 않은 실행은 내보내지 않는다)
+        metrics.gauge("state_bytes", written)
+    metrics.inc("state_keys_pruned", pruned)
+    if pruned:
+        print(LOG_PREFIX+f"state.json 정리: 키 {pruned}개 제거, {state_bytes:,}B → {written:,}B "
+              f"({state_bytes - written:,}B 회수)")
+    if failed:
+        raise RuntimeError(f"포트폴리오 {len(failed)}/{len(books)}개 처리 실패: {failed[0][1]}") from failed[0][1]
+
+# ---------- Record / Replay (cassette.py) ----------
+_CASSETTE_PATHS = ("CONFIG_PATH", "STOCKS_PATH", "STATE_PATH", "HISTORY_PATH", "PORTFOLIOS_PATH",
+                   "RULES_PATH", "RULES_CACHE_PATH", "TICKS_DIR", "SHARDS_DIR")
+
+def _cassette_inputs():
+    """카세트에 담을 실행 입력 파일 (공통 파일 + 포트폴리오 디렉터리)."""
+    files = [CONFIG_PATH, CONFIG_PATH.parent / "email.json", STOCKS_PATH, STATE_PATH, HISTORY_PATH,
+             PORTFOLIOS_PATH, RULES_PATH]
+    try:
+        books = portfolios.load(PORTFOLIOS_PATH, CONFIG_PATH)
+    except ValueError:
+        books = []   # 같은 오류를 main() 이 다시 올린다
+    for book in books:
+        files += [book["dir"] / name for name in
+                  ("config.txt", "email.json", "stock.txt", "state.json", "history.json", "rules.txt")]
+    return files
+
+def record(path=None):
+    """main() 을 실행하며 입력/시세 응답/발송을 카세트로 저장한다. 실행이 실패해도 저장한다."""
+    tape = cassette.Cassette()
+    tape.capture(CONFIG_PATH.parent, {n: globals()[n] for n in _CASSETTE_PATHS}, _cassette_inputs(),
+                 Config.__annotations__)
+    try:
+        with cassette.use(tape):
+            main()
+    finally:
+        out = tape.save(path or CASSETTES_DIR)
+        print(LOG_PREFIX+f"카세트 기록: {out}")
+    return out
+
+def replay(path):
+    """
+    카세트의 입력 파일을 임시 디렉터리에 풀고 기록된 시각/응답으로 main() 을 다시 실행한다.
+    data/ 와 네트워크는 건드리지 않는다. 반환: cassette.Cassette.report() + "seconds"
+    """
+    tape = cassette.load(path)
+    saved = {n: globals()[n] for n in _CASSETTE_PATHS}
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        globals().update(tape.restore(tmp))
+        try:
+            with tape.environ(Config.__annotations__), cassette.use(tape):
+                main()
+        finally:
+            globals().update(saved)
+    report = tape.report()
+    report["seconds"] = time.perf_counter() - t0
+    return report
+
+def print_replay(report):
+    """replay() 결과 요약 출력. 반환: 종료 코드 (발송 목록이 기록과 다르면 1)"""
+    status = "일치" if report["match"] else "불일치"
+    print(LOG_PREFIX+f"재생 완료: 응답 {report['reads']}건 (누락 {report['misses']}건), "
+          f"발송 {len(report['outbox'])}건 — 기록과 {status}, {report['seconds']:.3f}초")
+    if not report["match"]:
+        for label, box in (("기록", report["recorded_outbox"]), ("재생", report["outbox"])):
+            for m in box:
+                print(LOG_PREFIX+f"  {label}: {m['kind']} {m['subject']} → {', '.join(m['to'])} "
+                      f"({m['sha1'][:10]})")
+    return 0 if report["match"] else 1
 
 if __name__=="__main__":
-    try: main()
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--test", action="store_true")
+    ap.add_argument("--shard", type=shards.parse_spec, metavar="i/N")
+    ap.add_argument("--merge", type=int, metavar="N")
+    ap.add_argument("--record", nargs="?", const="", metavar="PATH")
+    ap.add_argument("--replay", metavar="PATH")
+    args = ap.parse_args()
+    if (args.record is not None or args.replay) and (args.shard or args.merge):
+        ap.error("--record/--replay 는 --shard/--merge 와 함께 쓸 수 없습니다")
+    try:
+        if args.replay: sys.exit(print_replay(replay(args.replay)))
+        elif args.record is not None: record(args.record or None)
+        else: main(shard=args.shard, merge=args.merge)
     except Exception:
         print(LOG_PREFIX+"오류 발생:\n"+traceback.format_exc(), file=sys.stderr)
         sys.exit(1)
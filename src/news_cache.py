@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+News Cache
+==========
+대시보드 생성기(generate_dashboard_data.py)가 사용하는 종목별 뉴스 저장소.
+
+- 뉴스 항목은 정규화된 링크의 해시(key)로 한 번만 저장되고, 종목은 key 목록만
+  가집니다. 같은 기사가 여러 종목에 걸려 있어도 한 번만 저장/파싱됩니다.
+- 링크는 다르지만 제목이 같은 배포(syndication) 기사는 먼저 저장된 항목으로
+  합쳐집니다.
+- 종목별 목록은 최근 `window` 개로 제한되며(rolling window), 어떤 종목도
+  참조하지 않는 항목은 `prune()` 에서 정리됩니다.
+- `fetched_at` 으로 TTL 만료 여부를 판단해 만료된 종목만 `t.news` 를 다시 요청합니다.
+  조회 실패(None)는 "뉴스 없음"([])과 달리 `fetched_at` 을 갱신하지 않아 다음 실행에서 다시 요청합니다.
+
+저장 형식 (data/news_cache.json):
+{
+  "version": 1,
+  "items":   {"<key>": {"title","publisher","link","published"}, ...},
+  "tickers": {"<ticker>": {"fetched_at": <epoch>, "keys": ["<key>", ...]}, ...}
+}
+"""
+import re
+import json
+import hashlib
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+VERSION = 1
+
+# 같은 기사에 붙는 추적용 쿼리 파라미터 (링크 정규화 시 제거)
+_TRACKING_PARAMS = {"siteid", "yptr", "guccounter", "guce_referrer",
+                    "guce_referrer_sig", "ncid", "soc_src", "soc_trk", ".tsrc"}
+
+
+def news_key(link: str) -> str:
+    """링크를 정규화(스킴/www/추적 파라미터/fragment/끝 슬래시 제거)한 뒤 해시."""
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS]
+    path = parts.path.rstrip("/") or "/"
+    norm = urlunsplit(("", host, path, urlencode(sorted(query)), ""))
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16]
+
+
+def _title_key(title: str) -> str:
+    return re.sub(r"\W+", " ", title.lower()).strip()
+
+
+def empty():
+    return {"version": VERSION, "items": {}, "tickers": {}}
+
+
+def load(path: Path) -> dict:
+    if path.exists():
+        try:
+            loaded = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(loaded, dict) and loaded.get("version") == VERSION:
+                loaded.setdefault("items", {})
+                loaded.setdefault("tickers", {})
+                return loaded
+        except Exception:
+            pass
+    return empty()
+
+
+def save(path: Path, cache: dict):
+    out = {k: v for k, v in cache.items() if not k.startswith("_")}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(out, ensure_ascii=False, separators=(",", ":")),
+                    encoding="utf-8")
+
+
+def is_expired(cache: dict, ticker: str, now: float, ttl_sec: float) -> bool:
+    entry = cache["tickers"].get(ticker)
+    if not entry or entry.get("fetched_at") is None:
+        return True
+    return now - entry["fetched_at"] >= ttl_sec
+
+
+def merge(cache: dict, ticker: str, items, now: float, window: int = 20):
+    """
+    정규화된 뉴스 목록을 종목 캐시에 병합 (최신순, 최대 window 개).
+    items=None 은 조회 실패: 기존 항목과 fetched_at 을 그대로 두어 TTL 이 막지 않게 한다.
+    """
+    if items is None:
+        return
+    store = cache["items"]
+    by_title = cache.get("_titles")
+    if by_title is None:
+        # 제목 -> key 역색인은 실행 중에만 사용하며 저장하지 않는다.
+        by_title = {_title_key(v["title"]): k for k, v in store.items()}
+        cache["_titles"] = by_title
+
+    keys = []
+    for n in items:
+        key = news_key(n["link"])
+        if key not in store:
+            tkey = _title_key(n["title"])
+            if tkey in by_title:
+                key = by_title[tkey]       # 배포 기사: 기존 항목 재사용
+            else:
+                store[key] = {"title": n["title"], "publisher": n.get("publisher"),
+                              "link": n["link"], "published": n.get("published")}
+                by_title[tkey] = key
+        if key not in keys:
+            keys.append(key)
+
+    entry = cache["tickers"].setdefault(ticker, {"fetched_at": None, "keys": []})
+    for key in entry["keys"]:
+        if key not in keys and key in store:
+            keys.append(key)
+    # 발행일 내림차순 (날짜 없는 항목은 뒤로), 같은 날짜는 기존 순서 유지
+    keys.sort(key=lambda k: store[k].get("published") or "", reverse=True)
+    entry["keys"] = keys[:window]
+    entry["fetched_at"] = now
+
+
+def items_for(cache: dict, ticker: str, limit: int = 6):
+    entry = cache["tickers"].get(ticker) or {}
+    store = cache["items"]
+    return [dict(store[k]) for k in entry.get("keys", [])[:limit] if k in store]
+
+
+def prune(cache: dict, tickers):
+    """유니버스에 없는 종목과 어떤 종목도 참조하지 않는 뉴스 항목을 제거."""
+    live = set(tickers)
+    cache["tickers"] = {t: e for t, e in cache["tickers"].items() if t in live}
+    used = {k for e in cache["tickers"].values() for k in e.get("keys", [])}
+    cache["items"] = {k: v for k, v in cache["items"].items() if k in used}
+    cache.pop("_titles", None)
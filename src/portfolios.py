@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Portfolios
+==========
+한 번의 알림 실행으로 여러 팀의 포트폴리오를 처리하기 위한 정의 로더.
+data/portfolios.json 이 있으면 각 포트폴리오가 자기 stock.txt(임계값), state.json
+(중복 방지/rate-limit), history.json, 설정(config.txt)과 수신자(email.json)를 갖고,
+시세는 전 포트폴리오 종목의 합집합을 한 번만 조회해 각 포트폴리오 판정에 나눠 줍니다.
+
+data/portfolios.json:
+  {"portfolios": [
+    {"name": "team-a", "dir": "portfolios/team-a"},
+    {"name": "team-b", "dir": "portfolios/team-b", "receivers": ["b@example.com"]}
+  ]}
+
+- dir 는 BASE(data/) 기준 상대 경로이며 stock.txt 가 있어야 합니다. dir 의 config.txt 는
+  공통 config.txt 위에, dir 의 email.json 은 공통 email.json 위에 덮어씁니다.
+- receivers 를 적으면 dir 의 email.json 보다 우선합니다.
+- 파일이 없으면 load() 는 빈 목록을 돌려주고, 알림은 기존처럼 data/ 의 stock.txt/state.json/
+  history.json 하나(이름 "")로 동작합니다.
+
+시세 조회 통계(sources, failures, last_run_ts)는 공통 data/state.json 에 남고, 포트폴리오
+state.json 에는 판정 상태(last_price, last_alert_date, rl, failures_reported)만 기록됩니다.
+dir 에 rules.txt 가 있으면 공통 data/rules.txt 대신 그 규칙을 씁니다 (rules.py).
+"""
+import json
+from pathlib import Path
+
+from config import load_config
+
+
+def _portfolio(name, pdir: Path, cfg, receivers=None):
+    if receivers:
+        cfg["EMAIL_TO"] = ",".join(receivers) if isinstance(receivers, list) else str(receivers)
+    return {"name": name, "dir": pdir, "cfg": cfg,
+            "stocks_path": pdir / "stock.txt",
+            "state_path": pdir / "state.json",
+            "history_path": pdir / "history.json",
+            "rules_path": pdir / "rules.txt"}
+
+
+def load(path: Path, config_path: Path):
+    """portfolios.json → [포트폴리오 dict]. 파일이 없으면 []."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    base = path.parent
+
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    entries = raw.get("portfolios", []) if isinstance(raw, dict) else raw
+    out, seen = [], set()
+    for i, entry in enumerate(entries):
+        name = str(entry.get("name") or f"portfolio-{i + 1}")
+        if name in seen:
+            raise ValueError(f"portfolios.json: 포트폴리오 이름 중복 '{name}'")
+        seen.add(name)
+        pdir = base / entry.get("dir", name)
+        if not (pdir / "stock.txt").exists():
+            raise ValueError(f"portfolios.json: '{name}' 의 {pdir / 'stock.txt'} 가 없습니다")
+        cfg = load_config(config_path, overlay_dir=pdir)
+        out.append(_portfolio(name, pdir, cfg, entry.get("receivers")))
+    if not out:
+        raise ValueError("portfolios.json: 포트폴리오가 비어 있습니다")
+    return out
+
+
+def union(stock_lists):
+    """포트폴리오별 종목 목록 → 티커 기준 합집합 (처음 나온 항목 유지, 순서 보존)."""
+    merged = {}
+    for stocks in stock_lists:
+        for s in stocks:
+            merged.setdefault(s["ticker"], s)
+    return list(merged.values())
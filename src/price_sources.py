@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Price sources
+=============
+fetch_price() 가 사용하는 시세 소스와 hedged(헤지) 조회.
+
+소스
+  - "fast_info": t.fast_info.last_price
+  - "info":      t.info["regularMarketPrice"]  (느리고 종종 수 초 걸림)
+  - "history":   1분봉 마지막 Close (최종 폴백)
+
+hedged 조회 (PRICE_HEDGE=true)
+  1) 선호 소스(primary)를 먼저 시작하고,
+  2) primary 의 최근 지연 p50 (표본이 부족하면 PRICE_HEDGE_DELAY_MS) 안에 답이 없으면
+     secondary 를 추가로 시작해,
+  3) 먼저 도착한 유효 가격을 채택합니다. 그 시점에 두 소스가 모두 답해 있으면
+     INFO_TYPE 선호(primary)를 따릅니다.
+  4) 진 쪽은 취소합니다. 이미 실행 중인 호출은 중단할 수 없으므로 결과만 버립니다.
+     작업 스레드는 호출만 하고, 카세트/지연 표본/종목 통계 반영은 fetch_hedged() 를 부른 스레드가
+     채택 여부가 정해진 결과에만 합니다 (늦게 끝난 호출이 다음 종목 조회나 state 저장과 겹쳐
+     공유 상태를 바꾸지 않도록). 버려진 primary 는 카세트에 [null, null] 로 남겨 재생이 같은
+     순서로 secondary 로 넘어가게 합니다.
+
+종목별 소스 선택 (SOURCE_ROUTING=true)
+  조회 결과를 state["sources"][ticker] 에 소스별 성공률/지연(EWMA)으로 기록하고,
+  성공률 RELIABLE 이상인 소스 중 가장 빠른 것을 그 종목의 primary 로 고릅니다.
+  표본이 모자라면 두 소스를 모두 조회하고(INFO_TYPE 우선), 이후에도 probe_every 회마다
+  한 번씩 secondary 를 함께 조회해 통계를 갱신합니다.
+
+state["sources"] = {
+  "005930.KS": {"fast_info": {"ok": 0.98, "ms": 85.0, "n": 14},
+                "info": {"ok": 0.61, "ms": 2310.0, "n": 14},
+                "runs": 15, "pick": "fast_info"}
+}
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import cassette
+import metrics
+
+SOURCES = ("fast_info", "info", "history")
+ROUTABLE = ("fast_info", "info")
+DEFAULT_HEDGE_DELAY = 0.3     # p50 표본이 부족할 때의 헤지 지연 (초)
+_MIN_SAMPLES = 5
+
+RELIABLE = 0.8                # 이 성공률 이상이어야 지연으로 경쟁
+ROUTE_MIN_SAMPLES = 3         # 소스별 최소 표본 수 (미달 시 두 소스 모두 조회)
+PROBE_EVERY = 20              # secondary 재측정 주기 (실행 횟수)
+_ALPHA = 0.2                  # EWMA 가중치
+
+
+def _fast_info(t):
+    return t.fast_info.last_price
+
+
+def _info(t):
+    return t.info.get("regularMarketPrice")
+
+
+def _history(t):
+    hist = t.history(period="1d", interval="1m")
+    if hist is not None and not hist.empty:
+        return float(hist["Close"].iloc[-1])
+    return None
+
+
+_READERS = {"fast_info": _fast_info, "info": _info, "history": _history}
+
+# 소스별 최근 지연 (초) — 프로세스 내 p50 계산용
+_latency = {src: deque(maxlen=64) for src in SOURCES}
+_latency_lock = threading.Lock()
+
+
+def p50(source: str):
+    with _latency_lock:
+        xs = sorted(_latency[source])
+    if len(xs) < _MIN_SAMPLES:
+        return None
+    return xs[len(xs) // 2]
+
+
+def read(t, source: str, stats: dict = None):
+    """
+    소스 하나에서 가격 조회. 실패/빈 값은 None. 소요 시간은 p50 표본으로 기록하고,
+    stats (state["sources"][ticker]) 가 주어지면 종목별 통계에도 반영한다.
+    카세트(cassette.py) 기록 중이면 응답을 남기고, 재생 중이면 기록된 응답/소요 시간을 쓴다.
+    """
+    return _settle(t, source, *_call(t, source), stats)
+
+
+def _call(t, source: str):
+    """호출만 한다 (공유 상태를 바꾸지 않으므로 작업 스레드에서 실행 가능). 반환: (가격, 소요 초)"""
+    tape = cassette.active()
+    if tape is not None and tape.replaying:
+        return tape.take_read(t.ticker, source)
+    t0 = time.perf_counter()
+    try:
+        price = _READERS[source](t)
+    except Exception:
+        price = None
+    return price, time.perf_counter() - t0
+
+
+def _settle(t, source: str, price, dt, stats: dict = None):
+    """_call() 결과를 카세트/지연 표본/종목 통계에 반영한다. dt=None 은 헤지에서 버려진 호출."""
+    tape = cassette.active()
+    if tape is not None and not tape.replaying:
+        tape.put_read(t.ticker, source, price, dt)
+    if dt is None:
+        return None
+    with _latency_lock:
+        _latency[source].append(dt)
+    metrics.observe(f"source_{source}_seconds", dt)
+    if stats is not None and source in ROUTABLE:
+        record(stats, source, price is not None, dt)
+    return price
+
+
+# ---------- 종목별 소스 선택 ----------
+def record(stats: dict, source: str, ok: bool, seconds: float):
+    rec = stats.get(source)
+    ms = seconds * 1000.0
+    if rec is None:
+        rec = {"ok": 1.0 if ok else 0.0, "ms": ms, "n": 0}
+    else:
+        rec["ok"] = (1 - _ALPHA) * rec["ok"] + _ALPHA * (1.0 if ok else 0.0)
+        if ok:   # 실패(보통 빠른 예외)는 지연 평균을 왜곡하므로 성공만 반영
+            rec["ms"] = (1 - _ALPHA) * rec["ms"] + _ALPHA * ms
+    rec["ok"] = round(rec["ok"], 4)
+    rec["ms"] = round(rec["ms"], 1)
+    rec["n"] += 1
+    stats[source] = rec
+
+
+def _preferred(info_type: str):
+    return ("fast_info", "info") if info_type == "fast_info" else ("info", "fast_info")
+
+
+def route(stats: dict, info_type: str = "info", probe_every: int = PROBE_EVERY):
+    """
+    이번 조회의 (primary, secondary, probe) 를 정하고 실행 횟수를 센다.
+    probe=True 이면 primary 가 성공해도 secondary 를 함께 조회해야 한다.
+    """
+    default = _preferred(info_type)
+    runs = stats.get("runs", 0) + 1
+    stats["runs"] = runs
+    recs = {s: stats.get(s) or {} for s in ROUTABLE}
+    if any(recs[s].get("n", 0) < ROUTE_MIN_SAMPLES for s in ROUTABLE):
+        stats["pick"] = default[0]
+        return default[0], default[1], True
+
+    reliable = [s for s in default if recs[s]["ok"] >= RELIABLE]
+    if reliable:
+        primary = min(reliable, key=lambda s: recs[s]["ms"])   # 동률이면 INFO_TYPE 우선
+    else:
+        primary = max(default, key=lambda s: recs[s]["ok"])
+    secondary = default[1] if primary == default[0] else default[0]
+    stats["pick"] = primary
+    probe = probe_every > 0 and runs % probe_every == 0
+    return primary, secondary, probe
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+        return _pool
+
+
+def hedge_delay(primary: str, default: float = DEFAULT_HEDGE_DELAY) -> float:
+    d = p50(primary)
+    return default if d is None else d
+
+
+def fetch_hedged(t, primary: str, secondary: str, delay: float = None, stats: dict = None):
+    """
+    primary 를 시작하고 delay 후에도 답이 없으면 secondary 를 함께 띄워 먼저 온
+    유효 가격을 반환한다. 반환: (price, 채택된 소스) — 둘 다 실패하면 (None, None).
+    결과 반영(_settle)은 이 스레드에서, 판정에 쓰인 호출에만 한다. primary 는 늘 반영하고
+    (끝나기 전에 버리면 dt=None), secondary 는 primary 가 채택되지 않았을 때만 반영한다.
+    """
+    pool = _executor()
+    if delay is None:
+        delay = hedge_delay(primary)
+
+    fp = pool.submit(_call, t, primary)
+    done, _ = wait([fp], timeout=delay)
+    if done:
+        if _settle(t, primary, *fp.result(), stats) is not None:
+            return fp.result()[0], primary
+        # primary 가 빠르게 실패 → secondary 만 기다린다.
+        price = read(t, secondary, stats)
+        return (price, secondary) if price is not None else (None, None)
+
+    metrics.inc("hedged")
+    fs = pool.submit(_call, t, secondary)
+    pending = {fp, fs}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        # 두 소스가 모두 답해 있으면 선호 소스(primary)를 우선한다.
+        if fp in done:
+            # primary 는 끝난 패스에서 바로 반영한다 (늦은 실패도 성공률/지연 표본에 남도록).
+            if _settle(t, primary, *fp.result(), stats) is not None:
+                fs.cancel()   # 끝났든 아니든 secondary 결과는 버린다
+                return fp.result()[0], primary
+        if fs in done and fs.result()[0] is not None:
+            if not fp.done():
+                fp.cancel()
+                _settle(t, primary, None, None)
+            metrics.inc("hedge_wins")
+            return _settle(t, secondary, *fs.result(), stats), secondary
+    _settle(t, secondary, *fs.result(), stats)
+    return None, None
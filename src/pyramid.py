@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Series pyramid
+==============
+대시보드 차트용 다해상도 시계열. 전체 주봉/일봉 series 를 몇 개의 고정 크기(기본 64, 256점)로
+미리 줄여 두면, 브라우저는 캔버스 폭에 맞는 레벨만 그리고 최소/최대를 다시 계산하지 않습니다.
+
+- lttb: Largest-Triangle-Three-Buckets. 모양(급등락 꼭짓점)을 보존하는 선택 기반 축소
+- minmax: 구간마다 최저/최고 두 점을 시간 순으로 남기는 축소 (극값을 정확히 보존)
+
+레벨 형식: {"n": 점 개수, "min": 최소, "max": 최대, "points": [["2021-07-05", 123.45], ...]}
+입력 series 보다 점이 적은 레벨만 만들어지며, 첫 점과 마지막 점은 항상 포함됩니다.
+"""
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(points, n: int):
+    """[[x라벨, 값], ...] → n 점. x 는 등간격(인덱스)으로 본다."""
+    size = len(points)
+    if n >= size or n < 3:
+        return list(points)
+    out = [points[0]]
+    every = (size - 2) / (n - 2)
+    a = 0
+    for i in range(n - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        nxt_start = end
+        nxt_end = min(int((i + 2) * every) + 1, size)
+        if nxt_start >= nxt_end:
+            nxt_start, nxt_end = size - 1, size
+        avg_x = (nxt_start + nxt_end - 1) / 2.0
+        avg_y = sum(points[j][1] for j in range(nxt_start, nxt_end)) / (nxt_end - nxt_start)
+        ay = points[a][1]
+        best, pick = -1.0, start
+        for j in range(start, end):
+            area = abs((a - avg_x) * (points[j][1] - ay) - (a - j) * (avg_y - ay))
+            if area > best:
+                best, pick = area, j
+        out.append(points[pick])
+        a = pick
+    out.append(points[-1])
+    return out
+
+
+def minmax(points, n: int):
+    """n/2 개 구간마다 최저·최고 점을 시간 순으로 남긴다."""
+    size = len(points)
+    if n >= size or n < 4:
+        return list(points)
+    buckets = (n - 2) // 2
+    every = (size - 2) / buckets
+    out = [points[0]]
+    for i in range(buckets):
+        start = int(i * every) + 1
+        end = max(int((i + 1) * every) + 1, start + 1)
+        seg = range(start, min(end, size - 1))
+        if not seg:
+            continue
+        lo = min(seg, key=lambda j: points[j][1])
+        hi = max(seg, key=lambda j: points[j][1])
+        for j in sorted({lo, hi}):
+            out.append(points[j])
+    out.append(points[-1])
+    return out
+
+
+def summary(points) -> dict:
+    values = [p[1] for p in points]
+    return {"n": len(points), "min": min(values), "max": max(values)}
+
+
+def levels(points, sizes=(64, 256), method: str = "lttb"):
+    """series → 작은 레벨부터 [{n, min, max, points}, ...]. series 보다 작은 크기만."""
+    reduce = minmax if method == "minmax" else lttb
+    out = []
+    for size in sorted(set(sizes)):
+        if size >= len(points):
+            break
+        pts = reduce(points, size)
+        out.append({**summary(pts), "points": pts})
+    return out
+
+
+def full_range(points) -> dict:
+    """전체 series 요약: 점 개수, 최소/최대와 그 날짜, 첫/마지막 값."""
+    if not points:
+        return {"n": 0}
+    lo = min(points, key=lambda p: p[1])
+    hi = max(points, key=lambda p: p[1])
+    return {"n": len(points), "min": lo[1], "min_date": lo[0], "max": hi[1], "max_date": hi[0],
+            "first": points[0][1], "last": points[-1][1]}
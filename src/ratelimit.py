@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rate-limit engine
+=================
+알림 발송 제한 정책을 설정(RATE_LIMITS)으로 조합하고, 상태는 state["rl"] 에
+정책별 · 키별 epoch 정수 배열로만 보관합니다.
+
+정책 문법: ';' 로 구분한 "<scope>:<kind>=<arg>" 목록
+  scope  alert   종목+방향 (예: "AAPL|down")
+         ticker  종목
+         domain  stock.txt 의 분야(loc)
+         global  전체
+  kind   daily=N          달력 하루(TZ 기준) N회
+         interval=DUR     직전 발송 후 DUR 이내 재발송 금지
+         window=N/DUR     최근 DUR (슬라이딩 윈도) 동안 N회
+         bucket=N/DUR     용량 N, DUR 마다 N개가 다시 채워지는 토큰 버킷
+  DUR    숫자 + s|m|h|d (예: 90s, 60m, 6h, 1d)
+
+기본값(RATE_LIMITS 미설정)은 기존 동작과 같습니다:
+  alert:daily=<ALERT_RATE_LIMIT_PER_TICKER_PER_DAY>;alert:interval=<ALERT_MIN_INTERVAL_MINUTES>m;
+  global:daily=<ALERT_GLOBAL_DAILY_CAP>
+
+state["rl"] = {
+  "alert:daily=2":     {"AAPL|down": [20380, 1]},          # [일자 ordinal, 횟수]
+  "alert:interval=60m": {"AAPL|down": [1792380000]},       # [마지막 발송 epoch]
+  "domain:window=10/1h": {"AI": [1792379000, 1792380000]}, # 최근 발송 epoch (오래된 순, 최대 N)
+  "ticker:bucket=3/6h": {"AAPL": [2000, 1792380000]}       # [토큰×1000, 갱신 epoch]
+}
+검사는 정책마다 dict 조회 1회 + 상수 연산이며, 만료된 항목은 prune() 으로 정리합니다.
+"""
+import re
+import datetime
+
+SCOPES = ("alert", "ticker", "domain", "global")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_SPEC = re.compile(r"^(alert|ticker|domain|global):(daily|interval|window|bucket)=(.+)$")
+
+
+def parse_duration(text: str) -> int:
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd]?)", text.strip())
+    if not m:
+        raise ValueError(f"기간 형식 오류: {text!r} (예: 90s, 60m, 6h, 1d)")
+    return int(float(m.group(1)) * _UNITS[m.group(2) or "m"])
+
+
+def _count_per(text: str):
+    if "/" not in text:
+        raise ValueError(f"'N/기간' 형식이어야 합니다: {text!r}")
+    n, dur = text.split("/", 1)
+    return int(n), parse_duration(dur)
+
+
+class Policy:
+    """정책 1개. entry 는 state["rl"][spec][key] 에 저장되는 정수 리스트."""
+
+    def __init__(self, spec, scope, kind, limit=0, period=0):
+        self.spec = spec
+        self.scope = scope
+        self.kind = kind
+        self.limit = limit
+        self.period = period
+
+    def allow(self, entry, now, day) -> bool:
+        if entry is None:
+            return self.limit > 0 or self.kind == "interval"
+        if self.kind == "daily":
+            return entry[0] != day or entry[1] < self.limit
+        if self.kind == "interval":
+            return now - entry[0] >= self.period
+        if self.kind == "window":
+            return len(entry) < self.limit or now - entry[0] >= self.period
+        return self._tokens(entry, now) >= 1000   # bucket
+
+    def commit(self, entry, now, day):
+        if self.kind == "daily":
+            return [day, 1] if entry is None or entry[0] != day else [day, entry[1] + 1]
+        if self.kind == "interval":
+            return [now]
+        if self.kind == "window":
+            recent = (entry or [])[-(self.limit - 1):] if self.limit > 1 else []
+            return recent + [now]
+        tokens = self._tokens(entry, now) if entry is not None else self.limit * 1000
+        return [tokens - 1000, now]
+
+    def expired(self, entry, now, day) -> bool:
+        """더 이상 판정에 영향이 없는 항목 (저장하지 않아도 됨)."""
+        if self.kind == "daily":
+            return entry[0] != day
+        if self.kind in ("interval", "window"):
+            return now - entry[-1] >= self.period
+        return self._tokens(entry, now) >= self.limit * 1000
+
+    def _tokens(self, entry, now) -> int:
+        refill = (now - entry[1]) * self.limit * 1000 // max(1, self.period)
+        return min(self.limit * 1000, entry[0] + refill)
+
+
+def parse(text: str):
+    """RATE_LIMITS 문자열 → [Policy]. 형식 오류는 ValueError."""
+    policies = []
+    for raw in (text or "").split(";"):
+        spec = raw.strip().replace(" ", "")
+        if not spec:
+            continue
+        m = _SPEC.match(spec)
+        if not m:
+            raise ValueError(f"rate-limit 정책 형식 오류: {raw.strip()!r}")
+        scope, kind, arg = m.groups()
+        if kind == "daily":
+            policies.append(Policy(spec, scope, kind, limit=int(arg)))
+        elif kind == "interval":
+            policies.append(Policy(spec, scope, kind, period=parse_duration(arg)))
+        else:
+            n, period = _count_per(arg)
+            policies.append(Policy(spec, scope, kind, limit=n, period=period))
+    return policies
+
+
+def default_spec(per_ticker_per_day, min_interval_minutes, global_daily_cap) -> str:
+    return (f"alert:daily={int(per_ticker_per_day)};alert:interval={int(min_interval_minutes)}m;"
+            f"global:daily={int(global_daily_cap)}")
+
+
+class RateLimiter:
+    """
+    store (state["rl"]) 위에서 동작하는 판정기. 한 실행 동안 now/day 는 고정.
+
+        rl = RateLimiter(policies, pending_state["rl"], ts)
+        ok, why = rl.admit("AAPL", "down", "AI")   # 허용되면 즉시 기록
+    """
+
+    def __init__(self, policies, store: dict, ts):
+        self.policies = policies
+        self.store = store
+        self.now = int(ts.timestamp())
+        self.day = ts.date().toordinal()
+        self._tables = [store.setdefault(p.spec, {}) for p in policies]
+
+    @staticmethod
+    def _key(scope, ticker, kind, domain):
+        if scope == "alert":
+            return f"{ticker}|{kind}"
+        if scope == "ticker":
+            return ticker
+        if scope == "domain":
+            return domain or ""
+        return "*"
+
+    def check(self, ticker, kind, domain=""):
+        for p, table in zip(self.policies, self._tables):
+            if not p.allow(table.get(self._key(p.scope, ticker, kind, domain)), self.now, self.day):
+                return False, p.spec
+        return True, ""
+
+    def commit(self, ticker, kind, domain=""):
+        for p, table in zip(self.policies, self._tables):
+            k = self._key(p.scope, ticker, kind, domain)
+            table[k] = p.commit(table.get(k), self.now, self.day)
+
+    def admit(self, ticker, kind, domain=""):
+        ok, why = self.check(ticker, kind, domain)
+        if ok:
+            self.commit(ticker, kind, domain)
+        return ok, why
+
+    def admit_many(self, candidates):
+        """[(ticker, kind, domain)] 을 순서대로 판정·기록. 반환: [(ok, why)]"""
+        return [self.admit(*c) for c in candidates]
+
+    def prune(self):
+        """만료 항목과 더 이상 설정에 없는 정책 테이블을 제거."""
+        live = {p.spec for p in self.policies}
+        for spec in [s for s in self.store if s not in live]:
+            del self.store[spec]
+        for p, table in zip(self.policies, self._tables):
+            for k in [k for k, e in table.items() if p.expired(e, self.now, self.day)]:
+                del table[k]
+
+
+def migrate_legacy(state: dict, policies):
+    """
+    이전 버전 state 의 alert_counters / global_counter / last_alert_ts 를
+    state["rl"] 로 옮기고 삭제한다 (정책 spec 이 같은 경우에만 값이 이어짐).
+    """
+    counters = state.pop("alert_counters", None) or {}
+    glob = state.pop("global_counter", None) or {}
+    last_ts = state.pop("last_alert_ts", None) or {}
+    rl = state.setdefault("rl", {})
+
+    def _ordinal(date_str):
+        try:
+            return datetime.date.fromisoformat(date_str).toordinal()
+        except (TypeError, ValueError):
+            return None
+
+    for p in policies:
+        if p.scope == "alert" and p.kind == "daily":
+            day = _ordinal(counters.get("date"))
+            if day is not None:
+                rl.setdefault(p.spec, {}).update(
+                    {k: [day, int(n)] for k, n in (counters.get("per") or {}).items()})
+        elif p.scope == "global" and p.kind == "daily":
+            day = _ordinal(glob.get("date"))
+            if day is not None and glob.get("count"):
+                rl.setdefault(p.spec, {})["*"] = [day, int(glob["count"])]
+        elif p.scope == "alert" and p.kind == "interval":
+            for k, iso in last_ts.items():
+                try:
+                    epoch = int(datetime.datetime.fromisoformat(iso).timestamp())
+                except (TypeError, ValueError):
+                    continue
+                rl.setdefault(p.spec, {})[k] = [epoch]
+    return rl
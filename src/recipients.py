@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Recipient subscriptions
+=======================
+email.json 의 subscriptions 로 수신자마다 받을 분야(도메인)/종목을 정합니다.
+
+    {"receivers": ["owner@example.com"],
+     "subscriptions": {"ai@example.com": ["@AI", "@SW"], "bio@example.com": ["@바이오", "NVDA"]}}
+
+- 대상은 `@도메인`(stock.txt 첫 칸), 티커, `*`(전부) 이며 rules.txt 의 대상과 같은 문법입니다.
+- 구독은 receivers(EMAIL_TO) 수신자가 받을 알림을 좁힐 뿐이며, receivers 에 없는 주소의 구독은
+  쓰이지 않습니다 (포트폴리오가 수신자를 바꿔도 다른 팀 주소로 새지 않도록). subscriptions 에 없는
+  수신자는 지금처럼 전체 알림을 받고, 구독 대상에 해당하는 알림이 없으면 그 수신자에게는 보내지 않습니다.
+- 구독이 같은 수신자는 한 그룹으로 묶어 본문을 한 번만 만듭니다 (groups()).
+- 조회 오류/rate-limit/연속 실패 요약 줄은 구독 종목의 줄만 싣습니다 (줄 맨 앞의 티커 기준).
+"""
+
+
+class Selector:
+    """구독 대상 집합. whole(loc) 이면 그 도메인 알림 전체, 아니면 종목 단위로 고른다."""
+
+    __slots__ = ("all", "domains", "tickers")
+
+    def __init__(self, targets=("*",)):
+        targets = set(targets)
+        self.all = "*" in targets
+        self.domains = {t[1:] for t in targets if t.startswith("@")}
+        self.tickers = {t for t in targets if t != "*" and not t.startswith("@")}
+
+    def whole(self, loc: str) -> bool:
+        return self.all or loc in self.domains
+
+    def __call__(self, loc: str, ticker: str) -> bool:
+        return self.whole(loc) or ticker in self.tickers
+
+    def lines(self, lines, loc_of: dict):
+        """"<ticker>: ..." / "<ticker>|..." 형식의 줄 중 구독 종목의 줄."""
+        if self.all:
+            return list(lines)
+        out = []
+        for line in lines:
+            tkr = line.split(":", 1)[0].split("|", 1)[0].strip()
+            if tkr in loc_of and self(loc_of[tkr], tkr):
+                out.append(line)
+        return out
+
+
+def parse(raw) -> dict:
+    """email.json 의 subscriptions → {주소: (대상, ...)}. 대상은 목록 또는 쉼표 문자열."""
+    out = {}
+    for addr, targets in (raw or {}).items():
+        if isinstance(targets, str):
+            targets = targets.split(",")
+        targets = tuple(sorted({str(t).strip() for t in targets if str(t).strip()}))
+        if str(addr).strip() and targets:
+            out[str(addr).strip()] = targets
+    return out
+
+
+def groups(to_addrs, subscriptions: dict):
+    """
+    수신자를 구독이 같은 것끼리 묶는다. 반환: [(Selector 또는 None(전체), [주소, ...])]
+    전체 수신자 그룹이 먼저 오고, 나머지는 처음 나온 순서.
+    """
+    to_addrs = list(dict.fromkeys(to_addrs))
+    full = [a for a in to_addrs if a not in subscriptions]
+    by_targets = {}
+    for addr in to_addrs:
+        if addr in subscriptions:
+            by_targets.setdefault(subscriptions[addr], []).append(addr)
+    out = [(None, full)] if full else []
+    for targets, addrs in by_targets.items():
+        sel = Selector(targets)
+        out.append((None if sel.all else sel, addrs))
+    # "*" 구독자는 전체 수신자와 같은 본문을 받는다.
+    if sum(1 for sel, _ in out if sel is None) > 1:
+        merged = [a for sel, addrs in out if sel is None for a in addrs]
+        out = [(None, merged)] + [g for g in out if g[0] is not None]
+    return out
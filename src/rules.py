@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rules
+=====
+stock.txt 의 고정 임계값 외에 등락률/이동평균/신고가 조건을 선언해 알림을 받습니다.
+규칙은 stock.txt 옆의 rules.txt (포트폴리오 디렉터리에 없으면 data/rules.txt) 에 한 줄씩
+`대상, 규칙, 설명` 으로 적습니다.
+
+    # 대상: 티커 | @도메인 (stock.txt 첫 칸) | * (전 종목)
+    *,    change <= -5,      전일 대비 5% 이상 급락
+    @AI,  cross_above ma20,  20봉 이동평균 상향 돌파
+    NVDA, new_high 52,       52봉 신고가
+
+규칙 종류 (봉은 RULES_INTERVAL, 기본 주봉):
+  change <= X / change >= X   직전 거래일 마지막 기록 가격 대비 등락률(%) (data/ticks, tickstore.py)
+  cross_above maN / cross_below maN
+                              직전 실행 가격과 현재가 사이에 N봉 이동평균이 있으면 (돌파 순간만)
+  new_high N / new_low N      현재가가 최근 N봉 고가 이상 / 저가 이하
+
+- 기준값(직전 종가, 이동평균, N봉 고가/저가)은 알림 실행마다 바뀌지 않으므로 한 번에 계산해
+  data/rules_cache.json 에 둡니다. 봉 기준값은 analytics.bars_matrix() 로 필요한 종목의 자기 봉만
+  모아(다른 종목 날짜의 forward fill 없이) NumPy 로 계산하고 종목별 봉 수/마지막 일자/마지막 종가가 같으면 재사용하며, 직전 종가는
+  날짜가 바뀔 때만 tick store 컬럼을 다시 훑습니다.
+- 판정은 규칙마다 대상 종목 전체를 배열 하나로 비교합니다. 통과한 종목은 기존 알림과 같은
+  중복 제거(last_alert_date)와 rate-limit 을 "<ticker>|rule:<규칙 id>" 범위로 거칩니다.
+- 봉 저장소(data/bars)는 대시보드 생성기가 채웁니다 (barstore.py).
+"""
+import re
+import json
+import math
+import warnings
+from pathlib import Path
+
+import cassette
+
+_CHANGE = re.compile(r"^change\s*(<=|>=)\s*([-+]?\d+(?:\.\d+)?)$")
+_CROSS = re.compile(r"^(cross_above|cross_below)\s+ma(\d+)$")
+_EXTREME = re.compile(r"^(new_high|new_low)\s+(\d+)$")
+_LOOKBACK = 7 * 86400   # 직전 거래일을 찾을 tick store 구간 (주말/연휴 포함)
+CACHE_VERSION = 2       # 계산 방식이 바뀌면 올려 캐시된 기준값을 모두 다시 계산한다
+
+
+class Rule:
+    __slots__ = ("target", "kind", "op", "arg", "desc", "id", "feature")
+
+    def __init__(self, target: str, kind: str, op: str, arg: float, desc: str = ""):
+        self.target = target
+        self.kind = kind
+        self.op = op
+        self.arg = arg
+        self.desc = desc
+        if kind == "change":
+            self.id = f"change{op}{arg:g}"
+            self.feature = "prev"
+        else:
+            n = int(arg)
+            self.id = f"{kind}:ma{n}" if kind.startswith("cross") else f"{kind}:{n}"
+            self.feature = f"ma{n}" if kind.startswith("cross") else f"{kind[4:6]}{n}"   # hi52 / lo52
+
+    def matches(self, stock: dict) -> bool:
+        t = self.target
+        return t == "*" or t == stock["ticker"] or (t[:1] == "@" and t[1:] == stock["loc"])
+
+    def label(self, value: float) -> str:
+        """알림에 싣는 조건 설명."""
+        if self.kind == "change":
+            return f"전일 대비 {value:+.2f}% ({self.op} {self.arg:g}%)"
+        n = int(self.arg)
+        return {"cross_above": f"{n}봉 이동평균 상향 돌파", "cross_below": f"{n}봉 이동평균 하향 돌파",
+                "new_high": f"{n}봉 신고가", "new_low": f"{n}봉 신저가"}[self.kind]
+
+
+def parse(text: str):
+    """"change <= -5" → (kind, op, arg). 문법에 맞지 않으면 None."""
+    text = " ".join((text or "").split())
+    m = _CHANGE.match(text)
+    if m:
+        return "change", m.group(1), float(m.group(2))
+    m = _CROSS.match(text) or _EXTREME.match(text)
+    if m and int(m.group(2)) > 0:
+        return m.group(1), "", float(m.group(2))
+    return None
+
+
+def load(path: Path):
+    """rules.txt → ([Rule], [문제 설명]). 파일이 없으면 ([], [])."""
+    path = Path(path)
+    if not path.exists():
+        return [], []
+    rules, problems = [], []
+    for lineno, raw in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [p.strip() for p in line.split(",", 2)]
+        while len(parts) < 3:
+            parts.append("")
+        target, spec, desc = parts
+        parsed = parse(spec)
+        if not target or parsed is None:
+            problems.append(f"{path.name}:{lineno}: 규칙을 해석할 수 없습니다: {line}")
+            continue
+        rules.append(Rule(target, *parsed, desc=desc))
+    return rules, problems
+
+
+# ---------- 기준값 ----------
+def load_cache(path: Path) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: Path, cache: dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, separators=(",", ":")), encoding="utf-8")
+
+
+def previous_close(ticks_dir: Path, tickers, before: int) -> dict:
+    """before(epoch, 오늘 0시) 이전 최근 7일 tick store 에서 종목별 마지막 가격."""
+    import numpy as np
+    import tickstore
+
+    with tickstore.open_store(ticks_dir, readonly=True) as store:
+        wanted = {store.ids[t]: t for t in tickers if t in store.ids}
+        sym, _, px = store.columns(before - _LOOKBACK, before)
+        if not wanted or not len(sym):
+            return {}
+        sym = np.array(sym); px = np.array(px)   # 복사해 두어야 store 를 닫을 수 있다
+    # 뒤집은 배열에서 종목 id 가 처음 나오는 위치 = 그 종목의 마지막 행.
+    ids, first = np.unique(sym[::-1], return_index=True)
+    last = len(sym) - 1 - first
+    return {wanted[int(i)]: float(px[j]) for i, j in zip(ids, last) if int(i) in wanted}
+
+
+def bar_features(store, tickers, names) -> dict:
+    """
+    봉 기준값을 (종목 × 봉) 행렬에서 한 번에 계산한다. names: {"ma20", "hi52", "lo52", ...}
+    행렬은 종목마다 자기 최근 봉만 담으므로(analytics.bars_matrix) 값이 함께 계산한 종목과 무관하다.
+    저장된 봉이 N개 미만인 종목은 NaN. 반환: {이름: 종목 순서의 배열}
+    """
+    import numpy as np
+    import analytics
+
+    fields = {"ma": "close", "hi": "high", "lo": "low"}
+    mats = {}
+    out = {}
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for name in names:
+            field, n = fields[name[:2]], int(name[2:])
+            if field not in mats:
+                mats[field] = analytics.bars_matrix(store, tickers, field)
+            window = mats[field][:, -n:]
+            full = np.sum(~np.isnan(window), axis=1) == n
+            agg = {"ma": np.nanmean, "hi": np.nanmax, "lo": np.nanmin}[name[:2]]
+            values = agg(window, axis=1) if window.size else np.full(len(tickers), np.nan)
+            out[name] = np.where(full, values, np.nan)
+    return out
+
+
+def features(rules, stocks, bars_dir: Path, ticks_dir: Path, interval: str, cache_path: Path, ts):
+    """
+    규칙 판정에 필요한 기준값 {이름: {ticker: 값}} (값이 없는 종목은 빠진다).
+    cache_path 의 캐시를 재사용·갱신한다. 카세트 재생 중에는 기록된 값을 돌려준다.
+    """
+    tape = cassette.active()
+    if tape is not None and tape.replaying:
+        return tape.take_extra("rules", {})
+
+    import barstore
+
+    needed = {}
+    for rule in rules:
+        for s in stocks:
+            if rule.matches(s):
+                needed.setdefault(rule.feature, set()).add(s["ticker"])
+    cache = load_cache(cache_path)
+    if cache.get("interval") != interval or cache.get("version") != CACHE_VERSION:
+        cache = {"interval": interval, "version": CACHE_VERSION}
+    out = {}
+
+    if "prev" in needed:
+        tickers = sorted(needed.pop("prev"))
+        before = int(ts.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+        prev = cache.get("prev") or {}
+        if prev.get("before") != before or not set(tickers) <= set(prev.get("tickers", [])):
+            prev = {"before": before, "tickers": tickers,
+                    "values": previous_close(ticks_dir, tickers, before)}
+            cache["prev"] = prev
+        wanted = set(tickers)
+        out["prev"] = {t: v for t, v in prev["values"].items() if t in wanted}
+
+    if needed:
+        bars = cache.setdefault("bars", {})
+        with barstore.open_store(bars_dir, interval) as store:
+            tickers = sorted(set().union(*needed.values()))
+            keys = {}
+            for t in tickers:
+                n = store.count(t)
+                keys[t] = [n, store.column(t, "day")[n - 1], store.column(t, "close")[n - 1]] if n else None
+            names = set(needed)
+            dirty = [t for t in tickers if keys[t] is not None and
+                     ((bars.get(t) or {}).get("key") != keys[t] or not names <= set(bars[t]))]
+            if dirty:
+                computed = bar_features(store, dirty, names)
+                for i, t in enumerate(dirty):
+                    entry = bars[t] = {"key": keys[t]}
+                    for name, values in computed.items():   # 봉이 모자란 값도 None 으로 캐시한다
+                        entry[name] = round(float(values[i]), 6) if math.isfinite(values[i]) else None
+        for name, tickers in needed.items():
+            out[name] = {t: bars[t][name] for t in tickers if (bars.get(t) or {}).get(name) is not None}
+        for t in [t for t in bars if t not in keys or keys[t] is None]:
+            del bars[t]
+
+    save_cache(cache_path, cache)
+    if tape is not None:
+        tape.put_extra("rules", out)
+    return out
+
+
+# ---------- 판정 ----------
+def evaluate(rules, stocks, prices: dict, last_prices: dict, feats: dict):
+    """
+    규칙마다 대상 종목을 배열로 모아 한 번에 비교한다.
+    last_prices: 이번 판정 전의 state["last_price"] (돌파 판정용)
+    반환: [(Rule, stock, 현재가, 기준값, 비교값)] (rules 순서, 그 안에서 stocks 순서)
+    """
+    import numpy as np
+
+    hits = []
+    for rule in rules:
+        targets = [s for s in stocks if s["ticker"] in prices and rule.matches(s)]
+        if not targets:
+            continue
+        refs = feats.get(rule.feature, {})
+        price = np.array([prices[s["ticker"]] for s in targets], dtype=float)
+        ref = np.array([refs.get(s["ticker"], np.nan) for s in targets], dtype=float)
+        last = np.array([np.nan if last_prices.get(s["ticker"]) is None else last_prices[s["ticker"]]
+                         for s in targets], dtype=float)
+        with np.errstate(all="ignore"):
+            value = ref
+            if rule.kind == "change":
+                value = (price / ref - 1.0) * 100.0
+                hit = value <= rule.arg if rule.op == "<=" else value >= rule.arg
+            elif rule.kind == "cross_above":
+                hit = (last <= ref) & (price > ref)
+            elif rule.kind == "cross_below":
+                hit = (last >= ref) & (price < ref)
+            elif rule.kind == "new_high":
+                hit = price >= ref
+            else:
+                hit = price <= ref
+        for i in np.flatnonzero(hit):
+            hits.append((rule, targets[i], float(price[i]), float(ref[i]), float(value[i])))
+    return hits
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shards
+======
+알림 실행을 N 개 워커로 나눠 시세 조회를 병렬화하기 위한 분할/병합 도구.
+
+    python src/stock_alert.py alert --shard 0/4     # 워커: 담당 종목만 조회, 부분 결과 기록
+    ...
+    python src/stock_alert.py alert --merge 4       # 병합: 부분 결과 합치기 → 판정/발송/저장 1회
+
+- 종목은 티커의 crc32 해시로 나누므로 실행/머신과 무관하게 항상 같은 워커에 배정됩니다.
+- 워커는 메일을 보내거나 state.json 을 저장하지 않고 data/shards/shard-<i>-of-<N>.json 에
+  가격/오류/구간 저가·고가와 담당 종목의 state 변경분(sources, failures)만 남깁니다.
+- 병합은 변경분을 shard 번호 순으로 적용한 뒤 전 종목을 stock.txt 순서로 한 번에 판정하므로,
+  global/domain rate-limit 한도가 워커 수와 관계없이 그대로 지켜지고 메일도 한 통만 나갑니다.
+- 병합에 쓰인 부분 결과는 삭제되며, 없거나 MAX_AGE_SEC 보다 오래된 shard 는 조회 오류로 보고됩니다.
+"""
+import os
+import json
+import zlib
+from pathlib import Path
+
+DELTA_SECTIONS = ("sources", "failures")
+MAX_AGE_SEC = 3600
+
+
+def parse_spec(text: str):
+    """"i/N" → (i, N). 0 <= i < N."""
+    try:
+        index, count = (int(x) for x in str(text).split("/", 1))
+    except ValueError:
+        raise ValueError(f"shard 지정 형식 오류 '{text}' (예: 0/4)") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard 번호 범위 오류 '{text}' (0 <= i < N)")
+    return index, count
+
+
+def owner(ticker: str, count: int) -> int:
+    return zlib.crc32(ticker.encode("utf-8")) % count
+
+
+def partition(stocks, index: int, count: int):
+    return [s for s in stocks if owner(s["ticker"], count) == index]
+
+
+def partial_path(path: Path, index: int, count: int) -> Path:
+    return Path(path) / f"shard-{index}-of-{count}.json"
+
+
+def write_partial(path: Path, index: int, count: int, ts: float, prices: dict, errors,
+                  ranges, state: dict, tickers) -> Path:
+    """워커 결과 기록. state 변경분은 담당 종목의 DELTA_SECTIONS 값 (없어진 항목은 null)."""
+    delta = {sec: {t: (state.get(sec) or {}).get(t) for t in tickers} for sec in DELTA_SECTIONS}
+    out = partial_path(path, index, count)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_text(json.dumps({"shard": index, "of": count, "ts": int(ts), "prices": prices,
+                               "errors": errors, "ranges": ranges, "delta": delta},
+                              ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, out)
+    return out
+
+
+def merge(path: Path, count: int, state: dict, now: float):
+    """
+    부분 결과 N 개를 shard 번호 순으로 state 에 적용하고 합친다.
+    반환: (prices, errors, ranges 또는 None, 누락된 shard 번호 목록)
+    """
+    prices, errors, ranges, missing = {}, [], None, []
+    for index in range(count):
+        part_path = partial_path(path, index, count)
+        try:
+            part = json.loads(part_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            part = None
+        if not part or now - part.get("ts", 0) > MAX_AGE_SEC:
+            missing.append(index)
+            errors.append(f"shard {index}/{count}: 부분 결과 없음 (워커 실패 또는 만료)")
+            continue
+        for sec, changes in part.get("delta", {}).items():
+            table = state.setdefault(sec, {})
+            for tkr, value in changes.items():
+                if value is None:
+                    table.pop(tkr, None)
+                else:
+                    table[tkr] = value
+        prices.update(part.get("prices", {}))
+        errors += part.get("errors", [])
+        if part.get("ranges") is not None:
+            ranges = ranges or {}
+            ranges.update({t: tuple(r) for t, r in part["ranges"].items()})
+        part_path.unlink()
+    return prices, errors, ranges, missing
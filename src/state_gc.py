@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+State compaction
+================
+state.json 을 현재 감시 종목(stock.txt) 크기에 비례하도록 정리합니다.
+
+- 종목 키 섹션(last_price, sources, failures)에서 유니버스에 없는 종목 제거
+- last_alert_date ("<ticker>|<dir>") 에서 제거된 종목과 오늘이 아닌 날짜 제거
+  (DAILY_DEDUP 판정은 '오늘 보냈는지'만 보므로 지난 날짜는 효과가 없음)
+- state["rl"] 에서 만료된 항목과 설정에서 빠진 정책 제거, 제거된 종목/분야 키 제거
+
+알 수 없는 최상위 키는 건드리지 않습니다. 반환값은 섹션별 제거 수입니다.
+"""
+import ratelimit
+
+TICKER_SECTIONS = ("last_price", "sources", "failures")
+
+
+def _drop(table: dict, keep) -> int:
+    stale = [k for k in table if not keep(k)]
+    for k in stale:
+        del table[k]
+    return len(stale)
+
+
+def compact(state: dict, stocks, policies, ts) -> dict:
+    tickers = {s["ticker"] for s in stocks}
+    domains = {s.get("loc", "") for s in stocks}
+    today = ts.strftime("%Y-%m-%d")
+    removed = {}
+
+    for section in TICKER_SECTIONS:
+        removed[section] = _drop(state.get(section) or {}, lambda k: k in tickers)
+
+    removed["last_alert_date"] = _drop(
+        state.get("last_alert_date") or {},
+        lambda k: k.split("|", 1)[0] in tickers and state["last_alert_date"][k] == today)
+
+    rl = state.setdefault("rl", {})
+    before = sum(len(t) for t in rl.values())
+    ratelimit.RateLimiter(policies, rl, ts).prune()
+    for p in policies:
+        table = rl.get(p.spec, {})
+        if p.scope == "alert":
+            _drop(table, lambda k: k.split("|", 1)[0] in tickers)
+        elif p.scope == "ticker":
+            _drop(table, lambda k: k in tickers)
+        elif p.scope == "domain":
+            _drop(table, lambda k: k in domains)
+    for spec in [s for s, t in rl.items() if not t]:
+        del rl[spec]
+    removed["rl"] = before - sum(len(t) for t in rl.values())
+    return removed
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+State overlay
+=============
+state dict 위에 얹는 copy-on-write 저널. 한 실행 동안의 알림 판정 상태 변경을
+원본을 건드리지 않고 기록했다가, 메일 발송에 성공하면 commit() 으로 한 번에 반영하고
+실패하면 그냥 버립니다 (예전의 copy.deepcopy(state) 대체).
+
+    pending = Overlay(state)
+    pending["last_alert_date"]["AAPL|down"] = today   # state 는 아직 그대로
+    pending.commit()                                  # 이제 state 에 반영
+
+- 읽기는 저널 → 원본 순서로 보며, 원본의 dict 값은 하위 Overlay 로 감싸 돌려줍니다.
+- 비용은 변경된 키 수와 접근한 하위 dict 수에 비례합니다 (전체 state 크기와 무관).
+- 원본의 list 등 dict 가 아닌 값은 그대로 반환되므로 제자리 변경(append 등) 대신
+  새 값을 대입해야 합니다.
+"""
+from collections.abc import MutableMapping
+
+_DELETED = object()
+
+
+class Overlay(MutableMapping):
+    def __init__(self, base: dict):
+        self._base = base
+        self._journal = {}     # key -> 새 값 또는 _DELETED
+        self._children = {}    # key -> 원본 하위 dict 를 감싼 Overlay
+
+    def __getitem__(self, key):
+        if key in self._journal:
+            value = self._journal[key]
+            if value is _DELETED:
+                raise KeyError(key)
+            return value
+        value = self._base[key]
+        if isinstance(value, dict):
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = Overlay(value)
+            return child
+        return value
+
+    def __setitem__(self, key, value):
+        self._children.pop(key, None)
+        self._journal[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._children.pop(key, None)
+        self._journal[key] = _DELETED
+
+    def __contains__(self, key):
+        if key in self._journal:
+            return self._journal[key] is not _DELETED
+        return key in self._base
+
+    def __iter__(self):
+        for key in self._base:
+            if self._journal.get(key, None) is not _DELETED:
+                yield key
+        for key, value in self._journal.items():
+            if key not in self._base and value is not _DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def changes(self) -> int:
+        """저널에 쌓인 변경 수 (하위 Overlay 포함)."""
+        return len(self._journal) + sum(c.changes() for c in self._children.values())
+
+    def commit(self):
+        """저널을 원본에 반영하고 비운다."""
+        for key, child in self._children.items():
+            child.commit()
+        for key, value in self._journal.items():
+            if value is _DELETED:
+                self._base.pop(key, None)
+            else:
+                self._base[key] = value
+        self._journal.clear()
+        self._children.clear()
+        return self._base
+
+    def discard(self):
+        self._journal.clear()
+        self._children.clear()
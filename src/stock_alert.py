@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stock-alert CLI
+===============
+세 스크립트를 하나의 진입점으로 묶은 명령행 도구.
+
+    python src/stock_alert.py alert        # 임계가 감시 1회 (multi_stock_alert.main)
+    python src/stock_alert.py alert --shard 0/4   # 분할 조회 워커 (shards.py)
+    python src/stock_alert.py alert --merge 4     # 워커 결과 병합 → 판정/발송 1회
+    python src/stock_alert.py alert --record      # 실행 입력/시세 응답/발송을 카세트로 기록 (cassette.py)
+    python src/stock_alert.py alert --replay data/cassettes/<시각>.json.gz   # 네트워크 없이 재실행
+    python src/stock_alert.py weekly       # 주간 리포트 발송 (stock_weekly_report.main)
+    python src/stock_alert.py dashboard    # 대시보드 데이터 생성 (generate_dashboard_data.main)
+    python src/stock_alert.py test-email   # 샘플 알림 메일 1회 발송 (시세 조회 없음)
+    python src/stock_alert.py validate     # 설정/stock.txt 검증 (네트워크 없음)
+    python src/stock_alert.py sources      # 종목별로 학습된 시세 소스 선택 표
+    python src/stock_alert.py backtest --down 5,10 --up 5,10   # 임계값 자동 이동 정책 재생 (backtest.py)
+
+모든 명령은 config.load_config() 를 공유하며, yfinance/pandas/NumPy 는 실제로
+시세를 조회하는 명령(alert/weekly/dashboard)의 조회 시점에만 import 됩니다.
+"""
+import sys
+import argparse
+import traceback
+
+
+def cmd_alert(args):
+    import multi_stock_alert as alert
+    try:
+        if args.replay:
+            return alert.print_replay(alert.replay(args.replay))
+        if args.record is not None:
+            alert.record(args.record or None)
+        else:
+            alert.main(shard=args.shard, merge=args.merge)
+    except Exception:
+        print(alert.LOG_PREFIX + "오류 발생:\n" + traceback.format_exc(), file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_weekly(args):
+    import stock_weekly_report as weekly
+    weekly.main()
+    return 0
+
+
+def cmd_dashboard(args):
+    import generate_dashboard_data as dashboard
+    dashboard.main()
+    return 0
+
+
+def cmd_test_email(args):
+    import multi_stock_alert as alert
+    cfg = alert.load_config(alert.CONFIG_PATH)
+    ts = alert.now_tz(cfg["TZ"])
+    alert.send_test_email(cfg, ts.strftime("%Y-%m-%d %H:%M:%S %Z"))
+    return 0
+
+
+def validate_stock_file(path):
+    """stock.txt 형식 검사. 반환: (종목 수, [오류], [경고])"""
+    import ladder
+    errors, warnings, seen = [], [], set()
+    count = 0
+    for no, raw in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [p.strip() for p in line.split(",")]
+        if len(parts) < 5 or not parts[2]:
+            errors.append(f"{path.name}:{no}: 'domain, name, ticker, price_down, price_up' 형식이 아닙니다")
+            continue
+        tkr = parts[2]
+        downs = ladder.parse(parts[3])
+        ups = ladder.parse(parts[4])
+        if (parts[3] and downs is None) or (parts[4] and ups is None):
+            errors.append(f"{path.name}:{no}: {tkr} 임계값이 숫자가 아닙니다 (여러 단계는 150/135/120)")
+            continue
+        down = downs[-1] if downs else None   # 가장 가까운 단계끼리 비교
+        up = ups[0] if ups else None
+        if down is None and up is None:
+            warnings.append(f"{path.name}:{no}: {tkr} 임계값이 모두 비어 있어 감시하지 않습니다")
+        elif down is not None and up is not None and down >= up:
+            warnings.append(f"{path.name}:{no}: {tkr} price_down({down:g}) ≥ price_up({up:g})")
+        if tkr in seen:
+            warnings.append(f"{path.name}:{no}: {tkr} 중복 종목")
+        seen.add(tkr)
+        count += 1
+    return count, errors, warnings
+
+
+def cmd_validate(args):
+    import multi_stock_alert as alert
+    import ratelimit
+    import recipients
+    import rules
+    problems = []
+    cfg = alert.load_config(alert.CONFIG_PATH)
+    try:
+        books = alert.load_portfolios(cfg)
+    except ValueError as e:
+        problems.append(str(e))
+        books = []
+
+    count = 0
+    warnings = []
+    for book in books:
+        tag = f"[{book['name']}] " if book["name"] else ""
+        try:
+            alert.validate_email_config(book["cfg"])
+        except RuntimeError as e:
+            problems.append(tag + str(e))
+        try:
+            ratelimit.parse(book["cfg"]["RATE_LIMITS"])
+        except ValueError as e:
+            problems.append(f"{tag}RATE_LIMITS: {e}")
+
+        path = book["stocks_path"]
+        if not path.exists():
+            problems.append(f"{tag}{path} 파일이 없습니다")
+        else:
+            n, errs, warns = validate_stock_file(path)
+            count += n
+            problems += [tag + e for e in errs]
+            warnings += [tag + w for w in warns]
+
+        # rules.txt (rules.py): 포트폴리오 디렉터리에 없으면 공통 규칙을 쓴다.
+        rules_path = book["rules_path"] if book["rules_path"].exists() else alert.RULES_PATH
+        problems += [tag + e for e in rules.load(rules_path)[1]]
+
+        # email.json subscriptions (recipients.py): 수신자 목록에 없거나 해당 종목이 없는 구독은 경고.
+        subs = book["cfg"].get("EMAIL_SUBSCRIPTIONS") or {}
+        to_addrs = {x.strip() for x in book["cfg"].get("EMAIL_TO", "").split(",")}
+        stocks = alert.load_stocks(path) if subs and path.exists() else []
+        for addr, targets in subs.items():
+            select = recipients.Selector(targets)
+            if addr not in to_addrs:
+                warnings.append(f"{tag}subscriptions: {addr} 가 receivers 에 없어 쓰이지 않습니다")
+            elif not any(select(s["loc"], s["ticker"]) for s in stocks):
+                warnings.append(f"{tag}subscriptions: {addr} 의 대상({', '.join(targets)})에 해당하는 종목이 없습니다")
+
+    for w in warnings:
+        print(f"[VALIDATE] 경고: {w}")
+    for p in problems:
+        print(f"[VALIDATE] 오류: {p}", file=sys.stderr)
+    print(f"[VALIDATE] 종목 {count}개, 오류 {len(problems)}건, 경고 {len(warnings)}건")
+    return 1 if problems else 0
+
+
+def routing_table(state):
+    """state["sources"] → 출력 줄 목록 (종목, 선택 소스, 소스별 성공률/지연/표본 수)."""
+    rows = []
+    for tkr, stats in sorted(state.get("sources", {}).items()):
+        cols = []
+        for src in ("fast_info", "info"):
+            rec = stats.get(src)
+            cols.append(f"{rec['ok'] * 100:5.1f}% {rec['ms']:8.1f}ms n={rec['n']:<4}" if rec
+                        else f"{'-':<24}")
+        rows.append(f"{tkr:<14} {stats.get('pick', '-'):<10} " + "  ".join(cols))
+    header = f"{'ticker':<14} {'pick':<10} {'fast_info (ok, ms, n)':<24}  {'info (ok, ms, n)'}"
+    return [header] + rows if rows else []
+
+
+def cmd_sources(args):
+    import multi_stock_alert as alert
+    lines = routing_table(alert.load_state())
+    if not lines:
+        print("[SOURCES] 아직 학습된 종목이 없습니다 (alert 실행 후 state.json 에 기록됩니다).")
+        return 0
+    for line in lines:
+        print(line.rstrip())
+    return 0
+
+
+def cmd_backtest(args):
+    import backtest
+    import generate_dashboard_data as dashboard
+    import multi_stock_alert as alert
+    cfg = alert.load_config(alert.CONFIG_PATH)
+    stocks = alert.load_stocks(alert.STOCKS_PATH)
+    return backtest.main(args, cfg, stocks, dashboard.BARS_DIR, dashboard.INTERVAL)
+
+
+COMMANDS = {
+    "alert": (cmd_alert, "임계가 감시 1회 실행"),
+    "weekly": (cmd_weekly, "주간 동향 리포트 발송"),
+    "dashboard": (cmd_dashboard, "대시보드 데이터(docs/data/history.json) 생성"),
+    "test-email": (cmd_test_email, "샘플 알림 메일 1회 발송 (설정 점검용)"),
+    "validate": (cmd_validate, "설정 및 stock.txt 검증"),
+    "sources": (cmd_sources, "종목별 시세 소스 선택(성공률/지연) 표 출력"),
+    "backtest": (cmd_backtest, "저장된 주봉으로 임계값 자동 이동/rate-limit 정책 재생"),
+}
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="stock-alert", description="Stock Alert")
+    sub = ap.add_subparsers(dest="command", required=True)
+    for name, (fn, help_text) in COMMANDS.items():
+        sp = sub.add_parser(name, help=help_text)
+        sp.set_defaults(func=fn)
+        if name == "alert":
+            import shards
+            mode = sp.add_mutually_exclusive_group()
+            mode.add_argument("--shard", type=shards.parse_spec, metavar="i/N",
+                              help="티커 해시로 나눈 N 개 중 i 번째 종목만 조회해 부분 결과 기록")
+            mode.add_argument("--merge", type=int, metavar="N",
+                              help="워커 N 개의 부분 결과를 합쳐 판정/발송")
+            mode.add_argument("--record", nargs="?", const="", metavar="PATH",
+                              help="실행 입력/시세 응답/발송을 카세트로 기록 (기본: data/cassettes/)")
+            mode.add_argument("--replay", metavar="PATH",
+                              help="카세트로 네트워크 없이 재실행하고 발송 목록을 기록과 비교")
+        elif name == "backtest":
+            import backtest
+            backtest.add_arguments(sp)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
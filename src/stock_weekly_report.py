@@ -4,60 +4,35 @@ import smtplib
 import ssl
 from pathlib import Path
 from email.message import EmailMessage
-import yfinance as yf
 from datetime import datetime
 import pytz
-import requests
+
+import failures
+import http_pool
+import barstore
+import metrics
+import tickstore
+from config import Config, load_config as _load_config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 STOCK_TXT_PATH = BASE_DIR / "data" / "stock.txt"
+TICKS_DIR = BASE_DIR / "data" / "ticks"
+BARS_DIR = BASE_DIR / "data" / "bars"
 
-def load_kv() -> dict:
-    kv = {}
-    for k, v in os.environ.items():
-        if k not in kv and v.strip() != "":
-            kv[k] = v.strip()
-    return kv
+def load_config() -> Config:
+    """알림 스크립트와 같은 설정 로더 (data/config.txt, 환경변수, data/email.json)."""
+    return _load_config(BASE_DIR / "data" / "config.txt")
 
-def load_config() -> dict:
-    c = load_kv()
-    
-    # email.json 로드하여 병합 (존재하는 경우)
-    email_json_path = BASE_DIR / "data" / "email.json"
-    if email_json_path.exists():
+def load_failures() -> dict:
+    """알림 실행이 state.json 에 기록한 연속 조회 실패 종목 (없으면 빈 dict)."""
+    state_path = BASE_DIR / "data" / "state.json"
+    if state_path.exists():
         try:
             import json
-            with open(email_json_path, "r", encoding="utf-8") as f:
-                email_cfg = json.load(f)
-                if "smtp_host" in email_cfg: c["SMTP_HOST"] = email_cfg["smtp_host"]
-                if "smtp_port" in email_cfg: c["SMTP_PORT"] = str(email_cfg["smtp_port"])
-                if "smtp_user" in email_cfg: c["SMTP_USER"] = email_cfg["smtp_user"]
-                
-                # sender -> EMAIL_FROM
-                if "sender" in email_cfg: 
-                    c["EMAIL_FROM"] = email_cfg["sender"]
-                elif "smtp_user" in email_cfg:
-                    c["EMAIL_FROM"] = email_cfg["smtp_user"]
-                
-                # receivers -> EMAIL_TO
-                if "receivers" in email_cfg:
-                    receivers = email_cfg["receivers"]
-                    if isinstance(receivers, list):
-                        c["EMAIL_TO"] = ",".join(receivers)
-                    else:
-                        c["EMAIL_TO"] = str(receivers)
+            return json.loads(state_path.read_text(encoding="utf-8")).get("failures") or {}
         except Exception as e:
-            print(f"[ERROR] 이메일 설정 파일(email.json) 파싱 실패: {e}", file=sys.stderr)
-
-    # 환경변수가 명시적으로 지정된 경우 최우선 적용 (기존 환경변수 동작 보장)
-    for env_k, env_v in os.environ.items():
-        if env_v.strip() != "":
-            if env_k in {"SMTP_HOST", "SMTP_PORT", "SMTP_USER", "EMAIL_FROM", "EMAIL_TO", "SMTP_PASS"}:
-                c[env_k] = env_v.strip()
-
-    c.setdefault("SMTP_PORT", "587")
-    c["SMTP_PORT"] = int(c["SMTP_PORT"])
-    return c
+            print(f"[WEEKLY-REPORT] state.json 읽기 실패: {e}")
+    return {}
 
 def send_email(cfg: dict, subject: str, html_body: str):
     host = cfg.get("SMTP_HOST")
@@ -113,6 +88,7 @@ def create_github_issue(cfg: dict, subject: str, body_markdown: str):
         "body": body_markdown
     }
     
+    import requests
     try:
         response = requests.post(url, json=payload, headers=headers, timeout=15)
         if response.status_code == 201:
@@ -123,55 +99,72 @@ def create_github_issue(cfg: dict, subject: str, body_markdown: str):
     except Exception as e:
         print(f"[WEEKLY-REPORT] 깃허브 이슈 생성 중 에러 발생: {e}")
 
-def get_weekly_data(tickers):
+def weekly_from_ticks(store, ticker, now_ts):
+    """알림 실행이 기록한 최근 7일 tick 으로 주간 등락 계산 (표본이 2개 미만이면 None)."""
+    pts = store.range(ticker, start=int(now_ts) - 7 * 86400)
+    if len(pts) < 2:
+        return None
+    start_price, end_price = pts[0][1], pts[-1][1]
+    return {"ticker": ticker, "start": start_price, "end": end_price,
+            "change": (end_price - start_price) / start_price * 100}
+
+def weekly_from_bars(store, ticker, now_ts):
+    """대시보드 주봉 저장소의 마지막 두 주봉 종가로 주간 등락 계산 (10일 넘게 묵었으면 None)."""
+    closes = store.column(ticker, "close")
+    days = store.column(ticker, "day")
+    today = datetime.fromtimestamp(now_ts).date().toordinal()
+    if len(closes) < 2 or today - days[-1] > 10:
+        return None
+    start_price, end_price = closes[-2], closes[-1]
+    return {"ticker": ticker, "start": start_price, "end": end_price,
+            "change": (end_price - start_price) / start_price * 100}
+
+def get_weekly_data(tickers, ticks=None, bars=None):
+    """
+    최근 5영업일 등락. Yahoo 조회가 비었거나 실패한 종목은 bars(barstore.BarStore, 대시보드 주봉)
+    → ticks(tickstore.TickStore, 알림 실행 기록) 순서로 대신 계산한다.
+    """
+    import yfinance as yf   # 무거운 의존성(pandas 포함)은 조회 시점에만 로드
+    now_ts = datetime.now().timestamp()
     results = []
     for t in tickers:
+        t0 = metrics.clock()
+        item = None
         try:
-            df = yf.Ticker(t).history(period="5d")
-            if df.empty:
-                continue
-            df = df.dropna(subset=['Close'])
+            df = yf.Ticker(t, session=http_pool.session()).history(period="5d")
+            if not df.empty:
+                df = df.dropna(subset=['Close'])
             if len(df) >= 2:
                 start_price = float(df['Close'].iloc[0])
                 end_price = float(df['Close'].iloc[-1])
                 change_pct = ((end_price - start_price) / start_price) * 100
-                results.append({
+                item = {
                     "ticker": t,
                     "start": start_price,
                     "end": end_price,
                     "change": change_pct
-                })
+                }
         except Exception as e:
             print(f"[WEEKLY-REPORT] {t} 조회 중 에러 발생: {e}")
+        finally:
+            metrics.observe("fetch_seconds", metrics.clock() - t0, t)
+        if item is None and bars is not None:
+            item = weekly_from_bars(bars, t, now_ts)
+            if item is not None:
+                metrics.inc("bar_fallbacks")
+        if item is None and ticks is not None:
+            item = weekly_from_ticks(ticks, t, now_ts)
+            if item is not None:
+                metrics.inc("tick_fallbacks")
+        if item is not None:
+            results.append(item)
     return results
 
-def main():
-    cfg = load_config()
-    
-    if not STOCK_TXT_PATH.exists():
-        print(f"[WEEKLY-REPORT] {STOCK_TXT_PATH} 파일이 없습니다.")
-        return
-        
-    stocks = []
-    for line in STOCK_TXT_PATH.read_text(encoding="utf-8").splitlines():
-        s = line.strip()
-        if not s or s.startswith("#"): continue
-        parts = [x.strip() for x in s.split(",")]
-        if len(parts) >= 3:
-            stocks.append({"loc": parts[0], "name": parts[1], "ticker": parts[2]})
-            
-    tickers = [s["ticker"] for s in stocks]
-    if not tickers:
-        print("[WEEKLY-REPORT] 분석할 주식 종목이 없습니다.")
-        return
-        
-    print(f"[WEEKLY-REPORT] {len(tickers)}개 종목 데이터 조회 시작...")
-    weekly_data = get_weekly_data(tickers)
-    
-    if not weekly_data:
-        print("[WEEKLY-REPORT] 유효한 주식 데이터가 없어 리포트를 발송하지 않습니다.")
-        return
-        
+def build_report(stocks, weekly_data, failure_lines=None):
+    """
+    주간 등락 데이터를 도메인별 표로 렌더링. 반환: (기준일 문자열, markdown, html)
+    failure_lines: 연속 조회 실패 종목 요약 (failures.summary_lines)
+    """
     # 등락률 순(내림차순) 정렬
     weekly_data.sort(key=lambda x: x["change"], reverse=True)
     
@@ -266,6 +259,15 @@ def main():
         """
         md_body += "\n"
 
+    if failure_lines:
+        md_body += "### ⏸️ 연속 조회 실패 종목\n\n"
+        md_body += "".join(f"- {x}\n" for x in failure_lines) + "\n"
+        items = "".join(f"<li>{x}</li>" for x in failure_lines)
+        html_tables += f"""
+            <h3 style="color: #c53030; margin-top: 25px; margin-bottom: 10px; border-left: 4px solid #fc8181; padding-left: 8px;">⏸️ 연속 조회 실패 종목</h3>
+            <ul style="font-size: 13px; color: #742a2a;">{items}</ul>
+        """
+
     html = f"""
     <html>
     <head>
@@ -302,10 +304,49 @@ def main():
     </body>
     </html>
     """
+    return date_str, md_body, html
+
+@metrics.job("weekly")
+def main():
+    with metrics.span("config_load"):
+        cfg = load_config()
     
+    if not STOCK_TXT_PATH.exists():
+        print(f"[WEEKLY-REPORT] {STOCK_TXT_PATH} 파일이 없습니다.")
+        return
+        
+    stocks = []
+    with metrics.span("universe_parse"):
+        for line in STOCK_TXT_PATH.read_text(encoding="utf-8").splitlines():
+            s = line.strip()
+            if not s or s.startswith("#"): continue
+            parts = [x.strip() for x in s.split(",")]
+            if len(parts) >= 3:
+                stocks.append({"loc": parts[0], "name": parts[1], "ticker": parts[2]})
+            
+    tickers = [s["ticker"] for s in stocks]
+    if not tickers:
+        print("[WEEKLY-REPORT] 분석할 주식 종목이 없습니다.")
+        return
+        
+    print(f"[WEEKLY-REPORT] {len(tickers)}개 종목 데이터 조회 시작...")
+    with metrics.span("fetch"), tickstore.open_store(TICKS_DIR, readonly=True) as ticks, \
+            barstore.open_store(BARS_DIR, "1wk") as bars:
+        weekly_data = get_weekly_data(tickers, ticks, bars)
+    
+    if not weekly_data:
+        print("[WEEKLY-REPORT] 유효한 주식 데이터가 없어 리포트를 발송하지 않습니다.")
+        return
+        
+    with metrics.span("render"):
+        tz = pytz.timezone("Asia/Seoul")
+        date_str, md_body, html = build_report(stocks, weekly_data,
+                                               failures.summary_lines(load_failures(), tz))
+
     subject = f"[Stock Alert] 주간 주식 증감 추이 요약 리포트 ({date_str})"
-    send_email(cfg, subject, html)
-    create_github_issue(cfg, subject, md_body)
+    with metrics.span("send"):
+        send_email(cfg, subject, html)
+        create_github_issue(cfg, subject, md_body)
 
 if __name__ == "__main__":
     try: main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tick store
+==========
+알림 실행마다 조회한 모든 (종목, 시각, 가격)을 쌓아 두는 append-only 시계열 저장소.
+장중 차트, 알림 원인 확인, 변동성 계산을 재조회 없이 할 수 있게 합니다.
+
+디렉터리 구조 (컬럼마다 파일 1개, 네이티브 바이트 순서의 고정폭 배열):
+  data/ticks/symbols.txt   종목 사전 (줄 번호 = 종목 id)
+  data/ticks/sym.u32       종목 id      (array 'I')
+  data/ticks/ts.i64        epoch 초     (array 'q', 오름차순)
+  data/ticks/px.f64        가격         (array 'd')
+
+- 쓰기: 실행 1회 = 같은 시각의 행 묶음을 세 파일 끝에 덧붙입니다.
+  중간에 끊겨 컬럼 길이가 어긋나면 다음 open 때 가장 짧은 길이로 잘라 맞춥니다.
+- 읽기: 컬럼 파일을 mmap 하고 memoryview 로 캐스팅해 복사 없이 봅니다.
+  시각 범위는 ts 컬럼 이분 탐색, 종목 필터는 그 범위만 훑습니다.
+- TICKSTORE_RETENTION_DAYS 가 지난 행은 trim() 으로 앞에서 잘라냅니다.
+
+사용:
+    with tickstore.open_store(TICKS_DIR) as store:
+        store.append(now_epoch, {"AAPL": 231.5, "005930.KS": 61200.0})
+        pts = store.range("AAPL", start=now_epoch - 86400)
+        hourly = tickstore.downsample(pts, 3600)
+"""
+import os
+import mmap
+import array
+import bisect
+from pathlib import Path
+
+COLUMNS = (("sym", "I", "sym.u32"), ("ts", "q", "ts.i64"), ("px", "d", "px.f64"))
+_CODES = {name: code for name, code, _ in COLUMNS}
+_FILES = {name: fname for name, _, fname in COLUMNS}
+
+
+class TickStore:
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = Path(path)
+        self.readonly = readonly
+        if not readonly:
+            self.path.mkdir(parents=True, exist_ok=True)
+        sym_file = self.path / "symbols.txt"
+        self.symbols = sym_file.read_text(encoding="utf-8").split("\n")[:-1] if sym_file.exists() else []
+        self.ids = {s: i for i, s in enumerate(self.symbols)}
+        self._maps = {}
+        self.rows = self._recover()
+
+    # ---------- 내부 ----------
+    def _file(self, name):
+        return self.path / _FILES[name]
+
+    def _recover(self) -> int:
+        sizes = []
+        for name, code, _ in COLUMNS:
+            f = self._file(name)
+            sizes.append(f.stat().st_size // array.array(code).itemsize if f.exists() else 0)
+        rows = min(sizes)
+        if not self.readonly:
+            for (name, code, _), n in zip(COLUMNS, sizes):
+                if n != rows:
+                    with open(self._file(name), "r+b") as fh:
+                        fh.truncate(rows * array.array(code).itemsize)
+        return rows
+
+    def _column(self, name):
+        """mmap 된 컬럼의 memoryview (행 수만큼, 복사 없음)."""
+        code = _CODES[name]
+        if self.rows == 0:
+            return memoryview(array.array(code))
+        entry = self._maps.get(name)
+        if entry is None or len(entry[1]) < self.rows:   # 덧붙인 뒤에는 다시 매핑
+            self._unmap(name)
+            with open(self._file(name), "rb") as fh:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            entry = self._maps[name] = (mm, memoryview(mm).cast(code))
+        return entry[1][:self.rows]
+
+    def _unmap(self, name):
+        entry = self._maps.pop(name, None)
+        if entry:
+            entry[1].release()
+            try:
+                entry[0].close()
+            except BufferError:   # 밖에서 잡고 있는 view 가 있으면 GC 에 맡긴다
+                pass
+
+    # ---------- 쓰기 ----------
+    def append(self, ts: int, prices: dict) -> int:
+        """같은 시각의 {ticker: price} 묶음을 추가. 반환: 추가한 행 수."""
+        if not prices:
+            return 0
+        if self.rows:
+            ts = max(int(ts), self.last_ts())   # ts 컬럼은 항상 오름차순
+        new_syms = [t for t in prices if t not in self.ids]
+        if new_syms:
+            with open(self.path / "symbols.txt", "a", encoding="utf-8") as fh:
+                for t in new_syms:
+                    self.ids[t] = len(self.symbols)
+                    self.symbols.append(t)
+                    fh.write(t + "\n")
+        cols = {
+            "sym": array.array("I", (self.ids[t] for t in prices)),
+            "ts": array.array("q", [int(ts)] * len(prices)),
+            "px": array.array("d", (float(p) for p in prices.values())),
+        }
+        for name, arr in cols.items():
+            with open(self._file(name), "ab") as fh:
+                arr.tofile(fh)
+        self.rows += len(prices)
+        return len(prices)
+
+    def trim(self, before: int) -> int:
+        """ts < before 인 앞쪽 행을 잘라낸다. 반환: 제거한 행 수."""
+        cut = bisect.bisect_left(self._column("ts"), before)
+        if cut == 0:
+            return 0
+        keep = {name: bytes(self._column(name)[cut:]) for name, _, _ in COLUMNS}
+        for name in list(self._maps):
+            self._unmap(name)
+        for name, data in keep.items():
+            tmp = self._file(name).with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, self._file(name))
+        self.rows -= cut
+        return cut
+
+    # ---------- 읽기 ----------
+    def last_ts(self):
+        return self._column("ts")[self.rows - 1] if self.rows else None
+
+    def first_ts(self):
+        return self._column("ts")[0] if self.rows else None
+
+    def range(self, ticker: str, start: int = None, end: int = None):
+        """[start, end) 구간의 (ts, price) 목록 (시각순)."""
+        sid = self.ids.get(ticker)
+        if sid is None or self.rows == 0:
+            return []
+        ts = self._column("ts")
+        lo = 0 if start is None else bisect.bisect_left(ts, start)
+        hi = self.rows if end is None else bisect.bisect_left(ts, end)
+        sym = self._column("sym")
+        px = self._column("px")
+        return [(ts[i], px[i]) for i in range(lo, hi) if sym[i] == sid]
+
+    def columns(self, start: int = None, end: int = None):
+        """[start, end) 구간의 (종목 id, 시각, 가격) 컬럼 memoryview (복사 없음, 종목 전체)."""
+        if self.rows == 0:
+            empty = memoryview(array.array("q"))
+            return empty, empty, empty
+        ts = self._column("ts")
+        lo = 0 if start is None else bisect.bisect_left(ts, start)
+        hi = self.rows if end is None else bisect.bisect_left(ts, end)
+        return self._column("sym")[lo:hi], ts[lo:hi], self._column("px")[lo:hi]
+
+    def close(self):
+        for name in list(self._maps):
+            self._unmap(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(path: Path, readonly: bool = False) -> TickStore:
+    return TickStore(path, readonly=readonly)
+
+
+def downsample(points, bucket_sec: int, how: str = "last"):
+    """(ts, price) 목록을 bucket_sec 단위로 묶는다. how: last | first | min | max | mean"""
+    out = []
+    cur = None
+    acc = []
+    for ts, px in points:
+        b = ts - ts % bucket_sec
+        if b != cur and acc:
+            out.append((cur, _agg(acc, how)))
+            acc = []
+        cur = b
+        acc.append(px)
+    if acc:
+        out.append((cur, _agg(acc, how)))
+    return out
+
+
+def _agg(values, how):
+    if how == "first":
+        return values[0]
+    if how == "min":
+        return min(values)
+    if how == "max":
+        return max(values)
+    if how == "mean":
+        return sum(values) / len(values)
+    return values[-1]
@@ -0,0 +1,77 @@
+import math
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import analytics
+import barstore
+
+DAY = 738000
+
+
+def _bars(closes, start=0):
+    return [(DAY + 7 * (start + i), c, c, c, c, 0.0) for i, c in enumerate(closes)]
+
+
+class AnalyticsTests(unittest.TestCase):
+    def test_aligned_matrix_aligns_on_dates_and_computes_indicators(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("UP", _bars([100.0 + i for i in range(60)]))
+                w.add("NEW", _bars([10.0, 5.0, 8.0], start=57))
+            with barstore.open_store(tmp, "1wk") as store:
+                mat = analytics.aligned_matrix(store, ["UP", "NEW"])[1]
+                self.assertEqual(mat.shape, (2, 60))
+                self.assertTrue(math.isnan(mat[1, 0]))
+                up, new = analytics.compute(analytics.bars_matrix(store, ["UP", "NEW"]), "1wk")
+
+        self.assertEqual(up["ma"], {"10": 154.5, "40": 139.5})
+        self.assertEqual(up["mdd_pct"], 0.0)
+        self.assertEqual(up["pct_52w"], 98.1)
+        self.assertEqual(new["mdd_pct"], -50.0)
+        self.assertEqual(new["ma"], {"10": None, "40": None})   # 봉이 창보다 적으면 값 없음
+        self.assertEqual(analytics.with_thresholds(up, 159.0, 150.0, None),
+                         {**up, "dist_down_pct": 6.0, "dist_up_pct": None})
+
+    def test_update_recomputes_only_changed_tickers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", _bars([1.0, 2.0, 3.0]))
+                w.add("B", _bars([5.0, 4.0]))
+            cache = {}
+            with barstore.open_store(tmp, "1wk") as store:
+                self.assertEqual(analytics.update(store, ["A", "B"], cache)[1], 2)
+            path = analytics.cache_path(tmp, "1wk")
+            analytics.save_cache(path, cache)
+
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", _bars([1.0, 2.0, 3.0]))
+                w.add("B", _bars([5.0, 4.0, 6.0]))
+            cache = analytics.load_cache(path)
+            with barstore.open_store(tmp, "1wk") as store:
+                stats, recomputed = analytics.update(store, ["A", "B", "GONE"], cache)
+
+        self.assertEqual(recomputed, 1)
+        self.assertEqual(set(stats), {"A", "B"})
+        self.assertEqual(stats["B"]["mdd_pct"], -20.0)
+
+    def test_indicators_do_not_depend_on_batched_calendars(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", _bars([10.0 + (i % 4) * 3 + i for i in range(20)]))
+                # 3일 어긋난 거래일: 날짜 합집합에서는 A 의 봉 사이에 끼어든다.
+                w.add("B", [(d + 3, c, c, c, c, 0.0) for d, c, *_ in _bars([50.0] * 45, start=-25)])
+            with barstore.open_store(tmp, "1wk") as store:
+                alone, _ = analytics.update(store, ["A"], {})
+                batched, _ = analytics.update(store, ["A", "B"], {})
+
+        self.assertEqual(batched["A"], alone["A"])
+        self.assertEqual(alone["A"]["ma"]["40"], None)
+        self.assertEqual(alone["A"]["ma"]["10"], 29.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
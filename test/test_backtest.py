@@ -0,0 +1,77 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import backtest
+import barstore
+import ratelimit
+
+DAY = 738000
+CFG = {"UPDATE_THRESHOLD_DOWN_PERCENT": 10.0, "UPDATE_THRESHOLD_UP_PERCENT": 10.0,
+       "RATE_LIMITS": "", "ALERT_ON_CROSSDOWN_ONLY": False, "ALERT_ON_CROSSUP_ONLY": False}
+
+
+def _bars(closes):
+    return [(DAY + 7 * i, c, c, c, c, 0.0) for i, c in enumerate(closes)]
+
+
+class BacktestTests(unittest.TestCase):
+    def test_thresholds_move_after_each_alert_per_combo(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", _bars([100.0, 95.0, 89.0, 85.0, 80.0, 79.0]))
+            stocks = [{"ticker": "A", "loc": "IT", "down": 96.0, "up": None},
+                      {"ticker": "MISSING", "loc": "IT", "down": 1.0, "up": None}]
+            results, count, bars = backtest.run(CFG, stocks, tmp, "1wk", [5.0, 10.0], [10.0])
+
+        self.assertEqual((count, bars), (1, 6))
+        by_pct = {r["down_pct"]: r for r in results}
+        # 5%: 96 → 95(발송, 91.2) → 89(발송, 86.64) → 85(발송, 82.3) → 80(발송, 78.2) → 79 미도달
+        self.assertEqual(by_pct[5.0]["down_alerts"], 4)
+        # 10%: 96 → 95(발송, 86.4) → 85(발송, 77.76) → 나머지 미도달
+        self.assertEqual(by_pct[10.0]["down_alerts"], 2)
+        self.assertEqual(by_pct[10.0]["up_alerts"], 0)
+        # 4봉 뒤 가격이 있는 알림(95 → 79)만 수익률 평균에 들어간다.
+        self.assertEqual(by_pct[10.0]["fwd_after_down_pct"], round((79 / 95 - 1) * 100, 2))
+
+    def test_global_rate_limit_is_consumed_in_stock_order(self):
+        import numpy as np
+
+        closes = np.array([[100.0, 90.0], [100.0, 90.0]])
+        stocks = [{"ticker": "A", "loc": "IT", "down": 95.0, "up": None},
+                  {"ticker": "B", "loc": "IT", "down": 95.0, "up": None}]
+        pol = ratelimit.parse("alert:daily=2;global:daily=1")
+        res = backtest.simulate(closes, DAY + 7 * np.arange(2), stocks, [10.0], [10.0], pol)
+        self.assertEqual((res[0]["down_alerts"], res[0]["rate_limited"]), (1, 1))
+        self.assertEqual(backtest.parse_grid("5:15:5"), [5.0, 10.0, 15.0])
+        self.assertEqual(backtest.parse_grid("3, 7"), [3.0, 7.0])
+
+    def test_other_tickers_calendars_add_no_steps(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", _bars([100.0, 50.0, 50.0, 50.0, 50.0, 50.0, 50.0]))
+                # 3일 어긋난 달력: 합집합 축에서는 A 의 채운 값(50) 열이 사이사이에 생긴다.
+                w.add("B", [(d + 3, *rest) for d, *rest in _bars([10.0] * 7)])
+            stocks = [{"ticker": "A", "loc": "IT", "down": 95.0, "up": None},
+                      {"ticker": "B", "loc": "IT", "down": None, "up": None}]
+            cfg = dict(CFG, RATE_LIMITS="alert:window=3/30d")
+            alone = backtest.run(cfg, stocks[:1], tmp, "1wk", [10.0], [10.0])[0][0]
+            batched, _, bars = backtest.run(cfg, stocks, tmp, "1wk", [10.0], [10.0])
+
+        self.assertEqual(bars, 14)
+        self.assertEqual(batched[0], alone)
+        # 50 은 계속 하한 아래지만 window 한도(30일 3회)에 걸린 봉만 생략된다.
+        self.assertEqual((alone["down_alerts"], alone["rate_limited"]), (4, 2))
+        self.assertEqual(alone["fwd_after_down_pct"], 0.0)
+
+        rows = [{"down_pct": p, "up_pct": 1.0, "down_alerts": 0, "up_alerts": 0, "rate_limited": 0,
+                 "fwd_after_down_pct": v, "fwd_after_up_pct": None}
+                for p, v in ((1.0, None), (2.0, -5.0), (3.0, 0.0))]
+        self.assertEqual([line.split()[0] for line in backtest.format_table(rows, top=2)[1:]], ["3", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import barstore
+
+DAY = 738000   # 2021-07-29 ordinal
+
+
+class BarStoreTests(unittest.TestCase):
+    def test_write_then_read_columns_without_copy(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", [(DAY + 7 * i, 1.0, 2.0, 0.5, 10.0 + i, 100.0) for i in range(3)])
+                w.add("B", [(DAY, 5.0, 6.0, 4.0, 5.5, 10.0)])
+                self.assertEqual(w.add("EMPTY", []), 0)
+
+            with barstore.open_store(tmp, "1wk") as bars:
+                closes = bars.column("A", "close")
+                self.assertIsInstance(closes, memoryview)
+                self.assertEqual(list(closes), [10.0, 11.0, 12.0])
+                self.assertEqual(bars.column("B", "high").tolist(), [6.0])
+                self.assertEqual(bars.series("A")[-1], ["2021-08-12", 12.0])
+                self.assertNotIn("EMPTY", bars)
+                self.assertEqual(len(bars.column("missing")), 0)
+
+    def test_failed_writer_keeps_previous_store_and_records_carry_over(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", [(DAY, 1.0, 1.0, 1.0, 1.0, 0.0)])
+                w.add("B", [(DAY, 2.0, 2.0, 2.0, 2.0, 0.0)])
+
+            with self.assertRaises(RuntimeError):
+                with barstore.BarWriter(tmp, "1wk") as w:
+                    w.add("A", [(DAY, 9.0, 9.0, 9.0, 9.0, 0.0)])
+                    raise RuntimeError("fetch aborted")
+
+            with barstore.open_store(tmp, "1wk") as prev, barstore.BarWriter(tmp, "1wk") as w:
+                self.assertEqual(prev.series("A"), [["2021-07-29", 1.0]])
+                w.add("A", [(DAY, 3.0, 3.0, 3.0, 3.0, 0.0)])
+                w.add_records("B", prev.records("B"))
+
+            with barstore.open_store(tmp, "1wk") as bars:
+                self.assertEqual(bars.series("A"), [["2021-07-29", 3.0]])
+                self.assertEqual(bars.series("B"), [["2021-07-29", 2.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
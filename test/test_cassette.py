@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import cassette
+import multi_stock_alert as alert
+import price_sources
+
+PRICES = {"DOWN": 80.0, "FLAT": 100.0}
+ENV = {"SMTP_HOST": "smtp.example.com", "SMTP_PORT": "587", "SMTP_USER": "bot@example.com",
+       "SMTP_PASS": "secret", "EMAIL_FROM": "bot@example.com", "EMAIL_TO": "owner@example.com",
+       "SOURCE_ROUTING": "false"}
+
+
+def _paths(base):
+    return mock.patch.multiple(alert, CONFIG_PATH=base / "config.txt", STOCKS_PATH=base / "stock.txt",
+                               STATE_PATH=base / "state.json", HISTORY_PATH=base / "history.json",
+                               TICKS_DIR=base / "ticks", PORTFOLIOS_PATH=base / "portfolios.json")
+
+
+def _offline(t):
+    raise AssertionError("replay must not call the provider")
+
+
+class CassetteTests(unittest.TestCase):
+    def test_replay_reproduces_recorded_run_offline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            stock_path = base / "stock.txt"
+            original = "AI, Down, DOWN, 90, 120, test\nAI, Flat, FLAT, 90, 120, test\n"
+            stock_path.write_text(original, encoding="utf-8")
+            readers = {"info": lambda t: PRICES[t.ticker], "fast_info": lambda t: PRICES[t.ticker]}
+            with _paths(base), mock.patch.dict(os.environ, ENV, clear=True), \
+                    mock.patch.dict(price_sources._READERS, readers), \
+                    mock.patch.object(alert.smtplib, "SMTP") as smtp:
+                out = alert.record(base / "run.json.gz")
+            self.assertEqual(smtp.call_count, 1)
+            self.assertNotEqual(stock_path.read_text(encoding="utf-8"), original)   # 임계값 이동
+
+            offline = {"info": _offline, "fast_info": _offline, "history": _offline}
+            with mock.patch.dict(os.environ, {}, clear=True), \
+                    mock.patch.dict(price_sources._READERS, offline), \
+                    mock.patch.object(alert.smtplib, "SMTP") as smtp:
+                report = alert.replay(out)
+            self.assertEqual(smtp.call_count, 0)
+            self.assertNotEqual(stock_path.read_text(encoding="utf-8"), original)
+
+        self.assertTrue(report["match"])
+        self.assertEqual(report["misses"], 0)
+        self.assertEqual([m["kind"] for m in report["outbox"]], ["email"])
+        self.assertEqual(report["outbox"][0]["to"], ["owner@example.com"])
+
+    def test_reads_replay_in_order_and_secrets_are_masked(self):
+        tape = cassette.Cassette()
+        tape.put_read("A", "info", 1.5, 0.25)
+        tape.put_read("A", "info", None, 2.0)
+        with mock.patch.dict(os.environ, {"SMTP_PASS": "secret", "TZ": "UTC"}, clear=True):
+            tape.capture("/nonexistent", {}, [], ("SMTP_PASS", "TZ"))
+        self.assertEqual(tape.env, {"SMTP_PASS": "***", "TZ": "UTC"})
+
+        played = cassette.Cassette(tape.to_dict(), replaying=True)
+        self.assertEqual([played.take_read("A", "info") for _ in range(3)],
+                         [(1.5, 0.25), (None, 2.0), (None, 0.0)])
+        self.assertEqual(played.misses, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
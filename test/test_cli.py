@@ -0,0 +1,53 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+import multi_stock_alert as alert
+import stock_alert
+
+
+class CliTests(unittest.TestCase):
+    def test_importing_entry_points_does_not_load_heavy_dependencies(self):
+        probe = (
+            "import sys; import stock_alert, multi_stock_alert, stock_weekly_report, "
+            "generate_dashboard_data; "
+            "print(','.join(m for m in ('yfinance', 'pandas', 'numpy') if m in sys.modules))"
+        )
+        out = subprocess.run([sys.executable, "-c", probe], cwd=SRC, check=True,
+                             capture_output=True, text=True).stdout.strip()
+        self.assertEqual(out, "")
+
+    def test_validate_reports_bad_rows_and_missing_smtp_settings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            (base / "stock.txt").write_text(
+                "AI, Good, GOOD, 90, 110, ok\n"
+                "AI, Bad, BAD, abc, 110, broken\n"
+                "AI, Good again, GOOD, 120, 110, swapped\n",
+                encoding="utf-8",
+            )
+            paths = mock.patch.multiple(alert, CONFIG_PATH=base / "config.txt",
+                                        STOCKS_PATH=base / "stock.txt")
+            out, err = io.StringIO(), io.StringIO()
+            with paths, mock.patch.dict(os.environ, {}, clear=True), \
+                    redirect_stdout(out), redirect_stderr(err):
+                code = stock_alert.main(["validate"])
+
+        self.assertEqual(code, 1)
+        self.assertIn("BAD 임계값이 숫자가 아닙니다", err.getvalue())
+        self.assertIn("SMTP_PASS", err.getvalue())
+        self.assertIn("GOOD 중복 종목", out.getvalue())
+        self.assertIn("price_down(120) ≥ price_up(110)", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import digest
+import multi_stock_alert as alert
+
+ENV = {"SMTP_HOST": "smtp.example.com", "SMTP_PORT": "587", "SMTP_USER": "bot@example.com",
+       "SMTP_PASS": "secret", "EMAIL_FROM": "bot@example.com", "EMAIL_TO": "owner@example.com",
+       "SOURCE_ROUTING": "false", "TICKSTORE_ENABLE": "false", "TZ": "UTC",
+       "DIGEST_WINDOW_MINUTES": "120", "DIGEST_URGENT_PERCENT": "20"}
+UTC = datetime.timezone.utc
+
+
+def _at(hour, minute=0):
+    return datetime.datetime(2026, 10, 19, hour, minute, tzinfo=UTC)
+
+
+class DigestTests(unittest.TestCase):
+    def _run(self, base, when, prices, send_email):
+        paths = mock.patch.multiple(alert, CONFIG_PATH=base / "config.txt", STOCKS_PATH=base / "stock.txt",
+                                    STATE_PATH=base / "state.json", HISTORY_PATH=base / "history.json",
+                                    TICKS_DIR=base / "ticks", PORTFOLIOS_PATH=base / "portfolios.json",
+                                    RULES_PATH=base / "rules.txt")
+        with paths, mock.patch.dict(os.environ, ENV, clear=True), \
+                mock.patch.object(alert, "now_tz", return_value=when), \
+                mock.patch.object(alert, "fetch_price", side_effect=lambda t, *a, **k: prices[t]), \
+                mock.patch.object(alert, "send_email", send_email):
+            alert.main()
+        return alert.load_state(base / "state.json")
+
+    def test_breaches_are_buffered_until_the_window_closes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            (base / "stock.txt").write_text("AI, A, A, 90, 200, a\nAI, B, B, 90, 200, b\n", encoding="utf-8")
+            sent = mock.Mock()
+            state = self._run(base, _at(9), {"A": 85.0, "B": 100.0}, sent)
+            sent.assert_not_called()
+            self.assertEqual(digest.count(state["digest"]), 1)
+            self.assertIn("A|down", state["last_alert_date"])   # 중복 방지/임계값 조정은 바로 반영
+
+            state = self._run(base, _at(10), {"A": 84.0, "B": 88.0}, sent)
+            sent.assert_not_called()
+            self.assertEqual(digest.count(state["digest"]), 2)
+
+            # 창이 닫힌 뒤 첫 실행: 새 알림이 없어도 쌓인 알림을 한 통으로 보낸다.
+            failing = mock.Mock(side_effect=OSError("down"))
+            with self.assertRaises(RuntimeError):
+                self._run(base, _at(11, 5), {"A": 84.0, "B": 88.0}, failing)
+            state = self._run(base, _at(11, 10), {"A": 84.0, "B": 88.0}, sent)
+            self.assertNotIn("digest", state)
+            self.assertEqual((base / "stock.txt").read_text(encoding="utf-8"),
+                             "AI, A, A, 81.00, 200, a\nAI, B, B, 81.00, 200, b\n")
+        sent.assert_called_once()
+        subject, body = sent.call_args.args[1:3]
+        self.assertIn("[묶음 2건]", subject)
+        self.assertIn("2026-10-19 09:00 ~ 2026-10-19 11:10 UTC", body)
+        self.assertEqual(body.count('class="alert-card"'), 2)
+
+    def test_urgent_move_flushes_immediately(self):
+        down = [("AI", "A", "A", 70.0, 90.0, 81.0, "")]
+        self.assertTrue(digest.urgent(down, [], [], 20))
+        self.assertFalse(digest.urgent(down, [], [], 25))
+        self.assertFalse(digest.urgent(down, [], [], 0))
+        rules_hit = [("AI", "A", "A", 13.0, "label", 10.0, "")]
+        self.assertTrue(digest.urgent([], [], rules_hit, 30))
+
+        buf = digest.add(None, _at(9), down, [], [], ["n"])
+        buf = digest.add(buf, _at(10), [], [], rules_hit, ["n", "m"])
+        self.assertEqual((buf["since"], buf["runs"], buf["notes"]), (int(_at(9).timestamp()), 2, ["n", "m"]))
+        self.assertFalse(digest.due(buf, _at(10, 59), 120))
+        self.assertTrue(digest.due(buf, _at(11), 120))
+        self.assertEqual(digest.unpack(buf)[:3], (down, [], rules_hit))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import failures
+import multi_stock_alert as alert
+
+
+class FailureTrackerTests(unittest.TestCase):
+    def test_backoff_grows_exponentially_and_success_clears(self):
+        state = {"failures": {}}
+        now = 1_000_000
+        rec = failures.record_failure(state, "BAD", "가격 조회 실패", now, "2026-10-19")
+        self.assertTrue(failures.is_due(state, "BAD", now + 3600))
+        for expected in (60, 120, 240, 480, 960, 1440, 1440):
+            rec = failures.record_failure(state, "BAD", "가격 조회 실패", now, "2026-10-19")
+            self.assertEqual(rec["next"] - now, expected * 60)
+        self.assertFalse(failures.is_due(state, "BAD", now + 3600))
+
+        failures.record_success(state, "BAD")
+        self.assertTrue(failures.is_due(state, "BAD", now))
+
+    def test_daily_summary_is_taken_once_per_day(self):
+        state = {"failures": {"BAD": {"count": 3, "since": "2026-10-18", "error": "x", "next": 0}}}
+        self.assertEqual(len(failures.take_daily_summary(state, "2026-10-19")), 1)
+        self.assertEqual(failures.take_daily_summary(state, "2026-10-19"), [])
+        self.assertEqual(len(failures.take_daily_summary(state, "2026-10-20")), 1)
+
+    def test_backed_off_ticker_skips_the_fetch_chain(self):
+        cfg = {"FAILURE_BACKOFF_BASE_MINUTES": 60, "FAILURE_BACKOFF_MAX_MINUTES": 1440}
+        state = {"failures": {}}
+        stocks = [{"ticker": "BAD"}, {"ticker": "GOOD"}]
+        ts = alert.now_tz("Asia/Seoul")
+
+        def fake_fetch(tkr, info_type, **kwargs):
+            return None if tkr == "BAD" else 100.0
+
+        with mock.patch.object(alert, "fetch_price", side_effect=fake_fetch) as fetch:
+            _, errors1 = alert.fetch_prices(stocks, "info", cfg, state, ts)
+            _, errors2 = alert.fetch_prices(stocks, "info", cfg, state, ts)
+            prices, errors3 = alert.fetch_prices(stocks, "info", cfg, state, ts)
+
+        self.assertEqual(errors1, ["BAD: 가격 조회 실패"])
+        self.assertEqual(errors2, [])          # 두 번째 실패는 요약으로만
+        self.assertEqual(errors3, [])
+        self.assertEqual(prices, {"GOOD": 100.0})
+        self.assertEqual([c.args[0] for c in fetch.call_args_list].count("BAD"), 2)
+        self.assertEqual(state["failures"]["BAD"]["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
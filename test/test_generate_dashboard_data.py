@@ -0,0 +1,68 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import barstore
+import generate_dashboard_data as dashboard
+
+DAY = 738000
+STOCK_TXT = """AI, Old A, A, 10, 20, first
+IT, Beta, B, 10, 20,
+AI, New A, A, 11, 21, last
+"""
+
+
+def _bars(closes):
+    return [(DAY + 7 * i, c, c, c, c, 0.0) for i, c in enumerate(closes)]
+
+
+def fake_fetch(stock, ncache=None, now_ts=None, bars=None):
+    return {"name": stock["name"], "domain": stock["loc"], "ticker": stock["ticker"],
+            "desc": stock["desc"], "down": stock["down"], "up": stock["up"], "current": 15.0,
+            "points": bars.add(stock["ticker"], _bars([14.0, 15.0, 16.0]))}
+
+
+class DashboardTests(unittest.TestCase):
+    def test_duplicates_keep_last_row_and_late_failures_keep_new_bars(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            (base / "stock.txt").write_text(STOCK_TXT, encoding="utf-8")
+            with barstore.BarWriter(base / "bars", "1wk") as w:
+                w.add("B", _bars([1.0, 2.0]))
+            downsample = dashboard.tickstore.downsample
+
+            def intraday(rows, bucket):   # B 는 새 봉을 쓴 뒤 장중 시세 단계에서 실패
+                rows = list(rows)
+                if fetched[-1] == "B":
+                    raise RuntimeError("tick store 손상")
+                return downsample(rows, bucket)
+
+            fetched = []
+            fetch = lambda s, *a: fetched.append(s["ticker"]) or fake_fetch(s, *a)
+            with mock.patch.multiple(
+                    dashboard, STOCKS_PATH=base / "stock.txt", NEWS_CACHE_PATH=base / "news.json",
+                    TICKS_DIR=base / "ticks", BARS_DIR=base / "bars", OUT_DIR=base / "out",
+                    OUT_PATH=base / "out" / "history.json", SERIES_DIR=base / "out" / "series",
+                    fetch_ticker=fetch), \
+                    mock.patch.object(dashboard.tickstore, "downsample", intraday), \
+                    mock.patch("builtins.print"):
+                dashboard.main()
+            doc = json.loads((base / "out" / "history.json").read_text(encoding="utf-8"))
+            with barstore.open_store(base / "bars", "1wk") as store:
+                b_closes = list(store.column("B", "close"))
+
+        self.assertEqual(fetched, ["A", "B"])
+        self.assertEqual(list(doc["tickers"]), ["A"])
+        self.assertEqual((doc["tickers"]["A"]["name"], doc["tickers"]["A"]["down"]), ("New A", 11.0))
+        self.assertEqual(doc["domains"], ["AI", "IT"])
+        self.assertEqual(doc["errors"], ["B: tick store 손상"])
+        self.assertEqual(b_closes, [14.0, 15.0, 16.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import http_pool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HttpPoolTests(unittest.TestCase):
+    def test_token_bucket_spaces_requests_after_burst(self):
+        clock = FakeClock()
+        bucket = http_pool.TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+        waits = [bucket.acquire() for _ in range(5)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 0.5)
+        self.assertAlmostEqual(clock.now, 1.0)
+
+    def test_throttled_requests_are_retried_with_retry_after(self):
+        responses = [FakeResponse(429, {"Retry-After": "2"}), FakeResponse(503), FakeResponse(200)]
+
+        class Base:
+            def request(self, method, url, *args, **kwargs):
+                return responses.pop(0)
+
+        clock = FakeClock()
+        bucket = http_pool.TokenBucket(rate=100, burst=100, clock=clock, sleep=clock.sleep)
+        session = http_pool._budgeted(Base, bucket, max_retries=3, backoff_base=0.01)()
+        with mock.patch.object(http_pool.time, "sleep") as sleep:
+            resp = session.request("GET", "https://query1.finance.yahoo.com/")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sleep.call_args_list[0].args[0], 2.0)
+        self.assertEqual(len(sleep.call_args_list), 2)
+        self.assertLess(bucket.tokens, 0)   # 429 이후 버킷 전체가 늦춰짐
+
+    def test_session_is_shared_process_wide(self):
+        http_pool.reset()
+        try:
+            self.assertIs(http_pool.session(), http_pool.session())
+        finally:
+            http_pool.reset()
+
+
+if __name__ == "__main__":
+    unittest.main()
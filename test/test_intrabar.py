@@ -0,0 +1,47 @@
+import datetime
+import sys
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import intrabar
+import multi_stock_alert as alert
+from state_overlay import Overlay
+
+
+class IntrabarTests(unittest.TestCase):
+    def test_ranges_from_batched_frame_since_last_run(self):
+        idx = pd.date_range("2026-10-19 01:00", periods=4, freq="5min", tz="UTC")
+        cols = pd.MultiIndex.from_product([["High", "Low"], ["A", "B"]])
+        df = pd.DataFrame([[12, 30, 8, 29], [11, 31, 9, 28], [15, 32, 10, 27], [11, None, 10, None]],
+                          index=idx, columns=cols, dtype=float)
+        since = idx[1].timestamp()
+
+        self.assertEqual(intrabar.ranges_from_frame(df, ["A", "B", "C"], since),
+                         {"A": (9.0, 15.0), "B": (27.0, 32.0)})
+        self.assertEqual(intrabar.ranges_from_frame(df, ["A"], idx[-1].timestamp() + 1), {})
+
+    def test_evaluate_alerts_on_interval_low_that_reversed(self):
+        cfg = {"ALERT_ON_CROSSDOWN_ONLY": False, "ALERT_ON_CROSSUP_ONLY": False,
+               "DAILY_DEDUP": True, "UPDATE_THRESHOLD_DOWN_PERCENT": 10,
+               "UPDATE_THRESHOLD_UP_PERCENT": 10, "RATE_LIMITS": "alert:daily=2"}
+        stocks = [{"loc": "AI", "name": "Spike", "ticker": "SPK", "down": 90.0, "up": 120.0, "desc": ""}]
+        ts = datetime.datetime(2026, 10, 19, 10, tzinfo=datetime.timezone.utc)
+        state = {"last_price": {"SPK": 100.0}, "last_alert_date": {}, "rl": {}}
+
+        args = (cfg, stocks, {"SPK": 101.0}, state, Overlay(state), "2026-10-19", ts, "ts")
+        self.assertEqual(alert.evaluate(*args)["down"], [])
+
+        res = alert.evaluate(*args, ranges={"SPK": (88.5, 104.0)})
+        self.assertEqual(len(res["down"]), 1)
+        self.assertEqual(res["down"][0][3], 101.0)
+        self.assertIn("구간 저가 88.50", res["down"][0][6])
+        self.assertEqual(res["events"][0]["low"], 88.5)
+        self.assertEqual(res["up"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
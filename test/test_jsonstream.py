@@ -0,0 +1,45 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import jsonstream
+
+
+class ObjectWriterTests(unittest.TestCase):
+    def test_matches_json_dumps_and_keeps_old_file_on_failure(self):
+        doc = {"generated_at": "2026-10-19T09:00:00+09:00", "domains": ["AI", "바이오"],
+               "tickers": {"A": {"current": 1.5, "news": [], "series": [["2026-10-12", 1.25]]},
+                           "B\"": {"current": None, "down": 0.1}},
+               "empty": {}, "errors": ["C: 가격 이력 없음"]}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "out" / "history.json"
+            with jsonstream.ObjectWriter(path) as w:
+                for key in ("generated_at", "domains"):
+                    w.put(key, doc[key])
+                w.begin("tickers")
+                for tkr, rec in doc["tickers"].items():
+                    w.put(tkr, rec)
+                w.end()
+                w.begin("empty")
+                w.end()
+                w.put("errors", doc["errors"])
+            expected = json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+            self.assertEqual(path.read_text(encoding="utf-8"), expected)
+
+            with self.assertRaises(RuntimeError):
+                with jsonstream.ObjectWriter(path) as w:
+                    w.begin("tickers")
+                    raise RuntimeError("조회 실패")
+            with self.assertRaises(ValueError):
+                with jsonstream.ObjectWriter(path) as w:
+                    w.begin("tickers")
+            self.assertEqual(path.read_text(encoding="utf-8"), expected)
+            self.assertEqual([p.name for p in path.parent.iterdir()], ["history.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import datetime
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import ladder
+import multi_stock_alert as alert
+from state_overlay import Overlay
+
+CFG = {"ALERT_ON_CROSSDOWN_ONLY": False, "ALERT_ON_CROSSUP_ONLY": False, "DAILY_DEDUP": True,
+       "UPDATE_THRESHOLD_DOWN_PERCENT": 10, "UPDATE_THRESHOLD_UP_PERCENT": 10}
+TS = datetime.datetime(2026, 10, 19, 10, tzinfo=datetime.timezone.utc)
+
+
+class LadderTests(unittest.TestCase):
+    def test_crossed_levels_are_found_nearest_first(self):
+        downs = ladder.Ladder("down", ladder.parse("150/120/135"))
+        ups = ladder.Ladder("up", ladder.parse("230 / 200"))
+        self.assertEqual(downs.levels, [120.0, 135.0, 150.0])
+        self.assertEqual(downs.crossed(135.0), [(1, 150.0), (2, 135.0)])
+        self.assertEqual(downs.crossed(151.0), [])
+        self.assertEqual(downs.crossed(float("nan")), [])
+        self.assertEqual(ups.crossed(210.0), [(1, 200.0)])
+        self.assertEqual((downs.kind(1), downs.kind(3)), ("down", "down#3"))
+        self.assertEqual(ladder.format_levels(downs.moved({1: 140.0}), "down"), "140.00/135.00/120.00")
+        self.assertIsNone(ladder.parse("150/abc"))
+
+    def test_each_level_alerts_dedups_and_moves_on_its_own(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "stock.txt"
+            path.write_text("AI, Nvidia, NVDA, 150/135/120, 200/230, ladder\n", encoding="utf-8")
+            stocks = alert.load_stocks(path)
+            self.assertEqual((stocks[0]["down"], stocks[0]["up"]), (150.0, 200.0))
+
+            state = {"last_price": {"NVDA": 160.0}, "last_alert_date": {}, "rl": {}}
+            pending = Overlay(state)
+            res = alert.evaluate(dict(CFG, RATE_LIMITS="alert:daily=1;global:daily=2"), stocks,
+                                 {"NVDA": 130.0}, state, pending, "2026-10-19", TS, "ts")
+            self.assertEqual([(b[4], b[6]) for b in res["down"]],
+                             [(150.0, "ladder (하한 1/3단계)"), (135.0, "ladder (하한 2/3단계)")])
+            self.assertEqual([e["level"] for e in res["events"]], [1, 2])
+            pending.commit()
+            self.assertEqual(sorted(state["last_alert_date"]), ["NVDA|down", "NVDA|down#2"])
+
+            alert.update_stock_file(path, res["updates"])
+            self.assertEqual(path.read_text(encoding="utf-8"),
+                             "AI, Nvidia, NVDA, 135.00/121.50/120.00, 200/230, ladder\n")
+
+            # 같은 날 다시 도달해도 단계별 중복 제거, 세 번째 단계는 global 한도에 걸린다.
+            res = alert.evaluate(dict(CFG, RATE_LIMITS="alert:daily=1;global:daily=2"), stocks,
+                                 {"NVDA": 119.0}, state, Overlay(state), "2026-10-19", TS, "ts")
+        self.assertEqual(res["down"], [])
+        self.assertEqual(len(res["notes"]), 1)
+        self.assertTrue(res["notes"][0].startswith("NVDA|down#3 제한"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import metrics
+
+
+class MetricsTests(unittest.TestCase):
+    def test_disabled_metrics_are_noops(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            metrics.configure("alert")
+        self.assertFalse(metrics.enabled())
+        self.assertIs(metrics.span("fetch"), metrics.span("evaluate"))
+        metrics.observe("fetch_seconds", 0.2, "GOOG")
+        self.assertEqual(metrics.snapshot()["histograms"], {})
+
+    def test_job_writes_json_and_prometheus_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            @metrics.job("alert")
+            def run():
+                with metrics.span("fetch"):
+                    metrics.observe("fetch_seconds", 0.2, "GOOG")
+                    metrics.observe("fetch_seconds", 3.0, "GOOG")
+                metrics.inc("alerts", 2)
+                metrics.gauge("state_bytes", 100)
+                metrics.gauge("state_bytes", 80)
+
+            with mock.patch.dict(os.environ, {"STOCK_ALERT_METRICS_DIR": tmp}):
+                run()
+
+            snap = json.loads((Path(tmp) / "alert.json").read_text(encoding="utf-8"))
+            prom = (Path(tmp) / "alert.prom").read_text(encoding="utf-8")
+
+        hist = snap["histograms"]["fetch_seconds"]["GOOG"]
+        self.assertEqual(hist["count"], 2)
+        self.assertEqual(hist["buckets"]["0.25"], 1)
+        self.assertEqual(hist["buckets"]["5.0"], 2)
+        self.assertIn("fetch", snap["spans"])
+        self.assertIn("total", snap["spans"])
+        self.assertIn('stock_alert_fetch_seconds_bucket{job="alert",ticker="GOOG",le="+Inf"} 2', prom)
+        self.assertIn('stock_alert_alerts_total{job="alert"} 2', prom)
+        self.assertEqual(snap["gauges"], {"state_bytes": 80})
+        self.assertIn('# TYPE stock_alert_state_bytes gauge\nstock_alert_state_bytes{job="alert"} 80', prom)
+        self.assertNotIn("state_bytes_total", prom)
+        metrics.configure("reset", metrics_dir="")
+
+
+if __name__ == "__main__":
+    unittest.main()
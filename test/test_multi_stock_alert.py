@@ -33,8 +33,7 @@ class RuntimeStateTests(unittest.TestCase):
             with mock.patch.object(alert, "STATE_PATH", state_path):
                 state = alert.load_state()
 
-        self.assertEqual(state["alert_counters"], {"date": None, "per": {}})
-        self.assertEqual(state["global_counter"], {"date": None, "count": 0})
+        self.assertEqual(state["rl"], {})
         self.assertEqual(state["last_alert_date"], {})
         self.assertEqual(state["last_price"], {})
 
@@ -62,6 +61,8 @@ class RuntimeStateTests(unittest.TestCase):
                 STOCKS_PATH=stock_path,
                 STATE_PATH=state_path,
                 HISTORY_PATH=history_path,
+                TICKS_DIR=base / "ticks",
+                PORTFOLIOS_PATH=base / "portfolios.json",
             )
             with paths, mock.patch.dict(os.environ, env, clear=True), \
                     mock.patch.object(alert, "fetch_price", return_value=110.0), \
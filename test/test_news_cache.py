@@ -0,0 +1,64 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import news_cache
+
+
+def _item(title, link, published="2026-08-21"):
+    return {"title": title, "publisher": "Wire", "link": link, "published": published}
+
+
+class NewsCacheTests(unittest.TestCase):
+    def test_syndicated_headlines_are_stored_once_across_tickers(self):
+        cache = news_cache.empty()
+        news_cache.merge(cache, "GOOG", [
+            _item("AI Spending Boom", "https://www.barrons.com/a?siteid=yhoof2&yptr=yahoo"),
+        ], now=0)
+        news_cache.merge(cache, "NVDA", [
+            _item("AI Spending Boom", "https://barrons.com/a/"),
+            _item("AI  spending boom!", "https://finance.yahoo.com/m/other.html"),
+        ], now=0)
+
+        self.assertEqual(len(cache["items"]), 1)
+        self.assertEqual(cache["tickers"]["GOOG"]["keys"], cache["tickers"]["NVDA"]["keys"])
+
+    def test_window_keeps_newest_items_and_prune_drops_orphans(self):
+        cache = news_cache.empty()
+        news_cache.merge(cache, "GOOG", [
+            _item(f"t{i}", f"https://x.com/{i}", f"2026-08-{i:02d}") for i in range(1, 6)
+        ], now=0, window=3)
+        titles = [n["title"] for n in news_cache.items_for(cache, "GOOG", limit=10)]
+        self.assertEqual(titles, ["t5", "t4", "t3"])
+
+        news_cache.prune(cache, ["NVDA"])
+        self.assertEqual(cache, {"version": news_cache.VERSION, "items": {}, "tickers": {}})
+
+    def test_only_expired_tickers_need_refetch_after_reload(self):
+        cache = news_cache.empty()
+        news_cache.merge(cache, "GOOG", [_item("t", "https://x.com/t")], now=1000)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "news_cache.json"
+            news_cache.save(path, cache)
+            loaded = news_cache.load(path)
+
+        self.assertNotIn("_titles", loaded)
+        self.assertFalse(news_cache.is_expired(loaded, "GOOG", 1000 + 3599, 3600))
+        self.assertTrue(news_cache.is_expired(loaded, "GOOG", 1000 + 3600, 3600))
+        self.assertTrue(news_cache.is_expired(loaded, "NVDA", 1000, 3600))
+
+        # 조회 실패(None)는 fetched_at 을 갱신하지 않고, 빈 결과([])는 갱신한다.
+        news_cache.merge(loaded, "GOOG", None, now=9000)
+        news_cache.merge(loaded, "NVDA", None, now=9000)
+        self.assertTrue(news_cache.is_expired(loaded, "GOOG", 9000, 3600))
+        self.assertTrue(news_cache.is_expired(loaded, "NVDA", 9000, 3600))
+        self.assertEqual(len(news_cache.items_for(loaded, "GOOG")), 1)
+        news_cache.merge(loaded, "NVDA", [], now=9000)
+        self.assertFalse(news_cache.is_expired(loaded, "NVDA", 9000, 3600))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import multi_stock_alert as alert
+
+ENV = {
+    "SMTP_HOST": "smtp.example.com", "SMTP_PORT": "587", "SMTP_USER": "bot@example.com",
+    "SMTP_PASS": "secret", "EMAIL_FROM": "bot@example.com", "EMAIL_TO": "owner@example.com",
+}
+
+
+class PortfolioFanOutTests(unittest.TestCase):
+    def test_overlapping_portfolios_fetch_once_and_alert_separately(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            for name, rows in (("a", "AI, Google, GOOG, 90, 200\nAI, Nvidia, NVDA, 150, 300\n"),
+                               ("b", "AI, Google, GOOG, 120, 200\n")):
+                (base / name).mkdir()
+                (base / name / "stock.txt").write_text(rows, encoding="utf-8")
+            (base / "b" / "config.txt").write_text("UPDATE_THRESHOLD_DOWN_PERCENT=20\n", encoding="utf-8")
+            (base / "portfolios.json").write_text(json.dumps({"portfolios": [
+                {"name": "team-a", "dir": "a"},
+                {"name": "team-b", "dir": "b", "receivers": ["b@example.com"]},
+            ]}), encoding="utf-8")
+
+            paths = mock.patch.multiple(
+                alert, CONFIG_PATH=base / "config.txt", STOCKS_PATH=base / "stock.txt",
+                STATE_PATH=base / "state.json", HISTORY_PATH=base / "history.json",
+                TICKS_DIR=base / "ticks", PORTFOLIOS_PATH=base / "portfolios.json")
+            prices = {"GOOG": 100.0, "NVDA": 160.0}
+            with paths, mock.patch.dict(os.environ, ENV, clear=True), \
+                    mock.patch.object(alert, "fetch_price", side_effect=lambda t, *a, **k: prices[t]) as fetch, \
+                    mock.patch.object(alert, "send_email") as send:
+                alert.main()
+
+            self.assertEqual(sorted(c.args[0] for c in fetch.call_args_list), ["GOOG", "NVDA"])
+            self.assertEqual(send.call_count, 1)
+            cfg, subject = send.call_args.args[:2]
+            self.assertEqual(cfg["EMAIL_TO"], "b@example.com")
+            self.assertIn("team-b", subject)
+            self.assertIn("GOOG, 96.00", (base / "b" / "stock.txt").read_text(encoding="utf-8"))
+            self.assertIn("GOOG, 90, 200", (base / "a" / "stock.txt").read_text(encoding="utf-8"))
+
+            b_state = json.loads((base / "b" / "state.json").read_text(encoding="utf-8"))
+            shared = json.loads((base / "state.json").read_text(encoding="utf-8"))
+            self.assertIn("GOOG|down", b_state["last_alert_date"])
+            self.assertEqual(shared["last_alert_date"], {})
+            self.assertIn("last_run_ts", shared)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import cassette
+import price_sources
+
+
+class SlowInfoTicker:
+    """info 는 release 될 때까지 막히고 fast_info 는 즉시 답하는 가짜 Ticker."""
+
+    def __init__(self, info_price=100.0, fast_price=99.0):
+        self.release = threading.Event()
+        self.info_calls = 0
+        self.fast_calls = 0
+        self._info_price = info_price
+        self._fast_price = fast_price
+
+    @property
+    def info(self):
+        self.info_calls += 1
+        self.release.wait(5)
+        return {"regularMarketPrice": self._info_price}
+
+    @property
+    def fast_info(self):
+        self.fast_calls += 1
+        return type("FastInfo", (), {"last_price": self._fast_price})()
+
+
+class PriceSourcesTests(unittest.TestCase):
+    def test_slow_primary_is_hedged_by_secondary(self):
+        t = SlowInfoTicker()
+        try:
+            price, src = price_sources.fetch_hedged(t, "info", "fast_info", delay=0.01)
+        finally:
+            t.release.set()
+        self.assertEqual((price, src), (99.0, "fast_info"))
+
+    def test_abandoned_primary_does_not_touch_stats(self):
+        t = SlowInfoTicker()
+        stats = {}
+        try:
+            price, src = price_sources.fetch_hedged(t, "info", "fast_info", delay=0.01, stats=stats)
+        finally:
+            t.release.set()
+        time.sleep(0.1)   # 버려진 info 호출이 끝날 시간
+        self.assertEqual((price, src), (99.0, "fast_info"))
+        self.assertEqual(t.info_calls, 1)
+        self.assertEqual(set(stats), {"fast_info"})
+
+    def test_late_primary_failure_is_recorded_before_secondary_wins(self):
+        class SlowFailTicker:
+            ticker = "X"
+
+            @property
+            def fast_info(self):
+                time.sleep(0.2)
+                raise RuntimeError("timeout")
+
+            @property
+            def info(self):
+                time.sleep(0.5)
+                return {"regularMarketPrice": 100.0}
+
+        tape = cassette.Cassette()
+        stats = {}
+        with cassette.use(tape):
+            price, src = price_sources.fetch_hedged(SlowFailTicker(), "fast_info", "info",
+                                                    delay=0.1, stats=stats)
+        self.assertEqual((price, src), (100.0, "info"))
+        self.assertEqual(stats["fast_info"]["ok"], 0.0)
+        self.assertEqual(stats["info"]["ok"], 1.0)
+        (failed, seconds), = tape.reads["X|fast_info"]
+        self.assertIsNone(failed)
+        self.assertGreaterEqual(seconds, 0.2)
+
+    def test_fast_primary_does_not_launch_secondary(self):
+        t = SlowInfoTicker()
+        t.release.set()
+        price, src = price_sources.fetch_hedged(t, "info", "fast_info", delay=2)
+        self.assertEqual((price, src), (100.0, "info"))
+        self.assertEqual(t.fast_calls, 0)
+
+    def test_primary_without_price_falls_back_to_secondary(self):
+        t = SlowInfoTicker(info_price=None)
+        t.release.set()
+        price, src = price_sources.fetch_hedged(t, "info", "fast_info", delay=2)
+        self.assertEqual((price, src), (99.0, "fast_info"))
+
+    def test_route_learns_fast_reliable_source_and_reprobes(self):
+        stats = {}
+        for _ in range(3):
+            self.assertEqual(price_sources.route(stats, "info", probe_every=5),
+                             ("info", "fast_info", True))
+            price_sources.record(stats, "info", False, 2.5)
+            price_sources.record(stats, "fast_info", True, 0.08)
+
+        plans = [price_sources.route(stats, "info", probe_every=5) for _ in range(2)]
+        self.assertEqual(plans, [("fast_info", "info", False), ("fast_info", "info", True)])
+        self.assertEqual(stats["pick"], "fast_info")
+
+
+if __name__ == "__main__":
+    unittest.main()
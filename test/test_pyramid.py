@@ -0,0 +1,42 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import pyramid
+
+
+def _series(n, spike_at=None):
+    pts = [[f"d{i:04d}", 100.0 + (i % 7)] for i in range(n)]
+    if spike_at is not None:
+        pts[spike_at][1] = 500.0
+        pts[spike_at + 1][1] = 1.0
+    return pts
+
+
+class PyramidTests(unittest.TestCase):
+    def test_levels_keep_endpoints_and_spikes(self):
+        pts = _series(1000, spike_at=333)
+        for method in pyramid.METHODS:
+            lv = pyramid.levels(pts, (64, 256, 5000), method)
+            self.assertEqual([l["n"] <= size for l, size in zip(lv, (64, 256))], [True, True])
+            self.assertEqual(len(lv), 2)
+            for l in lv:
+                self.assertEqual(l["points"][0], pts[0])
+                self.assertEqual(l["points"][-1], pts[-1])
+                self.assertEqual(l["max"], 500.0)
+                if method == "minmax":   # 구간 극값은 minmax 만 정확히 보존
+                    self.assertEqual(l["min"], 1.0)
+                self.assertEqual(l["points"], sorted(l["points"]))
+
+    def test_short_series_has_no_levels_and_full_range(self):
+        pts = _series(50, spike_at=10)
+        self.assertEqual(pyramid.levels(pts, (64, 256)), [])
+        rng = pyramid.full_range(pts)
+        self.assertEqual((rng["n"], rng["max"], rng["max_date"], rng["min"]), (50, 500.0, "d0010", 1.0))
+        self.assertEqual(pyramid.full_range([]), {"n": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
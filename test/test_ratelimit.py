@@ -0,0 +1,72 @@
+import datetime
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import ratelimit
+
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+def at(hour, minute=0, day=19):
+    return datetime.datetime(2026, 10, day, hour, minute, tzinfo=KST)
+
+
+class RateLimitTests(unittest.TestCase):
+    def test_default_policies_match_previous_caps(self):
+        policies = ratelimit.parse(ratelimit.default_spec(2, 60, 100))
+        store = {}
+
+        rl = ratelimit.RateLimiter(policies, store, at(9))
+        self.assertEqual(rl.admit("AAPL", "down", "IT"), (True, ""))
+        self.assertEqual(rl.admit("AAPL", "down", "IT"), (False, "alert:interval=60m"))
+        self.assertEqual(rl.admit("AAPL", "up", "IT"), (True, ""))
+
+        rl = ratelimit.RateLimiter(policies, store, at(10, 30))
+        self.assertEqual(rl.admit("AAPL", "down", "IT"), (True, ""))
+        rl = ratelimit.RateLimiter(policies, store, at(12))
+        self.assertEqual(rl.admit("AAPL", "down", "IT"), (False, "alert:daily=2"))
+        rl = ratelimit.RateLimiter(policies, store, at(9, day=20))
+        self.assertEqual(rl.admit("AAPL", "down", "IT"), (True, ""))
+
+    def test_domain_window_and_ticker_bucket(self):
+        policies = ratelimit.parse("domain:window=2/1h; ticker:bucket=2/2h")
+        store = {}
+        rl = ratelimit.RateLimiter(policies, store, at(9))
+        results = rl.admit_many([("A", "up", "AI"), ("B", "up", "AI"), ("C", "up", "AI"),
+                                 ("A", "down", "IT"), ("A", "up", "IT")])
+        self.assertEqual([ok for ok, _ in results], [True, True, False, True, False])
+        self.assertEqual(results[2][1], "domain:window=2/1h")
+        self.assertEqual(results[4][1], "ticker:bucket=2/2h")
+
+        # 1시간 뒤: 윈도는 비고, 버킷은 토큰 1개가 다시 찬다.
+        rl = ratelimit.RateLimiter(policies, store, at(10))
+        self.assertEqual([ok for ok, _ in rl.admit_many([("C", "up", "AI"), ("A", "up", "IT"),
+                                                         ("A", "up", "IT")])],
+                         [True, True, False])
+
+        rl = ratelimit.RateLimiter(policies, store, at(15))
+        rl.prune()
+        self.assertEqual(store, {"domain:window=2/1h": {}, "ticker:bucket=2/2h": {}})
+
+    def test_legacy_state_is_migrated_and_bad_spec_rejected(self):
+        policies = ratelimit.parse(ratelimit.default_spec(2, 60, 100))
+        state = {
+            "alert_counters": {"date": "2026-10-19", "per": {"AAPL|down": 2}},
+            "global_counter": {"date": "2026-10-19", "count": 5},
+            "last_alert_ts": {"AAPL|down": at(8).isoformat()},
+        }
+        ratelimit.migrate_legacy(state, policies)
+        self.assertEqual(set(state), {"rl"})
+        rl = ratelimit.RateLimiter(policies, state["rl"], at(12))
+        self.assertEqual(rl.check("AAPL", "down"), (False, "alert:daily=2"))
+        self.assertEqual(state["rl"]["global:daily=100"]["*"][1], 5)
+
+        with self.assertRaises(ValueError):
+            ratelimit.parse("alert:weekly=3")
+
+
+if __name__ == "__main__":
+    unittest.main()
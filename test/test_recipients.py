@@ -0,0 +1,77 @@
+import email
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import multi_stock_alert as alert
+import recipients
+
+CFG = {"UPDATE_THRESHOLD_DOWN_PERCENT": 10, "UPDATE_THRESHOLD_UP_PERCENT": 10}
+DOWN = [("AI", "Alpha", "A", 80.0, 90.0, 81.0, ""), ("AI", "Beta", "B", 70.0, 90.0, 81.0, ""),
+        ("IT", "Gamma", "G", 50.0, 60.0, 54.0, "")]
+UP = [("IT", "Delta", "D", 130.0, 120.0, 132.0, "")]
+ENV = {"SMTP_PASS": "secret", "SOURCE_ROUTING": "false", "TICKSTORE_ENABLE": "false"}
+
+
+class RecipientTests(unittest.TestCase):
+    def test_cards_render_once_and_are_assembled_per_group(self):
+        subs = recipients.parse({"ai@x": ["@AI"], "ai2@x": "@AI", "mixed@x": ["@IT", "A"], "all@x": ["*"],
+                                 "stranger@x": ["@AI"]})
+        groups = recipients.groups(["owner@x", "ai@x", "ai2@x", "mixed@x", "all@x"], subs)
+        self.assertEqual([addrs for _, addrs in groups], [["owner@x", "all@x"], ["ai@x", "ai2@x"], ["mixed@x"]])
+
+        loc_of = {"A": "AI", "B": "AI", "G": "IT", "D": "IT"}
+        errors = ["B: 가격 조회 실패", "G: timeout"]
+        with mock.patch.object(alert, "_alert_card", wraps=alert._alert_card) as card:
+            mails = alert.personalized_bodies(CFG, "ts", DOWN, UP, errors, ["A|down#2 제한(x)"], [], [],
+                                              groups, loc_of)
+        self.assertEqual(card.call_count, 4)   # 종목당 한 번
+        bodies = {addrs[0]: body for addrs, body in mails}
+        self.assertEqual(bodies["owner@x"], alert.generate_html_body(CFG, "ts", DOWN, UP, errors,
+                                                                     ["A|down#2 제한(x)"]))
+        ai = bodies["ai@x"]
+        self.assertIn("(A)", ai); self.assertIn("(B)", ai)
+        self.assertNotIn("(G)", ai); self.assertNotIn("상승 목표", ai)
+        self.assertIn("B: 가격 조회 실패", ai); self.assertNotIn("G: timeout", ai)
+        mixed = bodies["mixed@x"]
+        self.assertIn("(A)", mixed); self.assertIn("(G)", mixed); self.assertIn("(D)", mixed)
+        self.assertNotIn("(B)", mixed)
+        self.assertIn("A|down#2", mixed)
+
+    def test_run_sends_personalized_mails_over_one_smtp_session(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            (base / "stock.txt").write_text("AI, Alpha, A, 90, 200, a\nIT, Gamma, G, 60, 200, g\n",
+                                            encoding="utf-8")
+            (base / "email.json").write_text(json.dumps({
+                "smtp_host": "smtp.example.com", "smtp_port": 587, "smtp_user": "bot@example.com",
+                "receivers": ["owner@x", "ai@x", "bio@x"],
+                "subscriptions": {"ai@x": ["@AI"], "bio@x": ["@바이오"]}}), encoding="utf-8")
+            paths = mock.patch.multiple(alert, CONFIG_PATH=base / "config.txt", STOCKS_PATH=base / "stock.txt",
+                                        STATE_PATH=base / "state.json", HISTORY_PATH=base / "history.json",
+                                        TICKS_DIR=base / "ticks", PORTFOLIOS_PATH=base / "portfolios.json",
+                                        RULES_PATH=base / "rules.txt")
+            prices = {"A": 80.0, "G": 50.0}
+            with paths, mock.patch.dict(os.environ, ENV, clear=True), \
+                    mock.patch.object(alert, "fetch_price", side_effect=lambda t, *a, **k: prices[t]), \
+                    mock.patch.object(alert.smtplib, "SMTP") as smtp:
+                alert.main()
+
+        session = smtp.return_value.__enter__.return_value
+        self.assertEqual(smtp.call_count, 1)
+        self.assertEqual(session.login.call_count, 1)
+        sent = {tuple(c.args[1]): email.message_from_string(c.args[2]).get_payload(decode=True).decode("utf-8")
+                for c in session.sendmail.call_args_list}
+        self.assertEqual(sorted(sent), [("ai@x",), ("owner@x",)])   # bio@x 는 해당 알림이 없다
+        self.assertIn("(G)", sent[("owner@x",)])
+        self.assertNotIn("(G)", sent[("ai@x",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import datetime
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import barstore
+import multi_stock_alert as alert
+import ratelimit
+import rules
+import tickstore
+from state_overlay import Overlay
+
+DAY = 738000
+TS = datetime.datetime(2026, 10, 19, 10, tzinfo=datetime.timezone.utc)
+MIDNIGHT = int(datetime.datetime(2026, 10, 19, tzinfo=datetime.timezone.utc).timestamp())
+STOCKS = [{"loc": "AI", "name": "A", "ticker": "A", "desc": ""},
+          {"loc": "AI", "name": "B", "ticker": "B", "desc": ""},
+          {"loc": "IT", "name": "C", "ticker": "C", "desc": "c"}]
+RULES_TXT = """# 대상, 규칙, 설명
+*, change <= -5, 급락
+@AI, cross_above ma3
+C, new_high 4, 신고가
+B, moving sideways
+"""
+
+
+def _bars(closes):
+    return [(DAY + 7 * i, c, c + 1, c - 1, c, 0.0) for i, c in enumerate(closes)]
+
+
+class RulesTests(unittest.TestCase):
+    def test_features_are_vectorized_cached_and_evaluated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            (base / "rules.txt").write_text(RULES_TXT, encoding="utf-8")
+            loaded, problems = rules.load(base / "rules.txt")
+            self.assertEqual([r.id for r in loaded], ["change<=-5", "cross_above:ma3", "new_high:4"])
+            self.assertEqual(len(problems), 1)
+            self.assertTrue(problems[0].startswith("rules.txt:5:"))
+
+            with barstore.BarWriter(base / "bars", "1wk") as w:
+                w.add("A", _bars([10.0, 10.0, 12.0, 14.0]))   # ma3 = 12
+                w.add("B", _bars([20.0, 22.0]))               # 3봉 미만 → 기준값 없음
+                w.add("C", _bars([30.0, 31.0, 32.0, 33.0]))   # 4봉 고가 = 34
+            with tickstore.open_store(base / "ticks") as store:
+                store.append(MIDNIGHT - 86400 * 3, {"A": 99.0, "C": 35.5})
+                store.append(MIDNIGHT - 3600, {"A": 13.0, "B": 21.0})
+                store.append(MIDNIGHT + 60, {"A": 1.0})      # 오늘 기록은 직전 종가가 아니다
+
+            args = (loaded, STOCKS, base / "bars", base / "ticks", "1wk", base / "cache.json", TS)
+            feats = rules.features(*args)
+            self.assertEqual(feats["prev"], {"A": 13.0, "B": 21.0, "C": 35.5})
+            self.assertEqual(feats["ma3"], {"A": 12.0})
+            self.assertEqual(feats["hi4"], {"C": 34.0})
+            with mock.patch.object(rules, "bar_features") as recompute, \
+                    mock.patch.object(rules, "previous_close") as rescan:
+                self.assertEqual(rules.features(*args), feats)
+            recompute.assert_not_called()
+            rescan.assert_not_called()
+
+        prices = {"A": 12.2, "B": 19.0, "C": 35.0}
+        last = {"A": 11.5, "B": 20.0, "C": 33.0}
+        hits = rules.evaluate(loaded, STOCKS, prices, last, feats)
+        self.assertEqual([(r.id, s["ticker"]) for r, s, *_ in hits],
+                         [("change<=-5", "A"), ("change<=-5", "B"), ("cross_above:ma3", "A"),
+                          ("new_high:4", "C")])
+        self.assertEqual(round(hits[0][4], 2), -6.15)
+        # 이미 이동평균 위에 있던 종목은 다시 알리지 않는다.
+        self.assertEqual(rules.evaluate(loaded[1:2], STOCKS, prices, {"A": 12.1}, feats), [])
+
+    def test_bar_features_ignore_other_tickers_calendars(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with barstore.BarWriter(tmp, "1wk") as w:
+                w.add("A", _bars([10.0, 12.0, 13.0, 14.0]))
+                w.add("B", [(d + 3, *rest) for d, *rest in _bars([50.0] * 4)])   # 3일 어긋난 달력
+            with barstore.open_store(tmp, "1wk") as store:
+                alone = rules.bar_features(store, ["A"], {"ma3", "hi3"})
+                batched = rules.bar_features(store, ["A", "B"], {"ma3", "hi3"})
+        self.assertEqual(float(alone["ma3"][0]), 13.0)
+        self.assertEqual(float(alone["hi3"][0]), 15.0)
+        self.assertEqual({k: float(v[0]) for k, v in batched.items()},
+                         {k: float(v[0]) for k, v in alone.items()})
+
+    def test_rule_hits_share_dedup_and_rate_limits(self):
+        loaded = [rules.Rule("*", *rules.parse("change>=3"))]
+        feats = {"prev": {"A": 10.0, "B": 10.0, "C": 10.0}}
+        prices = {"A": 11.0, "B": 10.5, "C": 10.1}
+        cfg = {"DAILY_DEDUP": True}
+        state = {"last_price": {}, "last_alert_date": {"A|rule:change>=3": "2026-10-19"}, "rl": {}}
+        pending = Overlay(state)
+        limiter = ratelimit.RateLimiter(ratelimit.parse("global:daily=0"), pending.setdefault("rl", {}), TS)
+        hits, notes, events = alert.evaluate_rules(cfg, loaded, STOCKS, prices, {}, feats, state, pending,
+                                                   "2026-10-19", "ts", limiter)
+        self.assertEqual((hits, events), ([], []))
+        self.assertEqual(len(notes), 1)
+        self.assertTrue(notes[0].startswith("B|rule:change>=3 제한"))
+
+        limiter = ratelimit.RateLimiter([], pending.setdefault("rl", {}), TS)
+        hits, notes, events = alert.evaluate_rules(cfg, loaded, STOCKS, prices, {}, feats, state, pending,
+                                                   "2026-10-19", "ts", limiter)
+        self.assertEqual(hits, [("AI", "B", "B", 10.5, "전일 대비 +5.00% (>= 3%)", 10.0, "")])
+        self.assertEqual(events[0]["dir"], "rule")
+        pending.commit()
+        self.assertEqual(state["last_alert_date"]["B|rule:change>=3"], "2026-10-19")
+        html = alert.generate_html_body({}, "ts", [], [], [], [], rule_hits=hits)
+        self.assertIn("📐 규칙 알림", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import multi_stock_alert as alert
+import shards
+
+ENV = {
+    "SMTP_HOST": "smtp.example.com", "SMTP_PORT": "587", "SMTP_USER": "bot@example.com",
+    "SMTP_PASS": "secret", "EMAIL_FROM": "bot@example.com", "EMAIL_TO": "owner@example.com",
+    "RATE_LIMITS": "alert:daily=2;global:daily=3",
+}
+
+
+class ShardTests(unittest.TestCase):
+    def test_partition_is_stable_and_covers_every_ticker(self):
+        stocks = [{"ticker": f"T{i}"} for i in range(50)]
+        parts = [shards.partition(stocks, i, 4) for i in range(4)]
+        self.assertEqual(sorted(s["ticker"] for p in parts for s in p), sorted(s["ticker"] for s in stocks))
+        self.assertEqual(parts, [shards.partition(stocks, i, 4) for i in range(4)])
+        self.assertEqual(shards.parse_spec("1/4"), (1, 4))
+        with self.assertRaises(ValueError):
+            shards.parse_spec("4/4")
+
+    def test_workers_fetch_disjoint_shards_and_merge_enforces_global_cap(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp)
+            tickers = [f"T{i}" for i in range(6)]
+            (base / "stock.txt").write_text(
+                "".join(f"AI, {t}, {t}, 90, 200\n" for t in tickers), encoding="utf-8")
+            paths = mock.patch.multiple(
+                alert, CONFIG_PATH=base / "config.txt", STOCKS_PATH=base / "stock.txt",
+                STATE_PATH=base / "state.json", HISTORY_PATH=base / "history.json",
+                TICKS_DIR=base / "ticks", PORTFOLIOS_PATH=base / "portfolios.json",
+                SHARDS_DIR=base / "shards")
+            with paths, mock.patch.dict(os.environ, ENV, clear=True), \
+                    mock.patch.object(alert, "fetch_price", return_value=80.0) as fetch, \
+                    mock.patch.object(alert, "send_email") as send:
+                alert.main(shard=(0, 2))
+                alert.main(shard=(1, 2))
+                self.assertEqual(sorted(c.args[0] for c in fetch.call_args_list), tickers)
+                self.assertFalse((base / "state.json").exists())
+                send.assert_not_called()
+
+                alert.main(merge=2)
+
+            self.assertEqual(send.call_count, 1)
+            self.assertEqual(fetch.call_count, 6)
+            self.assertEqual(list((base / "shards").iterdir()), [])
+            history = json.loads((base / "history.json").read_text(encoding="utf-8"))
+            self.assertEqual([e["ticker"] for e in history], tickers[:3])
+            state = json.loads((base / "state.json").read_text(encoding="utf-8"))
+            self.assertEqual(set(state["last_price"]), set(tickers))
+
+
+if __name__ == "__main__":
+    unittest.main()
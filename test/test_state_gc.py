@@ -0,0 +1,54 @@
+import datetime
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import ratelimit
+import state_gc
+
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+class StateGcTests(unittest.TestCase):
+    def test_compact_keeps_only_active_universe_and_live_limits(self):
+        ts = datetime.datetime(2026, 10, 19, 12, 0, tzinfo=KST)
+        day = ts.date().toordinal()
+        now = int(ts.timestamp())
+        policies = ratelimit.parse("alert:daily=2;alert:interval=60m;domain:window=5/1h")
+        state = {
+            "last_price": {"KEEP": 1.0, "GONE": 2.0},
+            "sources": {"GONE": {"runs": 3}},
+            "failures": {"GONE": {"count": 2}},
+            "last_alert_date": {"KEEP|down": "2026-10-19", "KEEP|up": "2026-10-18",
+                                "GONE|down": "2026-10-19"},
+            "rl": {
+                "alert:daily=2": {"KEEP|down": [day, 1], "KEEP|up": [day - 1, 2],
+                                  "GONE|down": [day, 1]},
+                "alert:interval=60m": {"KEEP|down": [now - 600], "KEEP|up": [now - 7200]},
+                "domain:window=5/1h": {"AI": [now - 60], "OLD": [now - 60]},
+                "alert:daily=9": {"KEEP|down": [day, 1]},
+            },
+            "custom": {"GONE": 1},
+        }
+        stocks = [{"ticker": "KEEP", "loc": "AI"}]
+
+        removed = state_gc.compact(state, stocks, policies, ts)
+
+        self.assertEqual(state["last_price"], {"KEEP": 1.0})
+        self.assertEqual(state["sources"], {})
+        self.assertEqual(state["failures"], {})
+        self.assertEqual(state["last_alert_date"], {"KEEP|down": "2026-10-19"})
+        self.assertEqual(state["rl"], {
+            "alert:daily=2": {"KEEP|down": [day, 1]},
+            "alert:interval=60m": {"KEEP|down": [now - 600]},
+            "domain:window=5/1h": {"AI": [now - 60]},
+        })
+        self.assertEqual(state["custom"], {"GONE": 1})
+        self.assertEqual(removed["rl"], 5)
+        self.assertEqual(removed["last_alert_date"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from state_overlay import Overlay
+
+
+class StateOverlayTests(unittest.TestCase):
+    def test_writes_stay_in_journal_until_commit(self):
+        state = {"last_alert_date": {"A|down": "2026-10-18"}, "rl": {}, "last_price": {"A": 1.0}}
+        pending = Overlay(state)
+        pending["last_alert_date"]["A|down"] = "2026-10-19"
+        pending["rl"].setdefault("alert:daily=2", {})["A|down"] = [1, 1]
+        del pending["last_price"]["A"]
+        pending["failures_reported"] = "2026-10-19"
+
+        self.assertEqual(state, {"last_alert_date": {"A|down": "2026-10-18"}, "rl": {},
+                                 "last_price": {"A": 1.0}})
+        self.assertEqual(pending["last_alert_date"]["A|down"], "2026-10-19")
+        self.assertNotIn("A", pending["last_price"])
+        self.assertEqual(pending.changes(), 4)
+
+        pending.commit()
+        self.assertEqual(state, {"last_alert_date": {"A|down": "2026-10-19"},
+                                 "rl": {"alert:daily=2": {"A|down": [1, 1]}},
+                                 "last_price": {}, "failures_reported": "2026-10-19"})
+
+    def test_discard_and_reads_fall_through_to_base(self):
+        state = {"last_price": {"A": 1.0}}
+        pending = Overlay(state)
+        state["last_price"]["B"] = 2.0
+        pending["last_price"]["A"] = 3.0
+        self.assertEqual(dict(pending["last_price"]), {"A": 3.0, "B": 2.0})
+
+        pending.discard()
+        pending.commit()
+        self.assertEqual(state, {"last_price": {"A": 1.0, "B": 2.0}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+import tickstore
+
+
+class TickStoreTests(unittest.TestCase):
+    def test_append_range_and_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with tickstore.open_store(tmp) as store:
+                store.append(1000, {"A": 1.0, "B": 10.0})
+                store.append(2000, {"A": 2.0})
+                self.assertEqual(store.range("A"), [(1000, 1.0), (2000, 2.0)])
+                store.append(3000, {"A": 3.0, "C": 30.0})
+                self.assertEqual(store.range("A", start=1500, end=3000), [(2000, 2.0)])
+
+            # 쓰다 끊긴 컬럼은 다시 열 때 가장 짧은 길이로 맞춘다.
+            with open(Path(tmp) / "px.f64", "ab") as fh:
+                fh.write(b"\0" * 8)
+            with tickstore.open_store(tmp, readonly=True) as store:
+                self.assertEqual(store.rows, 5)
+                self.assertEqual(store.range("C"), [(3000, 30.0)])
+                self.assertEqual(store.range("missing"), [])
+
+    def test_trim_and_downsample(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with tickstore.open_store(tmp) as store:
+                for ts in range(0, 7200, 600):
+                    store.append(ts, {"A": float(ts)})
+                pts = store.range("A")
+                self.assertEqual(tickstore.downsample(pts, 3600), [(0, 3000.0), (3600, 6600.0)])
+                self.assertEqual(tickstore.downsample(pts, 3600, "max"), [(0, 3000.0), (3600, 6600.0)])
+                self.assertEqual(tickstore.downsample(pts, 3600, "first"), [(0, 0.0), (3600, 3600.0)])
+
+                self.assertEqual(store.trim(3600), 6)
+                self.assertEqual(store.first_ts(), 3600)
+            with tickstore.open_store(tmp) as store:
+                self.assertEqual(len(store.range("A")), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()